@@ -0,0 +1,16 @@
+from django import forms
+
+from posts import forms as posts_forms
+from posts.models import Group
+
+
+class PostForm(posts_forms.PostForm):
+    """Форма поста сайта, но группа задаётся адресом (slug), как в
+    ответах API."""
+    group = forms.ModelChoiceField(
+        Group.objects.all(),
+        to_field_name='slug',
+        required=False,
+        label='Группа',
+        help_text='Группа, к которой будет относиться пост',
+    )
@@ -0,0 +1,97 @@
+"""Сериализаторы API поверх values(): строки приходят словарями, без
+объектов моделей, все связанные поля читаются тем же запросом через
+JOIN. Ответ может ограничить набор полей (?fields=), тогда из базы
+читаются только нужные столбцы."""
+from posts.models import Post
+
+
+class FieldsError(ValueError):
+    pass
+
+
+class Serializer:
+    # Поле ответа -> поле values().
+    fields = {}
+
+    def __init__(self, names=None):
+        names = names or list(self.fields)
+        unknown = [name for name in names if name not in self.fields]
+        if unknown:
+            raise FieldsError(
+                'Неизвестные поля: {}. Доступны: {}'.format(
+                    ', '.join(unknown), ', '.join(self.fields)
+                )
+            )
+        self.names = names
+
+    @classmethod
+    def from_request(cls, request):
+        names = request.GET.get('fields', '')
+        return cls([name for name in names.split(',') if name])
+
+    def values(self, queryset, *extra):
+        """Запрос только за нужными полями; extra — поля сортировки,
+        которые нужны пагинатору."""
+        lookups = dict.fromkeys(
+            [self.fields[name] for name in self.names] + list(extra)
+        )
+        return queryset.values(*lookups)
+
+    def to_dict(self, row):
+        data = {}
+        for name in self.names:
+            value = row[self.fields[name]]
+            convert = getattr(self, f'convert_{name}', None)
+            data[name] = value if convert is None else convert(value)
+        return data
+
+
+class PostSerializer(Serializer):
+    fields = {
+        'id': 'id',
+        'text': 'text',
+        'pub_date': 'pub_date',
+        'author': 'author__username',
+        'group': 'group__slug',
+        'image': 'image',
+        'comments_count': 'comments_count',
+    }
+
+    def convert_image(self, name):
+        if not name:
+            return None
+        return Post._meta.get_field('image').storage.url(name)
+
+
+class GroupSerializer(Serializer):
+    fields = {
+        'slug': 'slug',
+        'title': 'title',
+        'description': 'description',
+        'posts_count': 'posts_count',
+    }
+
+
+class CommentSerializer(Serializer):
+    fields = {
+        'id': 'id',
+        'post': 'post_id',
+        'author': 'author__username',
+        'text': 'text',
+        'created': 'created',
+    }
+
+
+class AuthorSerializer(Serializer):
+    fields = {
+        'username': 'username',
+        'first_name': 'first_name',
+        'last_name': 'last_name',
+        'posts_count': 'profile__posts_count',
+        'followers_count': 'profile__followers_count',
+    }
+
+    def convert_posts_count(self, value):
+        return value or 0
+
+    convert_followers_count = convert_posts_count
@@ -0,0 +1,262 @@
+import gzip
+import json
+from http import HTTPStatus
+
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts import counters
+from posts.models import Comment, Follow, Group, Post, User
+
+
+class ApiTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(
+            username='author', first_name='Имя', last_name='Фамилия'
+        )
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        Post.objects.bulk_create(
+            Post(text=f'Пост {i}', author=cls.author, group=cls.group)
+            for i in range(25)
+        )
+        counters.rebuild()
+        cls.post = Post.objects.first()
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def get_json(self, url, client=None, **params):
+        response = (client or self.guest_client).get(url, params)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        return response.json()
+
+    def post_json(self, url, data, client=None):
+        return (client or self.reader_client).post(
+            url, json.dumps(data), content_type='application/json'
+        )
+
+    def test_feed_is_paginated_by_cursor(self):
+        """Лента листается курсором без повторов и пропусков."""
+        url = reverse('api:posts')
+        first = self.get_json(url)
+        self.assertEqual(len(first['results']), 20)
+        self.assertIsNone(first['previous'])
+        second = self.get_json(url, cursor=first['next'])
+        self.assertEqual(len(second['results']), 5)
+        self.assertIsNone(second['next'])
+        ids = [row['id'] for row in first['results'] + second['results']]
+        self.assertEqual(
+            ids, list(Post.objects.order_by('-pub_date', '-id').values_list(
+                'pk', flat=True
+            ))
+        )
+
+    def test_post_fields(self):
+        """Пост сериализуется с автором и группой по имени и адресу."""
+        data = self.get_json(reverse('api:post', args=(self.post.pk,)))
+        self.assertEqual(data['id'], self.post.pk)
+        self.assertEqual(data['text'], self.post.text)
+        self.assertEqual(data['author'], 'author')
+        self.assertEqual(data['group'], 'test-slug')
+        self.assertIsNone(data['image'])
+        self.assertEqual(data['comments_count'], 0)
+
+    def test_fields_selection(self):
+        """?fields= оставляет в ответе только запрошенные поля."""
+        data = self.get_json(reverse('api:posts'), fields='id,author')
+        self.assertEqual(set(data['results'][0]), {'id', 'author'})
+        response = self.guest_client.get(
+            reverse('api:posts'), {'fields': 'id,password'}
+        )
+        self.assertEqual(response.status_code, HTTPStatus.BAD_REQUEST)
+        self.assertIn('password', response.json()['detail'])
+
+    def test_feeds_make_no_queries_per_row(self):
+        """Число запросов к ленте не зависит от числа постов."""
+        Comment.objects.bulk_create(
+            Comment(text='Комментарий', author=self.reader, post=self.post)
+            for _ in range(25)
+        )
+        urls = {
+            reverse('api:posts'): 1,
+            reverse('api:groups'): 1,
+            reverse('api:group_posts', args=(self.group.slug,)): 2,
+            reverse('api:author_posts', args=(self.author.username,)): 2,
+            reverse('api:comments', args=(self.post.pk,)): 2,
+        }
+        for url, queries in urls.items():
+            with self.subTest(url=url):
+                with self.assertNumQueries(queries):
+                    self.guest_client.get(url)
+
+    def test_group_and_author(self):
+        """Ленты группы и автора, карточка автора."""
+        other = Post.objects.create(text='Без группы', author=self.reader)
+        data = self.get_json(
+            reverse('api:group_posts', args=(self.group.slug,))
+        )
+        self.assertNotIn(other.pk, [row['id'] for row in data['results']])
+        data = self.get_json(
+            reverse('api:author_posts', args=(self.reader.username,))
+        )
+        self.assertEqual([row['id'] for row in data['results']], [other.pk])
+        data = self.get_json(reverse('api:author', args=('author',)))
+        self.assertEqual(data['first_name'], 'Имя')
+        self.assertEqual(data['posts_count'], 25)
+        data = self.get_json(reverse('api:groups'))
+        self.assertEqual(data['results'][0]['slug'], 'test-slug')
+
+    def test_missing_objects(self):
+        """Несуществующие объекты — JSON с кодом 404."""
+        for url in (
+            reverse('api:post', args=(self.post.pk + 100,)),
+            reverse('api:group_posts', args=('missing',)),
+            reverse('api:author_posts', args=('missing',)),
+        ):
+            with self.subTest(url=url):
+                response = self.guest_client.get(url)
+                self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+                self.assertIn('detail', response.json())
+
+    def test_create_post(self):
+        """Пост создаётся из JSON, проверка данных — формой сайта."""
+        url = reverse('api:posts')
+        response = self.post_json(
+            url, {'text': 'Новый пост'}, client=self.guest_client
+        )
+        self.assertEqual(response.status_code, HTTPStatus.UNAUTHORIZED)
+        response = self.post_json(url, {'text': '', 'group': 'missing'})
+        self.assertEqual(response.status_code, HTTPStatus.BAD_REQUEST)
+        self.assertEqual(
+            set(response.json()['errors']), {'text', 'group'}
+        )
+        response = self.post_json(
+            url, {'text': 'Новый пост', 'group': 'test-slug'}
+        )
+        self.assertEqual(response.status_code, HTTPStatus.CREATED)
+        data = response.json()
+        self.assertEqual(data['author'], 'reader')
+        self.assertEqual(data['group'], 'test-slug')
+        self.assertTrue(Post.objects.filter(
+            pk=data['id'], author=self.reader, group=self.group
+        ).exists())
+
+    def test_comments(self):
+        """Комментарий добавляется и появляется в списке."""
+        url = reverse('api:comments', args=(self.post.pk,))
+        response = self.post_json(url, {'text': 'Комментарий'})
+        self.assertEqual(response.status_code, HTTPStatus.CREATED)
+        self.assertEqual(response.json()['author'], 'reader')
+        data = self.get_json(url)
+        self.assertEqual(
+            [row['text'] for row in data['results']], ['Комментарий']
+        )
+        self.assertEqual(Comment.objects.count(), 1)
+
+    def test_follow(self):
+        """Подписка, лента подписок и отписка."""
+        url = reverse('api:follow', args=(self.author.username,))
+        feed_url = reverse('api:follow_feed')
+        self.assertEqual(
+            self.guest_client.get(feed_url).status_code,
+            HTTPStatus.UNAUTHORIZED,
+        )
+        response = self.reader_client.post(url)
+        self.assertEqual(response.json(), {'following': True})
+        self.assertTrue(Follow.objects.filter(
+            user=self.reader, author=self.author
+        ).exists())
+        data = self.get_json(feed_url, client=self.reader_client)
+        self.assertEqual(len(data['results']), 20)
+        response = self.reader_client.delete(url)
+        self.assertEqual(response.json(), {'following': False})
+        data = self.get_json(feed_url, client=self.reader_client)
+        self.assertEqual(data['results'], [])
+        response = self.reader_client.post(
+            reverse('api:follow', args=(self.reader.username,))
+        )
+        self.assertEqual(response.status_code, HTTPStatus.BAD_REQUEST)
+
+    def test_follow_many(self):
+        """Подписка на несколько авторов одним запросом."""
+        other = User.objects.create_user(username='other')
+        response = self.post_json(
+            reverse('api:follow_feed'),
+            {'authors': ['author', 'other', 'reader', 'missing']},
+        )
+        self.assertEqual(response.json(), {'followed': ['author', 'other']})
+        self.assertEqual(
+            set(Follow.objects.filter(user=self.reader).values_list(
+                'author', flat=True
+            )),
+            {self.author.pk, other.pk},
+        )
+        response = self.post_json(
+            reverse('api:follow_feed'), {'authors': 'author'}
+        )
+        self.assertEqual(response.status_code, HTTPStatus.BAD_REQUEST)
+
+    def test_method_not_allowed(self):
+        """Неподдерживаемый метод — 405 со списком разрешённых."""
+        response = self.reader_client.post(
+            reverse('api:post', args=(self.post.pk,))
+        )
+        self.assertEqual(
+            response.status_code, HTTPStatus.METHOD_NOT_ALLOWED
+        )
+        self.assertEqual(response['Allow'], 'GET')
+
+    def test_gzip(self):
+        """Ответ сжимается, если клиент принимает gzip."""
+        response = self.guest_client.get(
+            reverse('api:posts'), HTTP_ACCEPT_ENCODING='gzip, br;q=0'
+        )
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        data = json.loads(gzip.decompress(response.content))
+        self.assertEqual(len(data['results']), 20)
+        response = self.guest_client.get(reverse('api:posts'))
+        self.assertFalse(response.has_header('Content-Encoding'))
+
+    def test_broken_quality_values(self):
+        """Нечисловой q не роняет ответ: такая кодировка не принимается."""
+        for header in ('gzip;q=.', 'gzip;q=1.2.3'):
+            with self.subTest(header=header):
+                response = self.guest_client.get(
+                    reverse('api:posts'), HTTP_ACCEPT_ENCODING=header
+                )
+                self.assertEqual(response.status_code, HTTPStatus.OK)
+                self.assertFalse(response.has_header('Content-Encoding'))
+        response = self.guest_client.get(
+            reverse('api:posts'), HTTP_ACCEPT_ENCODING='br;q=., gzip'
+        )
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+
+    def test_csrf(self):
+        """Запись без токена — JSON 403, токен отдаёт csrf/."""
+        client = Client(enforce_csrf_checks=True)
+        client.force_login(self.reader)
+        url = reverse('api:comments', args=(self.post.pk,))
+        data = json.dumps({'text': 'Комментарий'})
+        response = client.post(url, data, content_type='application/json')
+        self.assertEqual(response.status_code, HTTPStatus.FORBIDDEN)
+        self.assertIn('detail', response.json())
+        response = client.get(reverse('api:csrf'))
+        token = response.json()['csrftoken']
+        self.assertIn('csrftoken', response.cookies)
+        response = client.post(
+            url, data, content_type='application/json',
+            HTTP_X_CSRFTOKEN=token,
+        )
+        self.assertEqual(response.status_code, HTTPStatus.CREATED)
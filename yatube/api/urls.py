@@ -0,0 +1,26 @@
+from django.urls import path
+
+from . import views
+
+app_name = 'api'
+
+urlpatterns = [
+    path('csrf/', views.csrf, name='csrf'),
+    path('posts/', views.posts, name='posts'),
+    path('posts/<int:post_id>/', views.post, name='post'),
+    path(
+        'posts/<int:post_id>/comments/', views.comments, name='comments'
+    ),
+    path('groups/', views.groups, name='groups'),
+    path(
+        'groups/<slug:slug>/posts/', views.group_posts, name='group_posts'
+    ),
+    path('users/<str:username>/', views.author, name='author'),
+    path(
+        'users/<str:username>/posts/',
+        views.author_posts,
+        name='author_posts',
+    ),
+    path('users/<str:username>/follow/', views.follow, name='follow'),
+    path('follow/', views.follow_feed, name='follow_feed'),
+]
@@ -0,0 +1,287 @@
+import json
+import math
+import re
+from functools import wraps
+
+from django.conf import settings
+from django.http import Http404, JsonResponse
+from django.middleware.csrf import get_token
+from django.shortcuts import get_object_or_404
+from django.utils.cache import patch_vary_headers
+from django.utils.text import compress_string
+from django.views.decorators.csrf import ensure_csrf_cookie
+
+from core import ratelimit
+from posts import follow_graph, timeline
+from posts.forms import CommentForm
+from posts.models import Comment, Follow, Group, Post, User
+from posts.utils import CursorPaginator
+from posts.views import COMMENTS_ORDERING
+
+from .forms import PostForm
+from .serializers import (
+    AuthorSerializer, CommentSerializer, FieldsError, GroupSerializer,
+    PostSerializer,
+)
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+POSTS_ORDERING = ('-pub_date', '-id')
+GROUPS_ORDERING = ('slug',)
+ENCODING_RE = re.compile(r'\s*([\w*]+)\s*(?:;\s*q=([\d.]+))?')
+
+
+class ApiError(Exception):
+    def __init__(self, status, detail, headers=None, **extra):
+        super().__init__(detail)
+        self.status = status
+        self.headers = headers or {}
+        self.data = {'detail': detail, **extra}
+
+
+def respond(data, status=200):
+    return JsonResponse(
+        data,
+        status=status,
+        json_dumps_params={'ensure_ascii': False, 'separators': (',', ':')},
+    )
+
+
+def accepted_encodings(request):
+    encodings = set()
+    for token in request.META.get('HTTP_ACCEPT_ENCODING', '').split(','):
+        match = ENCODING_RE.match(token)
+        if not match:
+            continue
+        try:
+            quality = float(match.group(2) or 1)
+        except ValueError:
+            # «q=.» или «q=1.2.3»: кодировка не считается принятой.
+            continue
+        if quality > 0:
+            encodings.add(match.group(1))
+    return encodings
+
+
+def compress(request, response):
+    """Сжать ответ brotli (если установлен пакет Brotli) или gzip."""
+    if len(response.content) < settings.API_COMPRESS_MIN_LENGTH:
+        return response
+    patch_vary_headers(response, ('Accept-Encoding',))
+    encodings = accepted_encodings(request)
+    if brotli is not None and 'br' in encodings:
+        content, encoding = brotli.compress(response.content), 'br'
+    elif 'gzip' in encodings:
+        content, encoding = compress_string(response.content), 'gzip'
+    else:
+        return response
+    if len(content) < len(response.content):
+        response.content = content
+        response['Content-Length'] = str(len(content))
+        response['Content-Encoding'] = encoding
+    return response
+
+
+def api_view(*methods):
+    """JSON-ответы на ошибки вместо HTML-страниц и перенаправлений."""
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in methods:
+                response = respond({'detail': 'Метод не разрешён'}, 405)
+                response['Allow'] = ', '.join(methods)
+                return response
+            try:
+                response = view(request, *args, **kwargs)
+            except ApiError as error:
+                response = respond(error.data, error.status)
+                for header, value in error.headers.items():
+                    response[header] = value
+            except Http404:
+                response = respond({'detail': 'Не найдено'}, 404)
+            return compress(request, response)
+        return wrapper
+    return decorator
+
+
+def require_user(request):
+    if not request.user.is_authenticated:
+        raise ApiError(401, 'Нужна авторизация')
+
+
+def throttle(request, scope):
+    retry_after = ratelimit.check(request, scope)
+    if retry_after is not None:
+        retry_after = math.ceil(retry_after)
+        raise ApiError(
+            429, 'Слишком много запросов',
+            headers={'Retry-After': str(retry_after)},
+            retry_after=retry_after,
+        )
+
+
+def request_data(request):
+    """Данные формы: JSON-объект или обычная форма с файлами."""
+    if request.content_type != 'application/json':
+        return request.POST, request.FILES
+    try:
+        data = json.loads(request.body or b'{}')
+    except ValueError:
+        raise ApiError(400, 'Некорректный JSON')
+    if not isinstance(data, dict):
+        raise ApiError(400, 'Ожидается JSON-объект')
+    return data, None
+
+
+def validate(form):
+    if not form.is_valid():
+        raise ApiError(
+            400, 'Ошибка в данных', errors=form.errors.get_json_data()
+        )
+    return form
+
+
+def get_serializer(serializer_class, request):
+    try:
+        return serializer_class.from_request(request)
+    except FieldsError as error:
+        raise ApiError(400, str(error))
+
+
+def paginate(request, queryset, serializer_class=PostSerializer,
+             ordering=POSTS_ORDERING):
+    serializer = get_serializer(serializer_class, request)
+    paginator = CursorPaginator(
+        serializer.values(queryset, *[name.lstrip('-') for name in ordering]),
+        settings.API_PAGE_SIZE,
+        ordering=ordering,
+    )
+    page = paginator.get_page(request.GET.get('cursor'))
+    return respond({
+        'results': [serializer.to_dict(row) for row in page],
+        'next': page.next_cursor,
+        'previous': page.previous_cursor,
+    })
+
+
+def detail(request, queryset, serializer_class, status=200, **lookup):
+    serializer = get_serializer(serializer_class, request)
+    row = serializer.values(queryset.filter(**lookup)).first()
+    if row is None:
+        raise Http404
+    return respond(serializer.to_dict(row), status)
+
+
+@api_view('GET')
+@ensure_csrf_cookie
+def csrf(request):
+    """Токен для записи с сессионной авторизацией: его передают
+    в заголовке X-CSRFToken вместе с cookie csrftoken."""
+    return respond({'csrftoken': get_token(request)})
+
+
+@api_view('GET', 'POST')
+def posts(request):
+    if request.method == 'GET':
+        return paginate(request, Post.objects.all())
+    require_user(request)
+    throttle(request, 'post_create')
+    data, files = request_data(request)
+    new_post = validate(PostForm(data, files=files)).save(commit=False)
+    new_post.author = request.user
+    new_post.save()
+    return detail(
+        request, Post.objects, PostSerializer, status=201, pk=new_post.pk
+    )
+
+
+@api_view('GET')
+def post(request, post_id):
+    return detail(request, Post.objects, PostSerializer, pk=post_id)
+
+
+@api_view('GET', 'POST')
+def comments(request, post_id):
+    one_post = get_object_or_404(Post.objects.only('pk'), pk=post_id)
+    if request.method == 'GET':
+        return paginate(
+            request, one_post.comments.all(), CommentSerializer,
+            COMMENTS_ORDERING,
+        )
+    require_user(request)
+    throttle(request, 'add_comment')
+    data, _ = request_data(request)
+    comment = validate(CommentForm(data)).save(commit=False)
+    comment.author = request.user
+    comment.post = one_post
+    comment.save()
+    return detail(
+        request, Comment.objects, CommentSerializer, status=201,
+        pk=comment.pk,
+    )
+
+
+@api_view('GET')
+def groups(request):
+    return paginate(
+        request, Group.objects.all(), GroupSerializer, GROUPS_ORDERING
+    )
+
+
+@api_view('GET')
+def group_posts(request, slug):
+    group = get_object_or_404(Group.objects.only('pk'), slug=slug)
+    return paginate(request, group.posts.all())
+
+
+@api_view('GET')
+def author(request, username):
+    return detail(
+        request, User.objects, AuthorSerializer, username=username
+    )
+
+
+@api_view('GET')
+def author_posts(request, username):
+    user = get_object_or_404(User.objects.only('pk'), username=username)
+    return paginate(request, user.posts.all())
+
+
+@api_view('GET', 'POST', 'DELETE')
+def follow(request, username):
+    require_user(request)
+    user = get_object_or_404(User.objects.only('pk'), username=username)
+    if request.method == 'GET':
+        return respond({
+            'following': follow_graph.is_following(request.user, user.pk)
+        })
+    throttle(request, 'profile_follow')
+    if request.method == 'DELETE':
+        Follow.objects.filter(user=request.user, author=user).delete()
+        return respond({'following': False})
+    if user == request.user:
+        raise ApiError(400, 'Нельзя подписаться на себя')
+    Follow.objects.get_or_create(user=request.user, author=user)
+    return respond({'following': True})
+
+
+@api_view('GET', 'POST')
+def follow_feed(request):
+    """Лента подписок; POST {"authors": [...]} подписывает на
+    несколько авторов разом."""
+    require_user(request)
+    if request.method == 'GET':
+        return paginate(request, timeline.followed_posts(request.user))
+    throttle(request, 'profile_follow')
+    data, _ = request_data(request)
+    usernames = data.get('authors')
+    if not isinstance(usernames, list):
+        raise ApiError(400, 'Ожидается список authors')
+    authors = dict(User.objects.filter(
+        username__in=[str(name) for name in usernames]
+    ).values_list('pk', 'username'))
+    followed = follow_graph.follow_many(request.user, authors)
+    return respond({'followed': sorted(authors[pk] for pk in followed)})
@@ -0,0 +1,80 @@
+import json
+import math
+import os
+
+PERCENTILES = (50, 95, 99)
+
+
+def percentile(values, q):
+    """Перцентиль методом ближайшего ранга."""
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    rank = max(math.ceil(q / 100 * len(ordered)), 1)
+    return ordered[rank - 1]
+
+
+def summarize(timings):
+    """Сводка по замерам времени в секундах, результат в миллисекундах."""
+    summary = {
+        f'p{q}': round(percentile(timings, q) * 1000, 2) for q in PERCENTILES
+    }
+    summary['requests'] = len(timings)
+    return summary
+
+
+def compare(results, baseline, tolerance):
+    """Список регрессий относительно сохранённой базовой линии.
+
+    Время сравнивается с допуском tolerance (доля), число запросов
+    к базе и память — строго: они не зависят от шума машины.
+    """
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if previous is None:
+            continue
+        for key in ('p50', 'p95', 'p99'):
+            if current[key] > previous[key] * (1 + tolerance):
+                regressions.append(
+                    f'{name}: {key} {previous[key]} → {current[key]} мс'
+                )
+        if current['queries'] > previous['queries']:
+            regressions.append(
+                f'{name}: запросов {previous["queries"]} → '
+                f'{current["queries"]}'
+            )
+        if current['memory_kb'] > previous['memory_kb'] * (1 + tolerance):
+            regressions.append(
+                f'{name}: память {previous["memory_kb"]} → '
+                f'{current["memory_kb"]} КиБ'
+            )
+    return regressions
+
+
+def load_baseline(path):
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding='utf-8') as baseline_file:
+        return json.load(baseline_file)
+
+
+def save_baseline(path, results):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as baseline_file:
+        json.dump(results, baseline_file, ensure_ascii=False, indent=2,
+                  sort_keys=True)
+
+
+def format_table(results, columns=('p50', 'p95', 'p99', 'queries',
+                                   'memory_kb')):
+    width = max([len(name) for name in results] + [len('view')])
+    lines = ['  '.join(
+        ['view'.ljust(width)] + [column.rjust(10) for column in columns]
+    )]
+    for name, row in results.items():
+        lines.append('  '.join(
+            [name.ljust(width)]
+            + [str(row[column]).rjust(10) for column in columns]
+        ))
+    return '\n'.join(lines)
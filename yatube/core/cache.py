@@ -0,0 +1,105 @@
+import math
+import random
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.cache.backends import filebased, locmem, memcached
+
+from . import metrics
+
+MISSING = object()
+LOCK_KEY = 'lock:{}'
+
+
+class InstrumentedCacheMixin:
+    """Считает попадания и промахи чтения для метрик запроса."""
+
+    def get(self, key, default=None, version=None):
+        value = super().get(key, MISSING, version)
+        if value is MISSING:
+            metrics.record_cache(0, 1)
+            return default
+        metrics.record_cache(1, 0)
+        return value
+
+    def get_many(self, keys, version=None):
+        keys = list(keys)
+        # Базовый get_many читает ключи через get: не считать их дважды.
+        with metrics.paused():
+            found = super().get_many(keys, version)
+        metrics.record_cache(len(found), len(keys) - len(found))
+        return found
+
+
+class LocMemCache(InstrumentedCacheMixin, locmem.LocMemCache):
+    pass
+
+
+class FileBasedCache(InstrumentedCacheMixin, filebased.FileBasedCache):
+    pass
+
+
+class MemcachedCache(InstrumentedCacheMixin, memcached.MemcachedCache):
+    pass
+
+
+class PyLibMCCache(InstrumentedCacheMixin, memcached.PyLibMCCache):
+    pass
+
+
+def expired(delta, expires, beta):
+    """Вероятностный досрочный пересчёт (XFetch): чем ближе срок и чем
+    дольше считается значение, тем вероятнее пересчёт сейчас."""
+    jitter = -delta * beta * math.log(1 - random.random())
+    return time.time() + jitter >= expires
+
+
+def get_or_set(key, compute, timeout, beta=None):
+    """cache.get_or_set, который не пускает толпу пересчитывать ключ.
+
+    Значение хранится с логическим сроком годности и живёт в кеше
+    дольше него. Пересчитывает только тот, кто взял блокировку;
+    остальные в это время получают прежнее значение, а если его нет —
+    ждут результат до CACHE_LOCK_WAIT секунд.
+    """
+    beta = settings.CACHE_XFETCH_BETA if beta is None else beta
+    lock_key = LOCK_KEY.format(key)
+    envelope = cache.get(key)
+    if envelope is not None:
+        value, delta, expires = envelope
+        if not expired(delta, expires, beta):
+            return value
+        if not cache.add(lock_key, 1, settings.CACHE_LOCK_TIMEOUT):
+            return value
+    elif not cache.add(lock_key, 1, settings.CACHE_LOCK_TIMEOUT):
+        envelope = wait_for(key)
+        if envelope is not None:
+            return envelope[0]
+        # Держатель блокировки не успел: считаем сами, без блокировки.
+        return store(key, compute, timeout)
+    try:
+        return store(key, compute, timeout)
+    finally:
+        cache.delete(lock_key)
+
+
+def store(key, compute, timeout):
+    started = time.time()
+    value = compute()
+    now = time.time()
+    cache.set(
+        key, (value, now - started, now + timeout),
+        timeout + settings.CACHE_STALE_TIMEOUT,
+    )
+    return value
+
+
+def wait_for(key):
+    deadline = time.monotonic() + settings.CACHE_LOCK_WAIT
+    while time.monotonic() < deadline:
+        time.sleep(0.05)
+        envelope = cache.get(key)
+        if envelope is not None:
+            return envelope
+    return None
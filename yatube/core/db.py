@@ -0,0 +1,46 @@
+import random
+import threading
+
+from django.conf import settings
+from django.db import router
+
+# Сессии читаются только с основной базы: сразу после входа новой
+# сессии на реплике ещё может не быть.
+PRIMARY_ONLY_APPS = {'sessions'}
+
+local = threading.local()
+
+
+def read_from_replicas(enabled):
+    local.replicas = enabled
+
+
+def primary(queryset):
+    """Запрос к основной базе для данных, которые кладутся в общий кеш:
+    прочитанное с отстающей реплики пролежало бы там до инвалидации,
+    а она уже прошла."""
+    return queryset.using(router.db_for_write(queryset.model))
+
+
+class ReplicaRouter:
+    """Запись и чтение по умолчанию идут в основную базу, чтение
+    с реплик включается только для запросов, отмеченных
+    ReplicaMiddleware."""
+
+    def db_for_read(self, model, **hints):
+        if (
+            getattr(local, 'replicas', False)
+            and settings.DATABASE_REPLICAS
+            and model._meta.app_label not in PRIMARY_ONLY_APPS
+        ):
+            return random.choice(settings.DATABASE_REPLICAS)
+        return None
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {'default', *settings.DATABASE_REPLICAS}
+        if {obj1._state.db, obj2._state.db} <= databases:
+            return True
+        return None
@@ -0,0 +1,62 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.test import RequestFactory, override_settings
+
+from core import benchmark, ratelimit
+
+SCOPE = 'benchmark'
+
+
+class Command(BaseCommand):
+    help = (
+        'Стоимость проверки лимита запросов на настроенном кеше: '
+        'пропущенный запрос, отказ и выключенный ограничитель. '
+        'Время в микросекундах.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=10000)
+
+    def handle(self, *args, **options):
+        total = options['requests']
+        scenarios = {
+            # Каждый запрос от нового пользователя: корзины не пусты.
+            'allowed': ({'user': (total, 60), 'ip': (total, 60)}, True),
+            # Корзина одного пользователя пуста с первого запроса.
+            'denied': ({'user': (1, 3600)}, True),
+            'disabled': ({'user': (1, 3600)}, False),
+        }
+        results = {}
+        for name, (limits, enabled) in scenarios.items():
+            with override_settings(
+                RATE_LIMITS={SCOPE: limits}, RATE_LIMIT_ENABLED=enabled
+            ):
+                results[name] = self.measure(total, name == 'allowed')
+        cache.delete_many([
+            ratelimit.KEY.format(SCOPE, kind, value)
+            for kind, value in (('user', 0), ('ip', '127.0.0.1'))
+        ])
+        self.stdout.write(benchmark.format_table(
+            results, ('requests', 'p50', 'p95', 'p99')
+        ))
+
+    def measure(self, total, new_users):
+        factory = RequestFactory()
+        User = get_user_model()
+        requests = []
+        for number in range(total):
+            request = factory.post('/', REMOTE_ADDR='127.0.0.1')
+            request.user = User(pk=number if new_users else 0)
+            requests.append(request)
+        ratelimit.check(requests[0], SCOPE)
+        timings = []
+        for request in requests:
+            started = time.perf_counter()
+            ratelimit.check(request, SCOPE)
+            timings.append(time.perf_counter() - started)
+        # summarize переводит секунды в миллисекунды, здесь нужны
+        # микросекунды.
+        return benchmark.summarize([timing * 1000 for timing in timings])
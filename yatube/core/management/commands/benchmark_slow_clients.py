@@ -0,0 +1,108 @@
+import http.client
+import socket
+import threading
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.core.servers.basehttp import (
+    ThreadedWSGIServer, WSGIRequestHandler, WSGIServer,
+)
+from django.core.wsgi import get_wsgi_application
+from django.db import connections
+from django.urls import reverse
+
+from core import benchmark
+from posts.models import Post
+
+SERVERS = {
+    'single thread': WSGIServer,
+    'thread per request': ThreadedWSGIServer,
+}
+
+
+class QuietHandler(WSGIRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+class Command(BaseCommand):
+    help = (
+        'Медленные клиенты, которые долго передают запрос, против '
+        'быстрых: задержка быстрых клиентов на однопоточном и '
+        'многопоточном WSGI-сервере.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--slow-clients', type=int, default=4)
+        parser.add_argument(
+            '--slow-seconds', type=float, default=1,
+            help='За сколько секунд медленный клиент передаёт запрос',
+        )
+        parser.add_argument('--requests', type=int, default=50)
+
+    def handle(self, *args, **options):
+        post = Post.objects.select_related('author').first()
+        if post is None:
+            raise CommandError('База пуста, сначала запустите seed_posts')
+        paths = (
+            reverse('posts:post_detail', args=(post.pk,)),
+            reverse('posts:profile', args=(post.author.username,)),
+        )
+        connections.close_all()
+        results = {}
+        for name, server_class in SERVERS.items():
+            results[name] = self.run(server_class, paths, options)
+        self.stdout.write(benchmark.format_table(
+            results, ('requests', 'p50', 'p95', 'p99')
+        ))
+
+    def run(self, server_class, paths, options):
+        server = server_class(('127.0.0.1', 0), QuietHandler)
+        server.set_app(get_wsgi_application())
+        port = server.server_address[1]
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        stop = threading.Event()
+        slow = [
+            threading.Thread(
+                target=self.slow_client,
+                args=(port, paths[0], options['slow_seconds'], stop),
+            )
+            for _ in range(options['slow_clients'])
+        ]
+        for thread in slow:
+            thread.start()
+        try:
+            timings = []
+            for number in range(options['requests']):
+                started = time.perf_counter()
+                client = http.client.HTTPConnection('127.0.0.1', port)
+                client.request('GET', paths[number % 2])
+                client.getresponse().read()
+                client.close()
+                timings.append(time.perf_counter() - started)
+        finally:
+            stop.set()
+            for thread in slow:
+                thread.join()
+            server.shutdown()
+            server.server_close()
+        return benchmark.summarize(timings)
+
+    def slow_client(self, port, path, seconds, stop):
+        """Передавать запрос по байту, растягивая его на seconds,
+        и повторять, пока идёт замер."""
+        request = (
+            f'GET {path} HTTP/1.1\r\nHost: 127.0.0.1\r\n'
+            'Connection: close\r\n\r\n'
+        ).encode()
+        pause = seconds / len(request)
+        while not stop.is_set():
+            with socket.create_connection(('127.0.0.1', port)) as sock:
+                for byte in request:
+                    if stop.is_set():
+                        break
+                    sock.sendall(bytes((byte,)))
+                    time.sleep(pause)
+                else:
+                    while sock.recv(65536):
+                        pass
@@ -0,0 +1,178 @@
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+
+from django.db import connections
+
+DURATION_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10,
+)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+MAX_SAMPLE_QUERIES = 500
+
+HISTOGRAMS = {
+    'request_duration_seconds': (
+        'Время обработки запроса', DURATION_BUCKETS, 'duration'),
+    'db_queries': (
+        'Запросов к базе за запрос', COUNT_BUCKETS, 'queries_count'),
+    'db_duration_seconds': (
+        'Время запросов к базе за запрос', DURATION_BUCKETS, 'db_time'),
+    'template_render_seconds': (
+        'Время отрисовки шаблонов за запрос', DURATION_BUCKETS,
+        'template_time'),
+}
+COUNTERS = {
+    'cache_hits_total': ('Попадания в кеш', 'cache_hits'),
+    'cache_misses_total': ('Промахи кеша', 'cache_misses'),
+}
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+        self.count += 1
+        self.sum += value
+
+
+class Registry:
+    """Метрики процесса по именам представлений.
+
+    Данные живут в памяти и у каждого процесса свои: Prometheus
+    собирает их с каждого процесса отдельно.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        self.histograms = {name: {} for name in HISTOGRAMS}
+        self.counters = {name: {} for name in COUNTERS}
+
+    def observe(self, view, sample):
+        with self.lock:
+            for name, (_, buckets, field) in HISTOGRAMS.items():
+                histogram = self.histograms[name].get(view)
+                if histogram is None:
+                    histogram = self.histograms[name][view] = Histogram(
+                        buckets
+                    )
+                histogram.observe(getattr(sample, field))
+            for name, (_, field) in COUNTERS.items():
+                values = self.counters[name]
+                values[view] = values.get(view, 0) + getattr(sample, field)
+
+    def export(self, prefix='yatube'):
+        """Текстовый формат Prometheus."""
+        lines = []
+        with self.lock:
+            for name, (help_text, _, _) in HISTOGRAMS.items():
+                metric = f'{prefix}_{name}'
+                lines.append(f'# HELP {metric} {help_text}')
+                lines.append(f'# TYPE {metric} histogram')
+                for view, histogram in sorted(self.histograms[name].items()):
+                    label = f'view="{escape(view)}"'
+                    for bound, count in zip(
+                        histogram.buckets, histogram.counts
+                    ):
+                        lines.append(
+                            f'{metric}_bucket{{{label},le="{bound}"}} {count}'
+                        )
+                    lines.append(
+                        f'{metric}_bucket{{{label},le="+Inf"}} '
+                        f'{histogram.count}'
+                    )
+                    lines.append(f'{metric}_sum{{{label}}} {histogram.sum}')
+                    lines.append(
+                        f'{metric}_count{{{label}}} {histogram.count}'
+                    )
+            for name, (help_text, _) in COUNTERS.items():
+                metric = f'{prefix}_{name}'
+                lines.append(f'# HELP {metric} {help_text}')
+                lines.append(f'# TYPE {metric} counter')
+                for view, value in sorted(self.counters[name].items()):
+                    lines.append(f'{metric}{{view="{escape(view)}"}} {value}')
+        return '\n'.join(lines) + '\n'
+
+
+def escape(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"')
+
+
+class Sample:
+    """Замеры одного запроса."""
+
+    def __init__(self):
+        self.duration = 0
+        self.queries_count = 0
+        self.db_time = 0
+        self.template_time = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            self.queries_count += 1
+            self.db_time += elapsed
+            if len(self.queries) < MAX_SAMPLE_QUERIES:
+                self.queries.append((elapsed, sql))
+
+
+registry = Registry()
+local = threading.local()
+
+
+def current():
+    return getattr(local, 'sample', None)
+
+
+@contextmanager
+def collect():
+    """Собирать замеры кода внутри блока в Sample."""
+    sample = Sample()
+    previous, local.sample = current(), sample
+    started = time.perf_counter()
+    try:
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(sample))
+            yield sample
+    finally:
+        sample.duration = time.perf_counter() - started
+        local.sample = previous
+
+
+@contextmanager
+def paused():
+    """Не записывать замеры внутри блока (например, вложенные вызовы)."""
+    previous, local.sample = current(), None
+    try:
+        yield
+    finally:
+        local.sample = previous
+
+
+def record_cache(hits, misses):
+    sample = current()
+    if sample is not None:
+        sample.cache_hits += hits
+        sample.cache_misses += misses
+
+
+def record_template(elapsed):
+    sample = current()
+    if sample is not None:
+        sample.template_time += elapsed
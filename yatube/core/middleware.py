@@ -0,0 +1,91 @@
+import logging
+
+from django.conf import settings
+
+from . import db, metrics
+
+logger = logging.getLogger(__name__)
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+PRIMARY_COOKIE = 'primary_db'
+
+
+class MetricsMiddleware:
+    """Замеры каждого запроса по имени представления.
+
+    Запросы, которые не сопоставились ни с одним представлением,
+    попадают под одно имя, чтобы сканеры не раздували число меток.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with metrics.collect() as sample:
+            response = self.get_response(request)
+        match = request.resolver_match
+        view = match.view_name if match else 'unresolved'
+        metrics.registry.observe(view, sample)
+        threshold = settings.SLOW_REQUEST_THRESHOLD
+        if threshold is not None and sample.duration > threshold:
+            self.log_slow(request, view, sample)
+        return response
+
+    def log_slow(self, request, view, sample):
+        queries = '\n'.join(
+            f'  {elapsed * 1000:.1f} мс: {sql}'
+            for elapsed, sql in sample.queries
+        )
+        logger.warning(
+            'Медленный запрос %s %s (%s): %.0f мс, запросов к базе %s '
+            '(%.0f мс), шаблоны %.0f мс\n%s',
+            request.method, request.get_full_path(), view,
+            sample.duration * 1000, sample.queries_count,
+            sample.db_time * 1000, sample.template_time * 1000, queries,
+        )
+
+
+class ReplicaMiddleware:
+    """Страницы из DATABASE_REPLICA_VIEWS читаются с реплик.
+
+    После успешного изменяющего запроса пользователь получает cookie,
+    и пока она жива, все его запросы читают основную базу: так он
+    сразу видит свой пост или комментарий, даже если реплика отстаёт.
+    Изменяющими считаются и GET-представления из DATABASE_WRITE_VIEWS.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        try:
+            response = self.get_response(request)
+        finally:
+            db.read_from_replicas(False)
+        if (
+            settings.DATABASE_REPLICAS
+            and self.is_write(request)
+            and response.status_code < 400
+        ):
+            response.set_cookie(
+                PRIMARY_COOKIE, '1',
+                max_age=settings.DATABASE_PRIMARY_STICKINESS,
+                httponly=True,
+            )
+        return response
+
+    def is_write(self, request):
+        match = request.resolver_match
+        return request.method not in SAFE_METHODS or (
+            match is not None
+            and match.view_name in settings.DATABASE_WRITE_VIEWS
+        )
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        db.read_from_replicas(
+            bool(settings.DATABASE_REPLICAS)
+            and request.method in SAFE_METHODS
+            and PRIMARY_COOKIE not in request.COOKIES
+            and request.resolver_match.view_name
+            in settings.DATABASE_REPLICA_VIEWS
+        )
@@ -0,0 +1,23 @@
+from django.conf import settings
+
+
+def client_ip(request):
+    """Адрес клиента.
+
+    За обратным прокси REMOTE_ADDR — адрес прокси. Если запрос пришёл
+    с адреса из TRUSTED_PROXIES, адрес клиента берётся из
+    X-Forwarded-For: первый справа, который не принадлежит доверенному
+    прокси. Левее него значения подставил сам клиент, им верить нельзя.
+    """
+    address = request.META.get('REMOTE_ADDR')
+    if address not in settings.TRUSTED_PROXIES:
+        return address
+    forwarded = [
+        value.strip()
+        for value in request.META.get('HTTP_X_FORWARDED_FOR', '').split(',')
+        if value.strip()
+    ]
+    for value in reversed(forwarded):
+        if value not in settings.TRUSTED_PROXIES:
+            return value
+    return forwarded[0] if forwarded else address
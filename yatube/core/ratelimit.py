@@ -0,0 +1,73 @@
+"""Ограничение частоты записи: маркерная корзина (token bucket) в общем
+кеше, отдельно по пользователю и по IP.
+
+Корзина хранится одним числом — моментом, когда она снова наполнится
+(GCRA). Каждый запрос сдвигает этот момент на время пополнения одного
+маркера; если момент ушёл дальше, чем на период, маркеры кончились.
+Пропущенный запрос стоит одного get_many и одного set_many, отказ —
+только чтения. Кеш не даёт атомарного «прочитать и записать», поэтому
+под гонкой одновременных запросов лимит может быть превышен на
+несколько штук: для защиты базы от потока записей этого достаточно.
+"""
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .proxies import client_ip
+from .views import too_many_requests
+
+KEY = 'ratelimit:{}:{}:{}'
+
+
+def buckets(request, scope):
+    """{ключ корзины: (маркеров, период в секундах)} для запроса."""
+    limits = settings.RATE_LIMITS.get(scope, {})
+    result = {}
+    if 'user' in limits and request.user.is_authenticated:
+        result[KEY.format(scope, 'user', request.user.pk)] = limits['user']
+    address = client_ip(request)
+    if 'ip' in limits and address:
+        result[KEY.format(scope, 'ip', address)] = limits['ip']
+    return result
+
+
+def check(request, scope):
+    """Взять маркер из корзин запроса. Возвращает None, если запрос
+    разрешён, иначе через сколько секунд повторить."""
+    if not settings.RATE_LIMIT_ENABLED:
+        return None
+    limits = buckets(request, scope)
+    if not limits:
+        return None
+    now = time.time()
+    stored = cache.get_many(limits)
+    updates = {}
+    retry_after = 0
+    for key, (tokens, period) in limits.items():
+        full_at = max(stored.get(key, now), now) + period / tokens
+        wait = full_at - now - period
+        if wait > 0:
+            retry_after = max(retry_after, wait)
+        updates[key] = full_at
+    if retry_after:
+        return retry_after
+    timeout = max(period for _, period in limits.values())
+    cache.set_many(updates, int(timeout) + 1)
+    return None
+
+
+def rate_limit(scope, methods=None):
+    """Отвечать 429, когда у пользователя или IP кончились маркеры
+    scope. methods — какие методы считать (по умолчанию все)."""
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if methods is None or request.method in methods:
+                retry_after = check(request, scope)
+                if retry_after is not None:
+                    return too_many_requests(request, retry_after)
+            return view(request, *args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,17 @@
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+
+@receiver(connection_created)
+def tune_sqlite(sender, connection, **kwargs):
+    """Настроить каждое новое соединение с SQLite.
+
+    WAL позволяет читать параллельно с записью, а busy_timeout
+    заставляет писателей ждать блокировку, а не падать сразу
+    с «database is locked».
+    """
+    if connection.vendor != 'sqlite':
+        return
+    for pragma, value in settings.SQLITE_PRAGMAS.items():
+        connection.connection.execute(f'PRAGMA {pragma} = {value}')
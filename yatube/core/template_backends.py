@@ -0,0 +1,32 @@
+import time
+
+from django.template import TemplateDoesNotExist
+from django.template.backends import django
+
+from . import metrics
+
+
+class Template(django.Template):
+    def render(self, context=None, request=None):
+        started = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            metrics.record_template(time.perf_counter() - started)
+
+
+class DjangoTemplates(django.DjangoTemplates):
+    """Шаблоны Django с замером времени отрисовки для метрик.
+
+    Время меряется только у шаблона верхнего уровня: вложенные
+    include и extends отрисовываются внутри него.
+    """
+
+    def from_string(self, template_code):
+        return Template(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        try:
+            return Template(self.engine.get_template(template_name), self)
+        except TemplateDoesNotExist as exc:
+            django.reraise(exc, self)
@@ -1,6 +1,27 @@
+import os
+import shutil
+import tempfile
+import threading
+import time
 from http import HTTPStatus
+from unittest import mock
 
-from django.test import TestCase
+from django.contrib.auth.models import AnonymousUser
+from django.contrib.sessions.models import Session
+from django.core.cache import cache
+from django.db import connection, connections, router
+from django.db.backends.sqlite3.base import DatabaseWrapper
+from django.http import HttpResponse
+from django.test import (
+    Client, RequestFactory, SimpleTestCase, TestCase, TransactionTestCase,
+    override_settings,
+)
+from django.urls import resolve, reverse
+
+from . import benchmark, metrics, ratelimit
+from .cache import LOCK_KEY, get_or_set
+from .middleware import PRIMARY_COOKIE, ReplicaMiddleware
+from posts.models import Follow, Post, User
 
 
 class ViewTestClass(TestCase):
@@ -8,3 +29,394 @@ class ViewTestClass(TestCase):
         response = self.client.get('/nonexist-page/')
         self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
         self.assertTemplateUsed(response, 'core/404.html')
+
+
+class BenchmarkHelpersTest(TestCase):
+    def test_percentile(self):
+        """Перцентиль берётся методом ближайшего ранга."""
+        values = [i / 1000 for i in range(1, 101)]
+        self.assertEqual(benchmark.percentile(values, 50), 0.05)
+        self.assertEqual(benchmark.percentile(values, 99), 0.099)
+        self.assertEqual(benchmark.summarize([0.002])['p95'], 2.0)
+
+    def test_compare(self):
+        """Регрессией считается рост времени сверх допуска и рост запросов."""
+        baseline = {'view': {
+            'p50': 10, 'p95': 20, 'p99': 30, 'queries': 3, 'memory_kb': 100
+        }}
+        same = {'view': dict(baseline['view'], p99=33)}
+        worse = {'view': dict(baseline['view'], p95=30, queries=4)}
+        self.assertEqual(benchmark.compare(same, baseline, 0.2), [])
+        self.assertEqual(len(benchmark.compare(worse, baseline, 0.2)), 2)
+        self.assertEqual(benchmark.compare(worse, {}, 0.2), [])
+
+
+class MetricsTest(TestCase):
+    def setUp(self):
+        metrics.registry.clear()
+        cache.clear()
+        user = User.objects.create_user(username='UM')
+        self.post = Post.objects.create(text='Тестовый пост', author=user)
+
+    def test_request_is_measured(self):
+        """Запрос попадает в гистограммы по имени представления."""
+        url = reverse('posts:post_detail', args=(self.post.pk,))
+        self.client.get(url)
+        self.client.get(url)
+        histograms = metrics.registry.histograms
+        for name in metrics.HISTOGRAMS:
+            with self.subTest(metric=name):
+                self.assertEqual(
+                    histograms[name]['posts:post_detail'].count, 2
+                )
+        self.assertGreater(
+            histograms['db_queries']['posts:post_detail'].sum, 0
+        )
+        self.assertGreater(
+            histograms['template_render_seconds']['posts:post_detail'].sum, 0
+        )
+
+    def test_cache_hits_and_misses(self):
+        """Промахи и попадания кеша считаются для представления."""
+        self.client.get(reverse('posts:index'))
+        self.client.get(reverse('posts:index'))
+        counters = metrics.registry.counters
+        self.assertGreater(counters['cache_misses_total']['posts:index'], 0)
+        self.assertGreater(counters['cache_hits_total']['posts:index'], 0)
+
+    def test_export(self):
+        """Метрики отдаются в текстовом формате Prometheus."""
+        self.client.get(reverse('posts:index'))
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertIn('text/plain; version=0.0.4', response['Content-Type'])
+        body = response.content.decode()
+        self.assertIn('# TYPE yatube_request_duration_seconds histogram', body)
+        self.assertIn(
+            'yatube_request_duration_seconds_count{view="posts:index"} 1',
+            body,
+        )
+        self.assertIn(
+            'yatube_db_queries_bucket{view="posts:index",le="+Inf"} 1', body
+        )
+
+    def test_export_is_private(self):
+        """Метрики не видны с чужих адресов."""
+        response = self.client.get(
+            reverse('metrics'), REMOTE_ADDR='203.0.113.1'
+        )
+        self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+
+    @override_settings(TRUSTED_PROXIES=['127.0.0.1'])
+    def test_export_behind_proxy(self):
+        """За доверенным прокси адрес клиента берётся из
+        X-Forwarded-For, подставленные клиентом значения не помогают."""
+        url = reverse('metrics')
+        for forwarded, status in (
+            ('203.0.113.1', HTTPStatus.NOT_FOUND),
+            ('127.0.0.1, 203.0.113.1', HTTPStatus.NOT_FOUND),
+            ('', HTTPStatus.OK),
+            ('::1', HTTPStatus.OK),
+        ):
+            with self.subTest(forwarded=forwarded):
+                response = self.client.get(
+                    url, HTTP_X_FORWARDED_FOR=forwarded
+                )
+                self.assertEqual(response.status_code, status)
+
+    @override_settings(SLOW_REQUEST_THRESHOLD=0)
+    def test_slow_request_log(self):
+        """Медленный запрос пишется в лог вместе с SQL."""
+        with self.assertLogs('core.middleware', 'WARNING') as logs:
+            self.client.get(reverse('posts:post_detail', args=(self.post.pk,)))
+        self.assertIn('posts:post_detail', logs.output[0])
+        self.assertIn('SELECT', logs.output[0])
+
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+class ReplicaRoutingTest(TestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.reads = {}
+
+        def view(request):
+            self.reads['post'] = router.db_for_read(Post)
+            self.reads['session'] = router.db_for_read(Session)
+            return HttpResponse()
+
+        self.middleware = ReplicaMiddleware(view)
+
+    def run_view(self, request):
+        request.resolver_match = resolve(request.path)
+        self.middleware.process_view(request, None, (), {})
+        return self.middleware(request)
+
+    def test_feeds_read_from_replica(self):
+        """Ленты читают с реплики, сессии и запись — с основной базы."""
+        self.run_view(self.factory.get(reverse('posts:index')))
+        self.assertEqual(self.reads, {'post': 'replica', 'session': 'default'})
+        self.assertEqual(router.db_for_write(Post), 'default')
+        self.assertEqual(router.db_for_read(Post), 'default')
+
+    def test_other_requests_read_from_primary(self):
+        """Формы и изменяющие запросы читают основную базу."""
+        requests = (
+            self.factory.get(reverse('posts:post_create')),
+            self.factory.post(reverse('posts:index')),
+        )
+        for request in requests:
+            with self.subTest(method=request.method, path=request.path):
+                self.run_view(request)
+                self.assertEqual(self.reads['post'], 'default')
+
+    def test_writes_pin_reader_to_primary(self):
+        """После записи пользователь читает свои изменения с основной базы."""
+        user = User.objects.create_user(username='UM')
+        post = Post.objects.create(text='Тестовый пост', author=user)
+        self.client.force_login(user)
+        response = self.client.post(
+            reverse('posts:add_comment', args=(post.pk,)),
+            {'text': 'Новый комментарий'},
+        )
+        self.assertIn(PRIMARY_COOKIE, response.cookies)
+        response = self.client.get(
+            reverse('posts:post_detail', args=(post.pk,))
+        )
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertContains(response, 'Новый комментарий')
+
+        request = self.factory.get(reverse('posts:index'))
+        request.COOKIES[PRIMARY_COOKIE] = '1'
+        self.run_view(request)
+        self.assertEqual(self.reads['post'], 'default')
+
+
+class LaggingReplicaTest(TransactionTestCase):
+    """Реплика — отдельный файл SQLite, снятый до последних изменений.
+    Снимок делается вне транзакции, поэтому TransactionTestCase."""
+
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='author')
+        self.reader = User.objects.create_user(username='reader')
+        Post.objects.create(text='Старый пост', author=self.author)
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        name = os.path.join(directory, 'replica.sqlite3')
+        with connection.cursor() as cursor:
+            cursor.execute('VACUUM INTO %s', [name])
+        connections.databases['lagging'] = dict(
+            connections.databases['default'], NAME=name, TEST={}
+        )
+        self.addCleanup(self.drop_replica)
+        settings = override_settings(DATABASE_REPLICAS=['lagging'])
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def drop_replica(self):
+        connections['lagging'].close()
+        delattr(connections._connections, 'lagging')
+        del connections.databases['lagging']
+
+    def test_cached_feed_is_built_from_primary(self):
+        """Страница ленты, которая ложится в кеш, собирается с основной
+        базы, хотя запрос читает с реплики."""
+        post = Post.objects.create(text='Новый пост', author=self.author)
+        self.assertFalse(
+            Post.objects.using('lagging').filter(pk=post.pk).exists()
+        )
+        for _ in range(2):
+            response = self.client.get(reverse('posts:index'))
+            self.assertIn(post, response.context['page_obj'])
+
+    def test_follow_pins_reader_and_graph_to_primary(self):
+        """Подписка по GET закрепляет пользователя за основной базой,
+        а множество подписок в кеш кладётся с основной базы."""
+        self.client.force_login(self.reader)
+        response = self.client.get(
+            reverse('posts:profile_follow', args=(self.author.username,))
+        )
+        self.assertIn(PRIMARY_COOKIE, response.cookies)
+        self.assertFalse(Follow.objects.using('lagging').exists())
+        client = Client()
+        client.force_login(self.reader)
+        response = client.get(
+            reverse('posts:profile', args=(self.author.username,))
+        )
+        self.assertTrue(response.context['following'])
+
+
+class SqlitePragmasTest(SimpleTestCase):
+    def test_new_connection_is_tuned(self):
+        """Новое соединение с SQLite получает WAL и таймаут ожидания."""
+        if connection.vendor != 'sqlite':
+            self.skipTest('Только для SQLite')
+        with tempfile.TemporaryDirectory() as directory:
+            wrapper = DatabaseWrapper(dict(
+                connection.settings_dict,
+                NAME=os.path.join(directory, 'db.sqlite3'),
+            ))
+            try:
+                wrapper.ensure_connection()
+                pragmas = {
+                    pragma: wrapper.connection.execute(
+                        f'PRAGMA {pragma}'
+                    ).fetchone()[0]
+                    for pragma in ('journal_mode', 'synchronous',
+                                   'busy_timeout')
+                }
+            finally:
+                wrapper.close()
+        self.assertEqual(pragmas, {
+            'journal_mode': 'wal', 'synchronous': 1, 'busy_timeout': 5000
+        })
+
+
+class StampedeProtectionTest(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.calls = 0
+
+    def compute(self):
+        self.calls += 1
+        time.sleep(0.1)
+        return self.calls
+
+    def test_single_flight(self):
+        """Пустой ключ пересчитывает один поток, остальные ждут его."""
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(
+                get_or_set('key', self.compute, 60)
+            ))
+            for _ in range(8)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(results, [1] * 8)
+
+    def test_stale_value_while_recomputing(self):
+        """Пока другой процесс пересчитывает ключ, отдаётся прежнее
+        значение."""
+        get_or_set('key', self.compute, 0)
+        cache.add(LOCK_KEY.format('key'), 1)
+        self.assertEqual(get_or_set('key', self.compute, 60), 1)
+        self.assertEqual(self.calls, 1)
+
+    @override_settings(CACHE_LOCK_WAIT=0.1)
+    def test_lock_holder_gone(self):
+        """Если держатель блокировки пропал, значение считается всё равно."""
+        cache.add(LOCK_KEY.format('key'), 1)
+        self.assertEqual(get_or_set('key', self.compute, 60), 1)
+
+    def test_early_recomputation(self):
+        """Свежее значение не пересчитывается, просроченное — да."""
+        get_or_set('key', self.compute, 60)
+        self.assertEqual(get_or_set('key', self.compute, 60), 1)
+        get_or_set('other', self.compute, 0)
+        self.assertEqual(get_or_set('other', self.compute, 60), 3)
+
+
+@override_settings(RATE_LIMITS={
+    'add_comment': {'user': (3, 60), 'ip': (5, 60)},
+    'profile_follow': {'user': (1, 60)},
+})
+class RateLimitTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='user')
+        cls.other = User.objects.create_user(username='other')
+        cls.post = Post.objects.create(text='Тестовый пост', author=cls.user)
+
+    def setUp(self):
+        cache.clear()
+        self.factory = RequestFactory()
+
+    def request(self, user, address='10.0.0.1'):
+        request = self.factory.post('/', REMOTE_ADDR=address)
+        request.user = user
+        return request
+
+    def test_bucket_allows_burst_then_refills(self):
+        """Корзина пропускает столько запросов, сколько в ней маркеров,
+        и пополняется со временем."""
+        now = time.time()
+        with mock.patch('core.ratelimit.time.time', return_value=now):
+            for _ in range(3):
+                self.assertIsNone(
+                    ratelimit.check(self.request(self.user), 'add_comment')
+                )
+            retry_after = ratelimit.check(
+                self.request(self.user), 'add_comment'
+            )
+        self.assertAlmostEqual(retry_after, 20)
+        with mock.patch('core.ratelimit.time.time', return_value=now + 20):
+            self.assertIsNone(
+                ratelimit.check(self.request(self.user), 'add_comment')
+            )
+            self.assertIsNotNone(
+                ratelimit.check(self.request(self.user), 'add_comment')
+            )
+
+    def test_user_and_ip_buckets(self):
+        """Пользователи делят корзину своего IP, но не свои корзины."""
+        for _ in range(3):
+            ratelimit.check(self.request(self.user), 'add_comment')
+        self.assertIsNotNone(
+            ratelimit.check(self.request(self.user), 'add_comment')
+        )
+        for _ in range(2):
+            self.assertIsNone(
+                ratelimit.check(self.request(self.other), 'add_comment')
+            )
+        self.assertIsNotNone(
+            ratelimit.check(self.request(self.other), 'add_comment')
+        )
+        self.assertIsNone(ratelimit.check(
+            self.request(self.other, '10.0.0.2'), 'add_comment'
+        ))
+
+    @override_settings(TRUSTED_PROXIES=['10.0.0.1'])
+    def test_ip_bucket_behind_proxy(self):
+        """За доверенным прокси у каждого клиента своя корзина IP."""
+        def check(forwarded):
+            request = self.request(AnonymousUser())
+            request.META['HTTP_X_FORWARDED_FOR'] = forwarded
+            return ratelimit.check(request, 'add_comment')
+
+        for _ in range(5):
+            self.assertIsNone(check('203.0.113.1'))
+        self.assertIsNotNone(check('203.0.113.1'))
+        self.assertIsNone(check('203.0.113.2'))
+
+    def test_views_answer_429(self):
+        """Представления записи отвечают 429 со страницей core/429.html."""
+        client = Client()
+        client.force_login(self.other)
+        url = reverse('posts:profile_follow', args=(self.user.username,))
+        client.get(url)
+        response = client.get(
+            reverse('posts:profile_unfollow', args=(self.user.username,))
+        )
+        self.assertEqual(response.status_code, HTTPStatus.TOO_MANY_REQUESTS)
+        self.assertTemplateUsed(response, 'core/429.html')
+        self.assertEqual(response['Retry-After'], '60')
+        self.assertTrue(
+            Follow.objects.filter(user=self.other, author=self.user).exists()
+        )
+        response = client.post(
+            reverse('api:follow', args=(self.user.username,))
+        )
+        self.assertEqual(response.status_code, HTTPStatus.TOO_MANY_REQUESTS)
+        self.assertEqual(response.json()['retry_after'], 60)
+
+    @override_settings(RATE_LIMIT_ENABLED=False)
+    def test_disabled(self):
+        for _ in range(10):
+            self.assertIsNone(
+                ratelimit.check(self.request(self.user), 'add_comment')
+            )
@@ -0,0 +1,32 @@
+from django.conf import settings
+from django.core.exceptions import RequestDataTooBig
+from django.core.files.uploadhandler import FileUploadHandler
+
+
+class UploadLimitHandler(FileUploadHandler):
+    """Отклонить загрузку больше IMAGE_UPLOAD_MAX_SIZE, не дочитывая её.
+
+    Стоит первым в FILE_UPLOAD_HANDLERS. Запрос с заведомо большим
+    Content-Length отклоняется до чтения тела, а файл без длины или
+    с неверной длиной — на первом фрагменте сверх лимита. Ответ — 400,
+    как при превышении DATA_UPLOAD_MAX_MEMORY_SIZE. Файлы в пределах
+    лимита дальше проверяет форма (PostForm.clean_image).
+    """
+
+    def handle_raw_input(self, input_data, META, content_length, boundary,
+                         encoding=None):
+        # Кроме файла, в теле есть обычные поля формы, их размер
+        # ограничен DATA_UPLOAD_MAX_MEMORY_SIZE.
+        limit = settings.IMAGE_UPLOAD_MAX_SIZE + (
+            settings.DATA_UPLOAD_MAX_MEMORY_SIZE or 0
+        )
+        if content_length > limit:
+            raise RequestDataTooBig('Загрузка больше допустимого размера.')
+
+    def receive_data_chunk(self, raw_data, start):
+        if start + len(raw_data) > settings.IMAGE_UPLOAD_MAX_SIZE:
+            raise RequestDataTooBig('Файл больше допустимого размера.')
+        return raw_data
+
+    def file_complete(self, file_size):
+        return None
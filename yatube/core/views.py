@@ -1,11 +1,25 @@
+import math
+
+from django.conf import settings
+from django.http import Http404, HttpResponse, JsonResponse
 from django.shortcuts import render
 
+from . import metrics
+from .proxies import client_ip
+
 
 def page_not_found(request, exception):
     return render(request, 'core/404.html', {'path': request.path}, status=404)
 
 
 def csrf_failure(request, reason=''):
+    match = request.resolver_match
+    if match and match.app_name == 'api':
+        return JsonResponse(
+            {'detail': 'Ошибка проверки CSRF', 'reason': reason},
+            status=403,
+            json_dumps_params={'ensure_ascii': False},
+        )
     return render(request, 'core/403csrf.html')
 
 
@@ -15,3 +29,21 @@ def server_error(request):
 
 def permission_denied(request, exception):
     return render(request, 'core/403.html', status=403)
+
+
+def too_many_requests(request, retry_after):
+    response = render(
+        request, 'core/429.html', {'retry_after': math.ceil(retry_after)},
+        status=429,
+    )
+    response['Retry-After'] = str(math.ceil(retry_after))
+    return response
+
+
+def metrics_view(request):
+    if client_ip(request) not in settings.METRICS_ALLOWED_IPS:
+        raise Http404
+    return HttpResponse(
+        metrics.registry.export(),
+        content_type='text/plain; version=0.0.4; charset=utf-8',
+    )
@@ -0,0 +1,21 @@
+from django.contrib import admin
+
+from .models import Job
+
+
+class JobAdmin(admin.ModelAdmin):
+    list_display = (
+        'pk',
+        'name',
+        'status',
+        'attempts',
+        'run_at',
+        'locked_by',
+    )
+    list_filter = ('status', 'name')
+    # Аргументы задач могут содержать личные данные.
+    exclude = ('payload',)
+    empty_value_display = '-пусто-'
+
+
+admin.site.register(Job, JobAdmin)
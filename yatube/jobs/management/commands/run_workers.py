@@ -0,0 +1,48 @@
+import multiprocessing
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from jobs import queue
+
+
+def serve(burst):
+    connections.close_all()
+    queue.work(burst=burst)
+
+
+class Command(BaseCommand):
+    help = 'Запускает исполнителей фоновых задач'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--processes',
+            type=int,
+            default=1,
+            help='Число процессов-исполнителей',
+        )
+        parser.add_argument(
+            '--burst',
+            action='store_true',
+            help='Выйти, когда очередь опустеет',
+        )
+
+    def handle(self, *args, **options):
+        if options['processes'] == 1:
+            processed = queue.work(burst=options['burst'])
+            self.stdout.write(f'Выполнено задач: {processed}')
+            return
+        # Дочерние процессы не должны делить соединение с родителем.
+        connections.close_all()
+        workers = [
+            multiprocessing.Process(target=serve, args=(options['burst'],))
+            for _ in range(options['processes'])
+        ]
+        for worker in workers:
+            worker.start()
+        try:
+            for worker in workers:
+                worker.join()
+        except KeyboardInterrupt:
+            for worker in workers:
+                worker.terminate()
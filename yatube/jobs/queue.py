@@ -0,0 +1,122 @@
+import importlib
+import json
+import logging
+import os
+import socket
+import time
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+
+def task(func):
+    """Разрешить запуск функции через очередь: func.delay(*args)."""
+    func.task_name = f'{func.__module__}:{func.__qualname__}'
+
+    def delay(*args, **kwargs):
+        return enqueue(func, *args, **kwargs)
+
+    func.delay = delay
+    return func
+
+
+def resolve(name):
+    module_name, _, func_name = name.partition(':')
+    func = getattr(importlib.import_module(module_name), func_name)
+    if getattr(func, 'task_name', None) != name:
+        raise LookupError(f'{name} не зарегистрирована как задача')
+    return func
+
+
+def enqueue(func, *args, **kwargs):
+    """Поставить задачу в очередь.
+
+    Строка задачи пишется в текущей транзакции, поэтому исполнители
+    увидят её только вместе с данными, которые её породили. В режиме
+    JOBS_ALWAYS_EAGER задача выполняется сразу, в этом же потоке.
+    """
+    if settings.JOBS_ALWAYS_EAGER:
+        func(*args, **kwargs)
+        return None
+    return Job.objects.create(
+        name=func.task_name,
+        payload=json.dumps([args, kwargs]),
+        max_attempts=settings.JOBS_MAX_ATTEMPTS,
+    )
+
+
+def worker_name():
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+def claim(worker):
+    """Забрать одну готовую задачу; None, если очередь пуста."""
+    now = timezone.now()
+    stale = now - timedelta(seconds=settings.JOBS_LOCK_TIMEOUT)
+    ready = Job.objects.filter(
+        Q(status=Job.PENDING, run_at__lte=now)
+        | Q(status=Job.RUNNING, locked_at__lt=stale)
+    )
+    for job in ready.order_by('run_at')[:settings.JOBS_CLAIM_BATCH]:
+        claimed = Job.objects.filter(
+            pk=job.pk, status=job.status, locked_at=job.locked_at
+        ).update(
+            status=Job.RUNNING,
+            locked_by=worker,
+            locked_at=now,
+            attempts=F('attempts') + 1,
+        )
+        if claimed:
+            job.refresh_from_db()
+            return job
+    return None
+
+
+def backoff(attempts):
+    return timedelta(
+        seconds=settings.JOBS_RETRY_DELAY * 2 ** (attempts - 1)
+    )
+
+
+def execute(job):
+    try:
+        args, kwargs = json.loads(job.payload)
+        resolve(job.name)(*args, **kwargs)
+    except Exception:
+        error = traceback.format_exc()
+        logger.warning('Задача %s упала:\n%s', job, error)
+        if job.attempts < job.max_attempts:
+            job.status = Job.PENDING
+            job.run_at = timezone.now() + backoff(job.attempts)
+        else:
+            job.status = Job.FAILED
+        job.locked_by = ''
+        job.locked_at = None
+        job.last_error = error
+        job.save()
+        return False
+    job.delete()
+    return True
+
+
+def work(worker=None, burst=False, wait=None):
+    """Выполнять задачи; при burst=True — пока очередь не опустеет."""
+    worker = worker or worker_name()
+    wait = settings.JOBS_POLL_INTERVAL if wait is None else wait
+    processed = 0
+    while True:
+        job = claim(worker)
+        if job is None:
+            if burst:
+                return processed
+            time.sleep(wait)
+            continue
+        execute(job)
+        processed += 1
@@ -0,0 +1,76 @@
+from datetime import timedelta
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from . import queue
+from .models import Job
+
+CALLS = []
+
+
+@queue.task
+def record(value):
+    CALLS.append(value)
+
+
+@queue.task
+def explode():
+    raise RuntimeError('Ошибка задачи')
+
+
+class QueueTests(TestCase):
+    def setUp(self):
+        CALLS.clear()
+
+    def test_enqueue_and_work(self):
+        """Задача ждёт в очереди и выполняется исполнителем."""
+        record.delay('значение')
+        self.assertEqual(CALLS, [])
+        self.assertEqual(Job.objects.count(), 1)
+        self.assertEqual(queue.work(burst=True), 1)
+        self.assertEqual(CALLS, ['значение'])
+        self.assertFalse(Job.objects.exists())
+
+    @override_settings(JOBS_ALWAYS_EAGER=True)
+    def test_eager_mode_runs_inline(self):
+        """В синхронном режиме задача выполняется сразу."""
+        record.delay('сразу')
+        self.assertEqual(CALLS, ['сразу'])
+        self.assertFalse(Job.objects.exists())
+
+    @override_settings(JOBS_MAX_ATTEMPTS=2, JOBS_RETRY_DELAY=10)
+    def test_failed_job_is_retried_with_backoff(self):
+        """Упавшая задача откладывается, а после лимита попыток — падает."""
+        with self.assertLogs('jobs.queue', 'WARNING'):
+            explode.delay()
+            queue.work(burst=True)
+        job = Job.objects.get()
+        self.assertEqual(job.status, Job.PENDING)
+        self.assertEqual(job.attempts, 1)
+        self.assertGreater(job.run_at, timezone.now() + timedelta(seconds=5))
+        self.assertIn('Ошибка задачи', job.last_error)
+        self.assertEqual(queue.work(burst=True), 0)
+        Job.objects.update(run_at=timezone.now())
+        with self.assertLogs('jobs.queue', 'WARNING'):
+            queue.work(burst=True)
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.FAILED)
+        self.assertEqual(job.attempts, 2)
+
+    @override_settings(JOBS_LOCK_TIMEOUT=60)
+    def test_stale_job_is_reclaimed(self):
+        """Задачу упавшего исполнителя забирает другой."""
+        record.delay('повтор')
+        Job.objects.update(
+            status=Job.RUNNING,
+            locked_by='умерший',
+            locked_at=timezone.now() - timedelta(minutes=5),
+        )
+        self.assertEqual(queue.work(burst=True), 1)
+        self.assertEqual(CALLS, ['повтор'])
+
+    def test_only_tasks_can_be_resolved(self):
+        """Из очереди нельзя вызвать произвольную функцию."""
+        with self.assertRaises(LookupError):
+            queue.resolve('os:getcwd')
@@ -0,0 +1,46 @@
+"""Кеш отрисованных карточек постов (posts/includes/post_list.html).
+
+Ключ карточки — id поста и отпечаток всего, что в ней видно: даты
+изменения поста (её сдвигают правка текста, смена группы и картинки,
+готовность превью), имени автора и адреса группы. Изменившаяся карточка
+получает новый ключ, старый просто истекает. Карточки страницы
+читаются из кеша одним get_many.
+"""
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.template.loader import get_template
+from django.utils.safestring import mark_safe
+
+CARD_KEY = 'card:{}:{}'
+CARD_TEMPLATE = 'posts/includes/post_list.html'
+
+
+def card_key(post):
+    group_slug = post.group.slug if post.group_id else ''
+    stamp = ':'.join((
+        post.updated.isoformat(),
+        post.author.username,
+        post.author.get_full_name(),
+        group_slug,
+    ))
+    return CARD_KEY.format(post.pk, hashlib.md5(stamp.encode()).hexdigest())
+
+
+def render_cards(posts):
+    """HTML карточек в порядке постов."""
+    posts = list(posts)
+    keys = [card_key(post) for post in posts]
+    cached = cache.get_many(keys)
+    template = get_template(CARD_TEMPLATE)
+    rendered = {}
+    cards = []
+    for post, key in zip(posts, keys):
+        card = cached.get(key)
+        if card is None:
+            card = rendered[key] = template.render({'post': post})
+        cards.append(mark_safe(card))
+    if rendered:
+        cache.set_many(rendered, settings.POST_CARD_CACHE_TIMEOUT)
+    return cards
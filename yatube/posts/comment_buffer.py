@@ -0,0 +1,218 @@
+"""Отложенная запись комментариев (write-behind).
+
+При COMMENT_WRITE_BEHIND представление проверяет форму и дописывает
+комментарий строкой JSON в локальный файл с fsync: принятый
+комментарий переживает падение процесса. Команда flush_comments раз
+в COMMENT_BUFFER_FLUSH_INTERVAL секунд пишет накопленное в базу
+bulk_create в одной транзакции; счётчики комментариев и кеш постов
+обновляются один раз на пост за сброс, а не на каждый комментарий.
+
+Писатели дописывают в буфер под разделяемой блокировкой, сброс под
+исключительной переименовывает его в пачку, так что строка не может
+попасть в уже прочитанный файл. Пачка удаляется после фиксации
+транзакции; если сброс упал между ними, уже записанные комментарии
+при следующем сбросе пропускаются. Буфер локальный: сброс запускается
+на той же машине, что и веб-процессы.
+
+Свои ещё не записанные комментарии автор видит сразу: они лежат в его
+сессии, пока не появятся в базе.
+"""
+import fcntl
+import json
+import logging
+import os
+import time
+from collections import Counter
+from datetime import datetime
+
+from django.conf import settings
+from django.db import router, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from . import feed_cache
+from .models import Comment, Post, User
+
+logger = logging.getLogger(__name__)
+
+BUFFER_NAME = 'comments.jsonl'
+LOCK_NAME = 'comments.lock'
+BATCH_PREFIX = 'batch-'
+PENDING_KEY = 'pending_comments'
+
+
+def path(name):
+    return os.path.join(settings.COMMENT_BUFFER_DIR, name)
+
+
+def lock(exclusive):
+    """Блокировка буфера; снимается закрытием возвращённого файла."""
+    os.makedirs(settings.COMMENT_BUFFER_DIR, exist_ok=True)
+    lock_file = open(path(LOCK_NAME), 'a')
+    fcntl.flock(lock_file, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+    return lock_file
+
+
+def enqueue(post, author, text):
+    """Дописать комментарий в буфер и вернуть его запись."""
+    entry = {
+        'post': post.pk,
+        'author': author.pk,
+        'text': text,
+        'queued': time.time(),
+    }
+    line = (json.dumps(entry, ensure_ascii=False) + '\n').encode()
+    with lock(exclusive=False):
+        # Один write с O_APPEND: строки параллельных писателей
+        # не перемешиваются.
+        fd = os.open(
+            path(BUFFER_NAME), os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644
+        )
+        try:
+            os.write(fd, line)
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+    return entry
+
+
+def batches():
+    os.makedirs(settings.COMMENT_BUFFER_DIR, exist_ok=True)
+    return sorted(
+        name for name in os.listdir(settings.COMMENT_BUFFER_DIR)
+        if name.startswith(BATCH_PREFIX)
+    )
+
+
+def rotate():
+    """Переименовать накопленный буфер в пачку для сброса."""
+    with lock(exclusive=True):
+        try:
+            os.rename(
+                path(BUFFER_NAME),
+                path(f'{BATCH_PREFIX}{time.time_ns()}.jsonl'),
+            )
+        except FileNotFoundError:
+            pass
+
+
+def read(name):
+    entries = []
+    with open(path(name), encoding='utf-8') as batch:
+        for line in batch:
+            try:
+                entries.append(json.loads(line))
+            except ValueError:
+                # Процесс упал посреди записи строки, до fsync: такой
+                # комментарий пользователю ещё не подтверждён.
+                logger.warning('Пропущена недописанная строка в %s', name)
+    return entries
+
+
+def queued_at(entry):
+    return datetime.fromtimestamp(entry['queued'], tz=timezone.utc)
+
+
+def unsaved(entries):
+    """Записи, которых ещё нет в базе: один запрос на все записи."""
+    if not entries:
+        return entries
+    saved = Counter(Comment.objects.filter(
+        post_id__in={entry['post'] for entry in entries},
+        author_id__in={entry['author'] for entry in entries},
+        created__gte=min(queued_at(entry) for entry in entries),
+    ).values_list('post_id', 'author_id', 'text'))
+    result = []
+    for entry in entries:
+        key = (entry['post'], entry['author'], entry['text'])
+        if saved[key]:
+            saved[key] -= 1
+        else:
+            result.append(entry)
+    return result
+
+
+def build(entries):
+    """Комментарии из записей; записи к удалённым постам и от удалённых
+    пользователей отбрасываются, как их отбросил бы каскад."""
+    post_ids = set(Post.objects.filter(
+        pk__in={entry['post'] for entry in entries}
+    ).values_list('pk', flat=True))
+    author_ids = set(User.objects.filter(
+        pk__in={entry['author'] for entry in entries}
+    ).values_list('pk', flat=True))
+    return [
+        Comment(
+            post_id=entry['post'], author_id=entry['author'],
+            text=entry['text'],
+        )
+        for entry in entries
+        if entry['post'] in post_ids and entry['author'] in author_ids
+    ]
+
+
+def flush_batch(name, recovered=False):
+    entries = read(name)
+    if recovered:
+        entries = unsaved(entries)
+    comments = build(entries) if entries else []
+    counts = Counter(comment.post_id for comment in comments)
+    now = timezone.now()
+    with transaction.atomic(using=router.db_for_write(Comment)):
+        Comment.objects.bulk_create(
+            comments, batch_size=settings.COMMENT_BUFFER_BATCH_SIZE
+        )
+        for post_id, count in counts.items():
+            Post.objects.filter(pk=post_id).update(
+                comments_count=F('comments_count') + count, updated=now
+            )
+    feed_cache.forget(Post, *counts)
+    os.remove(path(name))
+    return len(comments)
+
+
+def flush():
+    """Записать в базу всё накопленное; возвращает число комментариев.
+
+    Пачки, оставшиеся от прошлого сброса, проверяются на уже
+    записанные комментарии.
+    """
+    leftovers = set(batches())
+    rotate()
+    return sum(
+        flush_batch(name, recovered=name in leftovers) for name in batches()
+    )
+
+
+def remember(request, entry):
+    request.session[PENDING_KEY] = (
+        request.session.get(PENDING_KEY, []) + [entry]
+    )
+
+
+def pending(request, post):
+    """Свои комментарии к посту, которые ещё ждут записи в базу.
+
+    Записанные и устаревшие записи убираются из сессии; к базе запрос
+    идёт, только если у пользователя есть записи к этому посту.
+    """
+    if not request.user.is_authenticated:
+        return []
+    entries = request.session.get(PENDING_KEY)
+    if not entries:
+        return []
+    horizon = time.time() - settings.COMMENT_BUFFER_PENDING_TIMEOUT
+    entries = [entry for entry in entries if entry['queued'] > horizon]
+    mine = unsaved([entry for entry in entries if entry['post'] == post.pk])
+    kept = [
+        entry for entry in entries if entry['post'] != post.pk
+    ] + mine
+    if len(kept) != len(request.session[PENDING_KEY]):
+        request.session[PENDING_KEY] = kept
+    return [
+        Comment(
+            post=post, author=request.user, text=entry['text'],
+            created=queued_at(entry),
+        )
+        for entry in reversed(mine)
+    ]
@@ -0,0 +1,121 @@
+"""Валидаторы для условных GET-запросов (ETag и Last-Modified).
+
+Валидаторы считаются без отрисовки страницы и без лишних запросов
+к базе. Лентам соответствуют версии в кеше, которые сигналы сдвигают
+при любом изменении видимых в ленте постов. Для страниц группы,
+профиля и поста валидатор читает тот же объект, что и представление,
+и оставляет его в запросе, чтобы представление не читало его снова.
+В ETag входит пользователь: страницы отрисованы для него (шапка,
+кнопки подписки и редактирования).
+"""
+import hashlib
+
+from django.shortcuts import get_object_or_404
+
+from . import comment_buffer, feed_cache
+from .models import Group, Post, User
+
+STAMP = 'stamp:{}'
+
+
+def touch(*names):
+    for name in names:
+        feed_cache.bump_feed_version(STAMP.format(name))
+
+
+def touch_feeds(author_id, group_id):
+    """Отметить изменение поста в лентах, где он виден."""
+    names = ['index', f'author:{author_id}']
+    if group_id is not None:
+        names.append(f'group:{group_id}')
+    touch(*names)
+
+
+def stamps(*names):
+    return [feed_cache.feed_version(STAMP.format(name)) for name in names]
+
+
+def make_etag(request, *parts):
+    viewer = 0
+    if request.user.is_authenticated:
+        # Кнопки подписки на карточках лент зависят от подписок зрителя.
+        viewer = '{}:{}'.format(
+            request.user.pk, *stamps(f'follows:{request.user.pk}')
+        )
+    value = ':'.join(str(part) for part in (viewer, *parts))
+    return hashlib.md5(value.encode()).hexdigest()
+
+
+def remember(request, name, load):
+    """Объект, общий для валидатора и представления одного запроса."""
+    loaded = request.__dict__.setdefault('conditional_objects', {})
+    if name not in loaded:
+        loaded[name] = load()
+    return loaded[name]
+
+
+def get_group(request, slug):
+    return remember(
+        request, 'group', lambda: get_object_or_404(Group, slug=slug)
+    )
+
+
+def get_author(request, username):
+    return remember(request, 'author', lambda: get_object_or_404(
+        User.objects.select_related('profile'), username=username
+    ))
+
+
+def get_post(request, post_id):
+    return remember(request, 'post', lambda: get_object_or_404(
+        Post.objects.select_related('author__profile', 'group'), id=post_id
+    ))
+
+
+def get_pending(request, post):
+    return remember(
+        request, 'pending', lambda: comment_buffer.pending(request, post)
+    )
+
+
+def index_etag(request):
+    return make_etag(request, *stamps('index', 'users', 'groups'))
+
+
+def group_etag(request, slug):
+    group = get_group(request, slug)
+    return make_etag(
+        request, group.title, group.description, group.posts_count,
+        *stamps(f'group:{group.pk}', 'users'),
+    )
+
+
+def profile_etag(request, username):
+    author = get_author(request, username)
+    return make_etag(
+        request, author.username, author.get_full_name(),
+        *stamps(f'author:{author.pk}', 'groups'),
+    )
+
+
+def post_last_modified(request, post_id):
+    """Дата изменения поста, её сдвигают и новые комментарии.
+
+    Пока свои комментарии автора ждут записи, дата поста их не
+    учитывает: страница проверяется только по ETag.
+    """
+    post = get_post(request, post_id)
+    if get_pending(request, post):
+        return None
+    return post.updated
+
+
+def post_etag(request, post_id):
+    post = get_post(request, post_id)
+    profile = getattr(post.author, 'profile', None)
+    return make_etag(
+        request, post.updated.isoformat(), post.comments_count,
+        profile.posts_count if profile else 0,
+        len(get_pending(request, post)),
+        *stamps('users', 'groups'),
+    )
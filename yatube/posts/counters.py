@@ -0,0 +1,52 @@
+from django.db import transaction
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from .models import Comment, Follow, Group, Post, Profile, User
+
+
+def count_of(queryset, field, outer='pk'):
+    """Подзапрос с количеством строк queryset для OuterRef(outer)."""
+    return Coalesce(
+        Subquery(
+            queryset.filter(**{field: OuterRef(outer)})
+            .order_by()
+            .values(field)
+            .annotate(total=Count('pk'))
+            .values('total'),
+            output_field=IntegerField(),
+        ),
+        0,
+    )
+
+
+def mismatches():
+    """Записи, у которых сохранённый счётчик расходится с реальным."""
+    return {
+        'profiles': Profile.objects.annotate(
+            actual=count_of(Post.objects, 'author', 'user')
+        ).exclude(posts_count=F('actual')),
+        'followers': Profile.objects.annotate(
+            actual=count_of(Follow.objects, 'author', 'user')
+        ).exclude(followers_count=F('actual')),
+        'groups': Group.objects.annotate(
+            actual=count_of(Post.objects, 'group')
+        ).exclude(posts_count=F('actual')),
+        'posts': Post.objects.annotate(
+            actual=count_of(Comment.objects, 'post')
+        ).exclude(comments_count=F('actual')),
+    }
+
+
+@transaction.atomic
+def rebuild():
+    Profile.objects.bulk_create(
+        Profile(user=user)
+        for user in User.objects.filter(profile__isnull=True)
+    )
+    Profile.objects.update(
+        posts_count=count_of(Post.objects, 'author', 'user'),
+        followers_count=count_of(Follow.objects, 'author', 'user'),
+    )
+    Group.objects.update(posts_count=count_of(Post.objects, 'group'))
+    Post.objects.update(comments_count=count_of(Comment.objects, 'post'))
@@ -0,0 +1,123 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+from core.cache import get_or_set
+from core.db import primary
+
+from . import follow_graph
+from .models import Group, Post, User
+from .utils import CursorPage, get_paginator
+
+VERSION_KEY = 'feed:{}:version'
+PAGE_KEY = 'feed:{}:{}:{}'
+OBJECT_KEYS = {
+    Post: 'post:{}',
+    User: 'author:{}',
+    Group: 'group:{}',
+}
+
+
+def feed_version(feed):
+    key = VERSION_KEY.format(feed)
+    version = cache.get(key)
+    if version is None:
+        # Начальная версия от времени, чтобы после вытеснения ключа
+        # не вернуться к номеру, под которым уже лежат старые страницы.
+        version = int(time.time() * 1000)
+        if not cache.add(key, version, settings.FEED_VERSION_TIMEOUT):
+            version = cache.get(key, version)
+    return version
+
+
+def bump_feed_version(feed):
+    try:
+        cache.incr(VERSION_KEY.format(feed))
+    except ValueError:
+        feed_version(feed)
+
+
+def forget(model, *pks):
+    cache.delete_many([OBJECT_KEYS[model].format(pk) for pk in pks])
+
+
+def load(model, pks):
+    """Объекты по списку pk: из кеша, недостающие — одним запросом."""
+    template = OBJECT_KEYS[model]
+    keys = {pk: template.format(pk) for pk in pks}
+    cached = cache.get_many(keys.values())
+    found = {
+        pk: cached[key] for pk, key in keys.items() if key in cached
+    }
+    missing = [pk for pk in keys if pk not in found]
+    if missing:
+        fetched = primary(model.objects).in_bulk(missing)
+        cache.set_many(
+            {keys[pk]: obj for pk, obj in fetched.items()},
+            settings.FEED_CACHE_TIMEOUT,
+        )
+        found.update(fetched)
+    return found
+
+
+def load_posts(ids):
+    posts = load(Post, ids)
+    authors = load(User, {post.author_id for post in posts.values()})
+    groups = load(Group, {
+        post.group_id for post in posts.values() if post.group_id
+    })
+    result = []
+    for pk in ids:
+        post = posts.get(pk)
+        if post is None:
+            continue
+        post.author = authors[post.author_id]
+        post.group = groups.get(post.group_id)
+        result.append(post)
+    return result
+
+
+def pages(queryset, request, feed):
+    """Аналог utils.pages, который хранит в кеше только id постов
+    страницы, а сами посты, авторов и группы — отдельными ключами."""
+    paginator, page_number = get_paginator(primary(queryset), request)
+    position = hashlib.md5(
+        f'{type(paginator).__name__}:{page_number}'.encode()
+    ).hexdigest()
+    key = PAGE_KEY.format(feed, feed_version(feed), position)
+    built = {}
+
+    def build():
+        page_obj = built['page_obj'] = paginator.get_page(page_number)
+        meta = {'ids': [post.pk for post in page_obj]}
+        if isinstance(page_obj, CursorPage):
+            meta['next'] = page_obj.next_cursor
+            meta['previous'] = page_obj.previous_cursor
+        else:
+            meta['count'] = paginator.count
+        return meta
+
+    # После смены версии ленты страницу пересчитывает один запрос,
+    # а не все, кто пришёл за ней одновременно.
+    meta = get_or_set(key, build, settings.FEED_CACHE_TIMEOUT)
+    if built:
+        page_obj = built['page_obj']
+    else:
+        posts = load_posts(meta['ids'])
+        if 'count' in meta:
+            paginator.count = meta['count']
+            page_obj = paginator.get_page(page_number)
+            page_obj.object_list = posts
+        else:
+            page_obj = CursorPage(
+                posts, paginator, meta['next'], meta['previous']
+            )
+    # Посты страницы общие для всех, подписки — свои у каждого.
+    follow_graph.mark_following(request.user, page_obj)
+    return {
+        'paginator': paginator,
+        'page_number': page_number,
+        'page_obj': page_obj,
+    }
@@ -0,0 +1,151 @@
+"""Граф подписок: множества id авторов, на которых подписан
+пользователь, и id его подписчиков.
+
+Множество хранится в кеше упакованным массивом 64-битных id (8 байт
+на подписку) и сбрасывается сигналами при подписке и отписке.
+Слишком большие множества (популярные авторы) в кеш не кладутся
+и читаются из базы.
+"""
+from array import array
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, router, transaction
+from django.db.models.signals import post_save
+
+from core.db import primary
+
+from .models import Follow, Profile, User
+
+FOLLOWEES_KEY = 'follow:followees:{}'
+FOLLOWERS_KEY = 'follow:followers:{}'
+
+
+def pack(ids):
+    return array('q', sorted(ids)).tobytes()
+
+
+def unpack(packed):
+    ids = array('q')
+    ids.frombytes(packed)
+    return frozenset(ids)
+
+
+def load(key, queryset):
+    packed = cache.get(key)
+    if packed is not None:
+        return unpack(packed)
+    ids = frozenset(primary(queryset))
+    if len(ids) <= settings.FOLLOW_GRAPH_CACHE_LIMIT:
+        cache.set(key, pack(ids), settings.FOLLOW_GRAPH_TIMEOUT)
+    return ids
+
+
+def followee_ids(user_id):
+    """id авторов, на которых подписан пользователь."""
+    return load(
+        FOLLOWEES_KEY.format(user_id),
+        Follow.objects.filter(user_id=user_id).values_list(
+            'author_id', flat=True
+        ),
+    )
+
+
+def follower_ids(author_id):
+    return load(
+        FOLLOWERS_KEY.format(author_id),
+        Follow.objects.filter(author_id=author_id).values_list(
+            'user_id', flat=True
+        ),
+    )
+
+
+def forget(user_id, author_id):
+    keys = [FOLLOWEES_KEY.format(user_id), FOLLOWERS_KEY.format(author_id)]
+    cache.delete_many(keys)
+    # Параллельный запрос мог прочитать граф до фиксации транзакции
+    # и положить в кеш старое множество: сбросить ещё раз после неё.
+    transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def forget_many(follows):
+    """Сбросить множества для пар (подписчик, автор) разом."""
+    keys = set()
+    for user_id, author_id in follows:
+        keys.add(FOLLOWEES_KEY.format(user_id))
+        keys.add(FOLLOWERS_KEY.format(author_id))
+    cache.delete_many(list(keys))
+
+
+def is_following(user, author_id):
+    if not user.is_authenticated:
+        return False
+    return author_id in followee_ids(user.pk)
+
+
+def is_following_many(user, author_ids):
+    """{id автора: подписан ли пользователь} одним чтением графа."""
+    if not user.is_authenticated:
+        return dict.fromkeys(author_ids, False)
+    followees = followee_ids(user.pk)
+    return {author_id: author_id in followees for author_id in author_ids}
+
+
+def mark_following(user, posts):
+    """Отметить у постов страницы, подписан ли пользователь на их
+    авторов (post.following_author): одно чтение графа на страницу,
+    сколько бы разных авторов на ней ни было."""
+    following = is_following_many(user, {post.author_id for post in posts})
+    for post in posts:
+        post.following_author = following[post.author_id]
+
+
+def follower_counts(author_ids):
+    """{id автора: число подписчиков} одним запросом к профилям."""
+    counts = dict.fromkeys(author_ids, 0)
+    counts.update(Profile.objects.filter(
+        user_id__in=counts
+    ).values_list('user_id', 'followers_count'))
+    return counts
+
+
+def follow_many(user, author_ids):
+    """Подписать пользователя на несколько авторов разом.
+
+    Уже существующие подписки читаются из базы внутри транзакции, а не
+    из кеша графа: он может отставать. Подписки пишутся одним
+    bulk_create; bulk_create не отправляет сигналов, поэтому post_save
+    отправляется для каждой новой подписки вручную: счётчики, ленты
+    и кеши обновляются как при обычной подписке. Если параллельный
+    запрос успел подписать на кого-то из них, подписки создаются по
+    одной и сигналы получают только действительно созданные.
+    Возвращает id авторов, подписка на которых появилась.
+    """
+    candidates = set(author_ids) - {user.pk}
+    using = router.db_for_write(Follow)
+    with transaction.atomic(using=using):
+        existing = set(Follow.objects.using(using).filter(
+            user=user, author_id__in=candidates
+        ).values_list('author_id', flat=True))
+        new_ids = sorted(User.objects.using(using).filter(
+            pk__in=candidates - existing
+        ).values_list('pk', flat=True))
+        follows = [
+            Follow(user=user, author_id=author_id) for author_id in new_ids
+        ]
+        try:
+            with transaction.atomic(using=using):
+                Follow.objects.using(using).bulk_create(follows)
+        except IntegrityError:
+            return [
+                author_id for author_id in new_ids
+                if Follow.objects.using(using).get_or_create(
+                    user=user, author_id=author_id
+                )[1]
+            ]
+        for follow in follows:
+            post_save.send(
+                Follow, instance=follow, created=True, update_fields=None,
+                raw=False, using=using,
+            )
+    return new_ids
@@ -1,4 +1,6 @@
 from django import forms
+from django.conf import settings
+from django.template.defaultfilters import filesizeformat
 
 from .models import Post, Comment
 
@@ -8,6 +10,38 @@ class PostForm(forms.ModelForm):
         model = Post
         fields = ('text', 'group', 'image',)
 
+    def clean_image(self):
+        """Ограничить размер файла и число пикселей.
+
+        Поле уже прочитало заголовок картинки, но не распаковывало её:
+        декомпрессионная бомба отклоняется раньше, чем займёт память
+        исполнителя, который пережимает оригинал.
+        """
+        image = self.cleaned_data['image']
+        # При правке без новой картинки здесь сохранённый файл поста.
+        if not image or self.add_prefix('image') not in self.files:
+            return image
+        if image.size > settings.IMAGE_UPLOAD_MAX_SIZE:
+            raise forms.ValidationError(
+                'Файл больше %(limit)s.',
+                code='file_too_big',
+                params={
+                    'limit': filesizeformat(settings.IMAGE_UPLOAD_MAX_SIZE)
+                },
+            )
+        width, height = image.image.size
+        if width * height > settings.IMAGE_MAX_PIXELS:
+            raise forms.ValidationError(
+                'Картинка %(width)s×%(height)s больше %(limit)s Мпикс.',
+                code='too_many_pixels',
+                params={
+                    'width': width,
+                    'height': height,
+                    'limit': settings.IMAGE_MAX_PIXELS // 10 ** 6,
+                },
+            )
+        return image
+
 
 class CommentForm(forms.ModelForm):
     class Meta:
@@ -0,0 +1,118 @@
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.test import Client, override_settings
+from django.urls import reverse
+
+from core import benchmark
+from posts.models import Post
+
+# Настройки SQLite по умолчанию: журнал отката и полная синхронизация.
+ROLLBACK_JOURNAL = {'journal_mode': 'DELETE', 'synchronous': 'FULL'}
+
+
+class Command(BaseCommand):
+    help = (
+        'Параллельные чтения и записи из потоков через тестовые клиенты: '
+        'SQLite с журналом отката против настроек SQLITE_PRAGMAS. '
+        'Пишет комментарии в базу — запускайте на тестовых данных.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--readers', type=int, default=8)
+        parser.add_argument('--writers', type=int, default=4)
+        parser.add_argument(
+            '--duration', type=float, default=5,
+            help='Длительность каждого прогона, секунды',
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('Бенчмарк сравнивает режимы SQLite')
+        post = Post.objects.select_related('author').first()
+        if post is None:
+            raise CommandError('База пуста, сначала запустите seed_posts')
+        modes = {
+            'rollback journal': ROLLBACK_JOURNAL,
+            'SQLITE_PRAGMAS': settings.SQLITE_PRAGMAS,
+        }
+        for mode, pragmas in modes.items():
+            # Режим журнала меняется, только когда других соединений нет.
+            connections.close_all()
+            with override_settings(SQLITE_PRAGMAS=pragmas):
+                results = self.run(post, options)
+            connections.close_all()
+            self.stdout.write(f'\n{mode}:')
+            self.stdout.write(benchmark.format_table(
+                results, ('requests', 'per_second', 'errors',
+                          'p50', 'p95', 'p99')
+            ))
+
+    def run(self, post, options):
+        detail = reverse('posts:post_detail', args=(post.pk,))
+        profile = reverse('posts:profile', args=(post.author.username,))
+        comment = reverse('posts:add_comment', args=(post.pk,))
+
+        def read(client, number):
+            return client.get(detail if number % 2 else profile)
+
+        def write(client, number):
+            return client.post(comment, {'text': f'Комментарий {number}'})
+
+        workers = [('read', read, Client()) for _ in range(options['readers'])]
+        for _ in range(options['writers']):
+            client = Client()
+            client.force_login(post.author)
+            workers.append(('write', write, client))
+        connections.close_all()
+
+        reports = []
+        deadline = time.perf_counter() + options['duration']
+        threads = [
+            threading.Thread(
+                target=self.drive,
+                args=(kind, request, client, deadline, reports),
+            )
+            for kind, request, client in workers
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        results = {}
+        for kind in ('read', 'write'):
+            timings = [
+                timing for report_kind, report_timings, _ in reports
+                if report_kind == kind for timing in report_timings
+            ]
+            row = benchmark.summarize(timings)
+            row['per_second'] = round(len(timings) / options['duration'], 1)
+            row['errors'] = sum(
+                failed for report_kind, _, failed in reports
+                if report_kind == kind
+            )
+            results[kind] = row
+        return results
+
+    def drive(self, kind, request, client, deadline, reports):
+        """Слать запросы до дедлайна; ошибки вроде «database is locked»
+        считаются отдельно от замеров."""
+        timings, failed = [], 0
+        try:
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                try:
+                    ok = request(client, len(timings)).status_code < 500
+                except Exception:
+                    ok = False
+                if ok:
+                    timings.append(time.perf_counter() - started)
+                else:
+                    failed += 1
+        finally:
+            connection.close()
+        reports.append((kind, timings, failed))
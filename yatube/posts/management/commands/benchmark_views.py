@@ -0,0 +1,135 @@
+import os
+import time
+import tracemalloc
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core import benchmark
+from posts.models import Group, Post, Profile
+
+DEFAULT_BASELINE = os.path.join(
+    settings.BASE_DIR, 'benchmarks', 'views.json'
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Прогоняет основные страницы через тестовый клиент и печатает '
+        'p50/p95/p99, число запросов к базе и пиковую память на запрос. '
+        'Сценарий add_comment пишет в базу: запускайте на тестовых данных '
+        '(см. seed_posts).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=100)
+        parser.add_argument('--warmup', type=int, default=5)
+        parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+        parser.add_argument(
+            '--save', action='store_true',
+            help='Записать результаты как новую базовую линию',
+        )
+        parser.add_argument(
+            '--tolerance', type=float, default=0.2,
+            help='Допустимое ухудшение времени и памяти, доля',
+        )
+        parser.add_argument(
+            '--only', nargs='*', default=None,
+            help='Запустить только указанные сценарии',
+        )
+
+    def handle(self, *args, **options):
+        scenarios = self.scenarios()
+        if options['only']:
+            scenarios = {
+                name: scenario for name, scenario in scenarios.items()
+                if name in options['only']
+            }
+        results = {}
+        # Сценарий add_comment быстро упёрся бы в лимит комментариев.
+        with override_settings(RATE_LIMIT_ENABLED=False):
+            for name, request in scenarios.items():
+                results[name] = self.measure(
+                    request, options['requests'], options['warmup']
+                )
+        self.stdout.write(benchmark.format_table(results))
+
+        if options['save']:
+            benchmark.save_baseline(options['baseline'], results)
+            self.stdout.write(self.style.SUCCESS(
+                f'Базовая линия сохранена в {options["baseline"]}'
+            ))
+            return
+        regressions = benchmark.compare(
+            results,
+            benchmark.load_baseline(options['baseline']),
+            options['tolerance'],
+        )
+        if regressions:
+            raise CommandError('Регрессии:\n' + '\n'.join(regressions))
+
+    def scenarios(self):
+        post = Post.objects.order_by('-comments_count').first()
+        group = Group.objects.order_by('-posts_count').first()
+        author = Profile.objects.select_related('user').order_by(
+            '-posts_count'
+        ).first()
+        reader = Profile.objects.annotate(
+            followees=Count('user__follower')
+        ).select_related('user').order_by('-followees').first()
+        if not (post and group and author and reader):
+            raise CommandError('База пуста, сначала запустите seed_posts')
+
+        guest = Client()
+        client = Client()
+        client.force_login(reader.user)
+        return {
+            'posts:index': lambda: guest.get(reverse('posts:index')),
+            'posts:group_list': lambda: guest.get(
+                reverse('posts:group_list', args=(group.slug,))
+            ),
+            'posts:profile': lambda: guest.get(
+                reverse('posts:profile', args=(author.user.username,))
+            ),
+            'posts:post_detail': lambda: guest.get(
+                reverse('posts:post_detail', args=(post.pk,))
+            ),
+            'posts:follow_index': lambda: client.get(
+                reverse('posts:follow_index')
+            ),
+            'posts:add_comment': lambda: client.post(
+                reverse('posts:add_comment', args=(post.pk,)),
+                {'text': 'Комментарий из бенчмарка'},
+            ),
+        }
+
+    def measure(self, request, requests, warmup):
+        for _ in range(warmup):
+            request()
+        timings = []
+        for _ in range(requests):
+            started = time.perf_counter()
+            response = request()
+            timings.append(time.perf_counter() - started)
+            if response.status_code >= 400:
+                raise CommandError(
+                    f'Ответ {response.status_code} на {response.request}'
+                )
+        summary = benchmark.summarize(timings)
+
+        # Запросы и память меряются отдельным прогоном: трассировка
+        # аллокаций сама замедляет код и исказила бы время.
+        tracemalloc.start()
+        with CaptureQueriesContext(connection) as queries:
+            request()
+        summary['memory_kb'] = round(
+            tracemalloc.get_traced_memory()[1] / 1024, 1
+        )
+        tracemalloc.stop()
+        summary['queries'] = len(queries)
+        return summary
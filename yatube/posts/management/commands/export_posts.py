@@ -0,0 +1,32 @@
+import sys
+
+from django.core.management.base import BaseCommand
+
+from posts import transfer
+
+WRITERS = {
+    'jsonl': transfer.write_jsonl,
+    'csv': transfer.write_csv,
+}
+
+
+class Command(BaseCommand):
+    help = 'Выгружает группы, посты, комментарии и подписки в JSON Lines/CSV'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'output', nargs='?', default='-',
+            help='Файл для выгрузки, по умолчанию stdout',
+        )
+        parser.add_argument('--format', choices=WRITERS, default='jsonl')
+        parser.add_argument('--chunk-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        records = transfer.export_records(options['chunk_size'])
+        write = WRITERS[options['format']]
+        if options['output'] == '-':
+            write(records, sys.stdout)
+            return
+        with open(options['output'], 'w', encoding='utf-8',
+                  newline='') as output:
+            write(records, output)
@@ -0,0 +1,38 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from posts import comment_buffer
+
+
+class Command(BaseCommand):
+    help = (
+        'Пишет в базу комментарии из буфера отложенной записи '
+        '(COMMENT_WRITE_BEHIND)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=settings.COMMENT_BUFFER_FLUSH_INTERVAL,
+            help='Пауза между сбросами, секунды',
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Сбросить буфер один раз и выйти',
+        )
+
+    def handle(self, *args, **options):
+        if options['once']:
+            total = comment_buffer.flush()
+            self.stdout.write(f'Записано комментариев: {total}')
+            return
+        while True:
+            started = time.monotonic()
+            comment_buffer.flush()
+            time.sleep(max(
+                0, options['interval'] - (time.monotonic() - started)
+            ))
@@ -0,0 +1,76 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError
+
+from posts import counters, timeline, transfer
+
+READERS = {
+    'jsonl': transfer.read_jsonl,
+    'csv': transfer.read_csv,
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Загружает группы, посты, комментарии и подписки из JSON Lines/CSV '
+        'пачками через bulk_create, затем пересчитывает счётчики и ленты.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'input', nargs='?', default='-',
+            help='Файл для загрузки, по умолчанию stdin',
+        )
+        parser.add_argument('--format', choices=READERS, default='jsonl')
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument(
+            '--ignore-conflicts', action='store_true',
+            help='Пропускать записи, которые уже есть в базе',
+        )
+        parser.add_argument(
+            '--skip-rebuild', action='store_true',
+            help=(
+                'Не пересчитывать счётчики и ленты (если дальше будут '
+                'ещё загрузки; потом запустите recount_posts --timelines)'
+            ),
+        )
+
+    def handle(self, *args, **options):
+        importer = transfer.Importer(
+            options['batch_size'], options['ignore_conflicts']
+        )
+        try:
+            counts = self.load(importer, options)
+            for kind, total in counts.items():
+                self.stdout.write(f'{kind}: {total}')
+            if not options['skip_rebuild']:
+                self.stdout.write('Пересчёт счётчиков и лент…')
+                counters.rebuild()
+                timeline.rebuild()
+        finally:
+            # После пересчёта: иначе запрос между сбросом и пересчётом
+            # закешировал бы страницу со старыми счётчиками.
+            importer.forget_cached()
+        self.stdout.write(self.style.SUCCESS('Готово'))
+
+    def load(self, importer, options):
+        read = READERS[options['format']]
+        try:
+            if options['input'] == '-':
+                return importer.load(read(sys.stdin))
+            with open(options['input'], encoding='utf-8',
+                      newline='') as lines:
+                return importer.load(read(lines))
+        except (KeyError, ValueError, TypeError) as error:
+            raise CommandError(f'Ошибка в записи: {error!r}')
+        except transfer.ConflictError as error:
+            raise CommandError(
+                f'{error}. Комментарии из файла попали бы к чужому посту; '
+                'загрузите данные в пустую базу'
+            )
+        except IntegrityError as error:
+            raise CommandError(
+                f'Запись противоречит данным в базе: {error}. Записи, '
+                'которые уже есть в базе, пропускает --ignore-conflicts'
+            )
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from posts import thumbnails
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = 'Нарезает превью для постов, у которых их ещё нет'
+
+    def handle(self, *args, **options):
+        posts = Post.objects.exclude(image='').filter(
+            thumbnails_ready=False
+        ).values_list('pk', 'image')
+        total = 0
+        for post_id, image_name in posts.iterator():
+            thumbnails.generate(post_id, image_name)
+            total += 1
+        self.stdout.write(self.style.SUCCESS(f'Обработано постов: {total}'))
@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import counters, timeline
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает счётчики постов и комментариев'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Только проверить счётчики, ничего не меняя',
+        )
+        parser.add_argument(
+            '--timelines',
+            action='store_true',
+            help=(
+                'Заново разложить посты по лентам подписок (после '
+                'import_posts --skip-rebuild)'
+            ),
+        )
+
+    def handle(self, *args, **options):
+        if not options['check']:
+            counters.rebuild()
+            if options['timelines']:
+                timeline.rebuild()
+        broken = {
+            name: queryset.count()
+            for name, queryset in counters.mismatches().items()
+        }
+        broken = {name: total for name, total in broken.items() if total}
+        if broken:
+            raise CommandError(
+                'Счётчики расходятся: ' + ', '.join(
+                    f'{name}={total}' for name, total in broken.items()
+                )
+            )
+        self.stdout.write(self.style.SUCCESS('Счётчики в порядке'))
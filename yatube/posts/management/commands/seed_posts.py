@@ -0,0 +1,155 @@
+import random
+from array import array
+from io import BytesIO
+from itertools import accumulate, islice
+
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from faker import Faker
+from PIL import Image
+
+from posts import counters, timeline
+from posts.models import Comment, Follow, Group, Post, User
+
+IMAGE_SIZE = (1280, 720)
+
+
+class Command(BaseCommand):
+    help = (
+        'Заполняет базу данными для бенчмарков. Объём для нагрузочного '
+        'стенда: --users 100000 --posts 5000000.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--posts', type=int, default=20000)
+        parser.add_argument('--groups', type=int, default=50)
+        parser.add_argument('--comments', type=int, default=20000)
+        parser.add_argument(
+            '--follows', type=int, default=20,
+            help='Среднее число подписок на пользователя',
+        )
+        parser.add_argument(
+            '--skew', type=float, default=1.1,
+            help='Показатель закона Ципфа для популярности авторов',
+        )
+        parser.add_argument(
+            '--images', type=float, default=0.1,
+            help='Доля постов с картинкой',
+        )
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        self.batch_size = options['batch_size']
+        self.random = random.Random(options['seed'])
+        self.fake = Faker('ru_RU')
+        self.fake.seed_instance(options['seed'])
+
+        start = User.objects.count()
+        password = make_password(None)
+        self.create(User, options['users'], lambda i: User(
+            username=f'bench{start + i}',
+            first_name=self.fake.first_name(),
+            last_name=self.fake.last_name(),
+            password=password,
+        ))
+        user_ids = self.ids(User)
+        # Чем выше место автора в случайном рейтинге, тем чаще он пишет
+        # и тем больше у него подписчиков.
+        self.random.shuffle(user_ids)
+        weights = list(accumulate(
+            1 / (rank + 1) ** options['skew']
+            for rank in range(len(user_ids))
+        ))
+
+        self.create(Group, options['groups'], lambda i: Group(
+            title=self.fake.catch_phrase()[:200],
+            slug=f'bench-{start}-{i}',
+            description=self.fake.paragraph(),
+        ))
+        group_ids = self.ids(Group)
+
+        images = self.images(options)
+        self.create(Post, options['posts'], lambda i: Post(
+            text=self.fake.paragraph(nb_sentences=5),
+            author_id=self.random.choices(user_ids, cum_weights=weights)[0],
+            group_id=(
+                self.random.choice(group_ids)
+                if group_ids and self.random.random() < 0.5 else None
+            ),
+            image=(
+                self.random.choice(images)
+                if images and self.random.random() < options['images']
+                else ''
+            ),
+        ))
+        post_ids = self.ids(Post)
+
+        if post_ids:
+            self.create(Comment, options['comments'], lambda i: Comment(
+                text=self.fake.sentence(),
+                author_id=self.random.choice(user_ids),
+                post_id=self.random.choice(post_ids),
+            ))
+        self.follow(user_ids, weights, options['follows'])
+
+        self.stdout.write('Пересчёт счётчиков и лент…')
+        counters.rebuild()
+        timeline.rebuild()
+        cache.clear()
+        self.stdout.write(self.style.SUCCESS('Готово'))
+
+    def ids(self, model):
+        pks = model.objects.values_list('pk', flat=True)
+        return array('q', pks.iterator())
+
+    def create(self, model, total, build):
+        for start in range(0, total, self.batch_size):
+            size = min(self.batch_size, total - start)
+            with transaction.atomic():
+                model.objects.bulk_create(
+                    [build(start + i) for i in range(size)]
+                )
+        self.stdout.write(f'{model._meta.verbose_name_plural}: {total}')
+
+    def follow(self, user_ids, weights, average):
+        pairs = (
+            (user_id, author_id)
+            for user_id in user_ids
+            for author_id in set(self.random.choices(
+                user_ids,
+                cum_weights=weights,
+                k=self.random.randint(0, 2 * average),
+            ))
+            if author_id != user_id
+        )
+        total = 0
+        while True:
+            batch = [
+                Follow(user_id=user_id, author_id=author_id)
+                for user_id, author_id in islice(pairs, self.batch_size)
+            ]
+            if not batch:
+                break
+            with transaction.atomic():
+                Follow.objects.bulk_create(batch, ignore_conflicts=True)
+            total += len(batch)
+        self.stdout.write(f'{Follow._meta.verbose_name_plural}: {total}')
+
+    def images(self, options):
+        if not options['images'] or not options['posts']:
+            return []
+        storage = Post._meta.get_field('image').storage
+        names = []
+        for i in range(5):
+            buffer = BytesIO()
+            color = tuple(self.random.randrange(256) for _ in range(3))
+            Image.new('RGB', IMAGE_SIZE, color).save(buffer, 'JPEG')
+            names.append(storage.save(
+                f'posts/bench_{i}.jpg', ContentFile(buffer.getvalue())
+            ))
+        return names
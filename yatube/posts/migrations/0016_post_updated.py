@@ -0,0 +1,36 @@
+# Generated by Django 2.2.16 on 2026-10-18 04:12
+
+from importlib import import_module
+
+from django.db import migrations, models
+
+search = import_module('posts.migrations.0015_post_search')
+
+
+def copy_pub_date(apps, schema_editor):
+    Post = apps.get_model('posts', 'Post')
+    Post.objects.update(updated=models.F('pub_date'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0015_post_search'),
+    ]
+
+    # SQLite добавляет поле, пересоздавая таблицу, и теряет триггеры
+    # поискового индекса: индекс снимается и строится заново.
+    operations = [
+        migrations.RunPython(
+            search.run(search.BACKWARD), search.run(search.FORWARD)
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='updated',
+            field=models.DateTimeField(auto_now=True, verbose_name='Дата изменения'),
+        ),
+        migrations.RunPython(copy_pub_date, migrations.RunPython.noop),
+        migrations.RunPython(
+            search.run(search.FORWARD), search.run(search.BACKWARD)
+        ),
+    ]
@@ -1,22 +1,93 @@
+import posixpath
+
 from django.contrib.auth import get_user_model
-from django.db import models
+from django.db import models, transaction
 
-from yatube.settings import RETURN_SYMBOLS
+from yatube.settings import RETURN_SYMBOLS, THUMBNAIL_SIZES
 
 
 User = get_user_model()
 
 
-class Group(models.Model):
+def thumbnail_name(image_name, size_name):
+    """Путь к превью картинки в хранилище: posts/thumbs/<имя>_WxH.jpg."""
+    directory, filename = posixpath.split(image_name)
+    width, height = THUMBNAIL_SIZES[size_name]
+    return posixpath.join(
+        directory,
+        'thumbs',
+        f'{posixpath.splitext(filename)[0]}_{width}x{height}.jpg',
+    )
+
+
+class AtomicSaveMixin:
+    """save() в транзакции: сигналы post_save меняют счётчики и ленты,
+    и эти изменения фиксируются вместе с самой строкой."""
+
+    def save(self, *args, **kwargs):
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
+
+class DerivedFieldsMixin(AtomicSaveMixin):
+    """Производные поля (счётчики, флаги фоновой обработки) меняются
+    только через update(), поэтому обычный save() их не перезаписывает."""
+    derived_fields = ()
+
+    def save(self, *args, **kwargs):
+        if (self.derived_fields and not self._state.adding
+                and 'update_fields' not in kwargs):
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in self.derived_fields
+            ]
+        super().save(*args, **kwargs)
+
+
+class Profile(models.Model):
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        related_name='profile',
+        verbose_name='Пользователь',
+    )
+    posts_count = models.PositiveIntegerField(
+        'Количество постов',
+        default=0,
+        editable=False,
+    )
+    followers_count = models.PositiveIntegerField(
+        'Количество подписчиков',
+        default=0,
+        editable=False,
+    )
+
+    class Meta:
+        verbose_name = 'Профиль'
+        verbose_name_plural = 'Профили'
+
+    def __str__(self):
+        return str(self.user)
+
+
+class Group(DerivedFieldsMixin, models.Model):
     title = models.CharField('Название', max_length=200)
     slug = models.SlugField('Адрес', unique=True)
     description = models.TextField('Описание')
+    posts_count = models.PositiveIntegerField(
+        'Количество постов',
+        default=0,
+        editable=False,
+    )
+
+    derived_fields = ('posts_count',)
 
     def __str__(self):
         return self.title
 
 
-class Post(models.Model):
+class Post(DerivedFieldsMixin, models.Model):
     text = models.TextField(
         'Текст',
         help_text='Текст нового поста',
@@ -25,6 +96,10 @@ class Post(models.Model):
         'Дата публикации',
         auto_now_add=True,
     )
+    updated = models.DateTimeField(
+        'Дата изменения',
+        auto_now=True,
+    )
     author = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
@@ -46,17 +121,72 @@ class Post(models.Model):
         upload_to='posts/',
         blank=True
     )
+    comments_count = models.PositiveIntegerField(
+        'Количество комментариев',
+        default=0,
+        editable=False,
+    )
+    thumbnails_ready = models.BooleanField(
+        'Превью готовы',
+        default=False,
+        editable=False,
+    )
+
+    derived_fields = ('comments_count', 'thumbnails_ready')
 
     class Meta:
         ordering = ('-pub_date',)
         verbose_name = 'Пост'
         verbose_name_plural = 'Посты'
+        indexes = [
+            models.Index(fields=('-pub_date',), name='post_pub_date_idx'),
+            models.Index(
+                fields=('author', '-pub_date'),
+                name='post_author_pub_date_idx',
+            ),
+            models.Index(
+                fields=('group', '-pub_date'),
+                name='post_group_pub_date_idx',
+            ),
+        ]
 
     def __str__(self):
         return self.text[:RETURN_SYMBOLS]
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        self._loaded_values = {
+            field.attname: getattr(self, field.attname)
+            for field in self._meta.concrete_fields
+        }
+
+    @property
+    def thumbnails(self):
+        """URL превью по размерам, пока превью нет — URL оригинала."""
+        if not self.image:
+            return {}
+        if not self.thumbnails_ready:
+            return dict.fromkeys(THUMBNAIL_SIZES, self.image.url)
+        return {
+            size_name: self.image.storage.url(
+                thumbnail_name(self.image.name, size_name)
+            )
+            for size_name in THUMBNAIL_SIZES
+        }
 
-class Comment(models.Model):
+    def loaded_value(self, attname):
+        """Значение поля на момент загрузки из базы."""
+        loaded_values = getattr(self, '_loaded_values', {})
+        return loaded_values.get(attname, getattr(self, attname))
+
+
+class Comment(AtomicSaveMixin, models.Model):
     post = models.ForeignKey(
         Post,
         on_delete=models.CASCADE,
@@ -80,12 +210,18 @@ class Comment(models.Model):
 
     class Meta:
         ordering = ['-created']
+        indexes = [
+            models.Index(
+                fields=('post', '-created'),
+                name='comment_post_created_idx',
+            ),
+        ]
 
     def __str__(self):
         return self.text[:RETURN_SYMBOLS]
 
 
-class Follow(models.Model):
+class Follow(AtomicSaveMixin, models.Model):
     user = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
@@ -96,3 +232,39 @@ class Follow(models.Model):
         on_delete=models.CASCADE,
         related_name='following',
     )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=('user', 'author'), name='unique_follow'
+            ),
+        ]
+
+
+class TimelineEntry(models.Model):
+    """Пост в материализованной ленте подписок пользователя."""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='timeline',
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='timeline_entries',
+    )
+    pub_date = models.DateTimeField()
+
+    class Meta:
+        ordering = ('-pub_date',)
+        constraints = [
+            models.UniqueConstraint(
+                fields=('user', 'post'), name='unique_timeline_entry'
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=('user', '-pub_date'),
+                name='timeline_user_pub_date_idx',
+            ),
+        ]
@@ -0,0 +1,76 @@
+import re
+
+from django.db import connection
+from django.db.models.expressions import RawSQL
+
+from .models import Post
+
+MAX_TERMS = 10
+MATCH_SQL = 'SELECT rowid FROM posts_post_fts WHERE posts_post_fts MATCH %s'
+COUNT_SQL = 'SELECT count(*) FROM posts_post_fts WHERE posts_post_fts MATCH %s'
+RANKED_SQL = MATCH_SQL + ' ORDER BY rank LIMIT %s OFFSET %s'
+
+
+def has_index():
+    return connection.vendor == 'sqlite'
+
+
+def match_expression(query):
+    """Запрос пользователя в выражение FTS5.
+
+    Каждое слово берётся в кавычки, поэтому операторы FTS5 из ввода
+    не работают; звёздочка ищет слово как префикс («пост» найдёт
+    «посты»). Все слова должны встретиться в тексте.
+    """
+    words = re.findall(r'\w+', query.lower())[:MAX_TERMS]
+    return ' '.join(f'"{word}"*' for word in words)
+
+
+class SearchResults:
+    """Найденные посты в порядке релевантности (bm25).
+
+    Отдаёт Paginator только count() и срезы, поэтому индекс читается
+    постранично, а посты страницы загружаются одним запросом.
+    """
+
+    def __init__(self, expression, queryset):
+        self.expression = expression
+        self.queryset = queryset
+
+    def count(self):
+        with connection.cursor() as cursor:
+            cursor.execute(COUNT_SQL, [self.expression])
+            return cursor.fetchone()[0]
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+        start = index.start or 0
+        with connection.cursor() as cursor:
+            cursor.execute(
+                RANKED_SQL, [self.expression, index.stop - start, start]
+            )
+            ids = [row[0] for row in cursor.fetchall()]
+        posts = self.queryset.in_bulk(ids)
+        return [posts[pk] for pk in ids if pk in posts]
+
+
+def search_posts(query, queryset=None):
+    if queryset is None:
+        queryset = Post.objects.select_related('author', 'group')
+    expression = match_expression(query)
+    if not expression:
+        return queryset.none()
+    if not has_index():
+        return queryset.filter(text__icontains=query)
+    return SearchResults(expression, queryset)
+
+
+def filter_posts(queryset, query):
+    """Отбор по индексу для готового queryset (например, в админке)."""
+    expression = match_expression(query)
+    if not expression:
+        return queryset
+    if not has_index():
+        return queryset.filter(text__icontains=query)
+    return queryset.filter(pk__in=RawSQL(MATCH_SQL, [expression]))
@@ -0,0 +1,127 @@
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from . import conditional, feed_cache, follow_graph, thumbnails, timeline
+from .models import Comment, Follow, Group, Post, Profile, User
+
+
+def change_counter(queryset, field, delta, **changes):
+    if delta < 0:
+        queryset = queryset.filter(**{f'{field}__gte': -delta})
+    queryset.update(**{field: F(field) + delta}, **changes)
+
+
+def change_posts_count(author_id, group_id, delta):
+    change_counter(Profile.objects.filter(user_id=author_id),
+                   'posts_count', delta)
+    if group_id is not None:
+        change_counter(Group.objects.filter(pk=group_id),
+                       'posts_count', delta)
+
+
+@receiver(post_save, sender=User)
+def create_profile(sender, instance, created, raw, **kwargs):
+    if created and not raw:
+        Profile.objects.get_or_create(user=instance)
+    feed_cache.forget(User, instance.pk)
+    # Вход пользователя сохраняет только last_login, его нет на страницах.
+    if set(kwargs.get('update_fields') or ()) != {'last_login'}:
+        conditional.touch('users')
+
+
+@receiver(post_save, sender=Post)
+def count_saved_post(sender, instance, created, raw, **kwargs):
+    if raw:
+        return
+    if created:
+        change_posts_count(instance.author_id, instance.group_id, 1)
+        timeline.fan_out(instance)
+        feed_cache.bump_feed_version('index')
+        conditional.touch_feeds(instance.author_id, instance.group_id)
+        return
+    feed_cache.forget(Post, instance.pk)
+    conditional.touch_feeds(instance.author_id, instance.group_id)
+    old_author_id = instance.loaded_value('author_id')
+    old_group_id = instance.loaded_value('group_id')
+    if (old_author_id, old_group_id) != (instance.author_id,
+                                         instance.group_id):
+        change_posts_count(old_author_id, old_group_id, -1)
+        change_posts_count(instance.author_id, instance.group_id, 1)
+        conditional.touch_feeds(old_author_id, old_group_id)
+
+
+@receiver(post_save, sender=Post)
+def process_image(sender, instance, created, raw, **kwargs):
+    if raw:
+        return
+    old_image = str(instance.loaded_value('image') or '')
+    new_image = instance.image.name or ''
+    if not created and old_image == new_image:
+        return
+    if not created:
+        Post.objects.filter(pk=instance.pk).update(thumbnails_ready=False)
+        instance.thumbnails_ready = False
+    if old_image and old_image != new_image:
+        thumbnails.schedule_discard(old_image)
+    if new_image:
+        thumbnails.schedule(instance)
+
+
+@receiver(post_delete, sender=Post)
+def count_deleted_post(sender, instance, **kwargs):
+    change_posts_count(instance.author_id, instance.group_id, -1)
+    feed_cache.forget(Post, instance.pk)
+    feed_cache.bump_feed_version('index')
+    conditional.touch_feeds(instance.author_id, instance.group_id)
+    if instance.thumbnails_ready:
+        thumbnails.schedule_discard(instance.image.name)
+
+
+@receiver(post_save, sender=Comment)
+def count_saved_comment(sender, instance, created, raw, **kwargs):
+    if created and not raw:
+        # Дата изменения поста — валидатор его страницы, поэтому её
+        # сдвигают и комментарии.
+        change_counter(Post.objects.filter(pk=instance.post_id),
+                       'comments_count', 1, updated=timezone.now())
+        feed_cache.forget(Post, instance.post_id)
+
+
+@receiver(post_delete, sender=Comment)
+def count_deleted_comment(sender, instance, **kwargs):
+    change_counter(Post.objects.filter(pk=instance.post_id),
+                   'comments_count', -1, updated=timezone.now())
+    feed_cache.forget(Post, instance.post_id)
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def forget_group(sender, instance, **kwargs):
+    feed_cache.forget(Group, instance.pk)
+    conditional.touch('groups')
+
+
+@receiver(post_save, sender=Follow)
+def add_follow(sender, instance, created, raw, **kwargs):
+    if created and not raw:
+        change_counter(Profile.objects.filter(user_id=instance.author_id),
+                       'followers_count', 1)
+        timeline.backfill(instance)
+        follow_graph.forget(instance.user_id, instance.author_id)
+        conditional.touch(
+            f'author:{instance.author_id}', f'follows:{instance.user_id}'
+        )
+
+
+@receiver(post_delete, sender=Follow)
+def remove_follow(sender, instance, **kwargs):
+    change_counter(Profile.objects.filter(user_id=instance.author_id),
+                   'followers_count', -1)
+    timeline.prune(instance)
+    timeline.settle(instance.author_id)
+    follow_graph.forget(instance.user_id, instance.author_id)
+    conditional.touch(
+        f'author:{instance.author_id}', f'follows:{instance.user_id}'
+    )
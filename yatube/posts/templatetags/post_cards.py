@@ -0,0 +1,13 @@
+from django import template
+
+from posts.cards import render_cards
+
+register = template.Library()
+
+
+@register.simple_tag
+def post_cards(posts):
+    """Пары (пост, HTML карточки): всё, что зависит от пользователя,
+    шаблон рисует рядом с карточкой, а не внутри неё."""
+    posts = list(posts)
+    return list(zip(posts, render_cards(posts)))
@@ -0,0 +1,62 @@
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.core.management import CommandError, call_command
+from django.test import TestCase, override_settings
+
+from .. import counters
+from ..models import Comment, Follow, Post, TimelineEntry, User
+from yatube.settings import TEMP_MEDIA_ROOT
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class BenchmarkCommandsTest(TestCase):
+    def setUp(self):
+        self.baseline_dir = tempfile.mkdtemp()
+        self.baseline = os.path.join(self.baseline_dir, 'views.json')
+        call_command(
+            'seed_posts', users=30, posts=200, groups=3, comments=50,
+            follows=5, images=0.2, stdout=StringIO(),
+        )
+
+    def tearDown(self):
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+        shutil.rmtree(self.baseline_dir, ignore_errors=True)
+
+    def benchmark(self, **options):
+        call_command(
+            'benchmark_views', requests=2, warmup=0,
+            baseline=self.baseline, stdout=StringIO(), **options
+        )
+
+    def test_seed_builds_consistent_data(self):
+        """seed_posts создаёт данные с верными счётчиками и лентами."""
+        self.assertEqual(User.objects.count(), 30)
+        self.assertEqual(Post.objects.count(), 200)
+        self.assertEqual(Comment.objects.count(), 50)
+        self.assertTrue(Post.objects.exclude(image='').exists())
+        for name, queryset in counters.mismatches().items():
+            with self.subTest(counter=name):
+                self.assertFalse(queryset.exists())
+        follow = Follow.objects.first()
+        self.assertTrue(TimelineEntry.objects.filter(
+            user_id=follow.user_id, post__author_id=follow.author_id
+        ).exists())
+
+    def test_baseline_round_trip(self):
+        """Результаты сохраняются и сравниваются с базовой линией."""
+        self.benchmark(save=True)
+        with open(self.baseline, encoding='utf-8') as baseline_file:
+            results = json.load(baseline_file)
+        self.assertEqual(set(results['posts:index']), {
+            'p50', 'p95', 'p99', 'requests', 'queries', 'memory_kb'
+        })
+        for row in results.values():
+            row['queries'] = 0
+        with open(self.baseline, 'w', encoding='utf-8') as baseline_file:
+            json.dump(results, baseline_file)
+        with self.assertRaisesMessage(CommandError, 'запросов 0'):
+            self.benchmark(only=['posts:post_detail'], tolerance=100)
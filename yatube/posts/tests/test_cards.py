@@ -0,0 +1,83 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..cards import CARD_TEMPLATE, card_key
+from ..models import Group, Post, User
+
+POSTS_COUNT = 3
+
+
+class PostCardsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(
+            username='author', first_name='Имя', last_name='Фамилия'
+        )
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.other_group = Group.objects.create(
+            title='Другая группа',
+            slug='other-slug',
+            description='Тестовое описание',
+        )
+        for i in range(POSTS_COUNT):
+            Post.objects.create(
+                text=f'Пост {i}', author=cls.author, group=cls.group
+            )
+        cls.url = reverse('posts:profile', args=(cls.author.username,))
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+    def rendered_cards(self, response):
+        return [
+            template for template in response.templates
+            if template.name == CARD_TEMPLATE
+        ]
+
+    def test_cards_come_from_cache(self):
+        """Повторно карточки не отрисовываются и читаются одним
+        get_many."""
+        response = self.client.get(self.url)
+        self.assertEqual(len(self.rendered_cards(response)), POSTS_COUNT)
+        self.assertContains(response, '<hr>', count=POSTS_COUNT - 1)
+        with mock.patch.object(
+            cache, 'get_many', wraps=cache.get_many
+        ) as get_many:
+            response = self.client.get(self.url)
+        self.assertEqual(self.rendered_cards(response), [])
+        self.assertEqual(get_many.call_count, 1)
+        self.assertContains(response, 'Пост 0')
+        self.assertContains(response, '<hr>', count=POSTS_COUNT - 1)
+
+    def test_key_follows_changes(self):
+        """Правка текста, смена группы и имени автора меняют ключ."""
+        post = Post.objects.select_related('author', 'group').first()
+        keys = {card_key(post)}
+        post.text = 'Исправленный пост'
+        post.save()
+        keys.add(card_key(post))
+        post.group = self.other_group
+        post.save()
+        keys.add(card_key(post))
+        post.author.first_name = 'Другое'
+        keys.add(card_key(post))
+        self.assertEqual(len(keys), 4)
+
+    def test_edited_post_is_rendered_again(self):
+        """После правки поста на странице новая карточка."""
+        self.client.get(self.url)
+        post = Post.objects.first()
+        post.text = 'Исправленный пост'
+        post.save()
+        response = self.client.get(self.url)
+        self.assertEqual(len(self.rendered_cards(response)), 1)
+        self.assertContains(response, 'Исправленный пост')
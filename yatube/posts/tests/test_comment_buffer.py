@@ -0,0 +1,118 @@
+import os
+import shutil
+import tempfile
+
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from .. import comment_buffer
+from ..models import Comment, Post, User
+
+
+class CommentBufferTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.post = Post.objects.create(text='Тестовый пост', author=cls.author)
+        cls.other_post = Post.objects.create(
+            text='Другой пост', author=cls.author
+        )
+
+    def setUp(self):
+        cache.clear()
+        buffer_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, buffer_dir, ignore_errors=True)
+        settings = override_settings(
+            COMMENT_WRITE_BEHIND=True, COMMENT_BUFFER_DIR=buffer_dir
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+        self.url = reverse('posts:post_detail', args=(self.post.pk,))
+
+    def comment(self, client, text, post=None):
+        return client.post(
+            reverse('posts:add_comment', args=((post or self.post).pk,)),
+            {'text': text},
+        )
+
+    def test_author_sees_own_comment_before_flush(self):
+        """Комментарий ложится в буфер, автор видит его сразу, другие —
+        после сброса; после сброса он на странице один раз."""
+        response = self.comment(self.reader_client, 'Комментарий')
+        self.assertRedirects(response, self.url)
+        self.assertFalse(Comment.objects.exists())
+        self.assertContains(self.reader_client.get(self.url), 'Комментарий')
+        self.assertNotContains(
+            self.author_client.get(self.url), 'Комментарий'
+        )
+        self.assertEqual(comment_buffer.flush(), 1)
+        self.assertTrue(Comment.objects.filter(
+            post=self.post, author=self.reader, text='Комментарий'
+        ).exists())
+        self.assertContains(
+            self.reader_client.get(self.url), 'Комментарий', count=1
+        )
+        self.assertContains(self.author_client.get(self.url), 'Комментарий')
+        self.assertEqual(
+            self.reader_client.session[comment_buffer.PENDING_KEY], []
+        )
+
+    def test_invalid_form_is_not_buffered(self):
+        self.comment(self.reader_client, '')
+        self.assertEqual(comment_buffer.flush(), 0)
+
+    def test_flush_updates_counters_once_per_post(self):
+        """Сброс пишет все комментарии и сдвигает счётчики и дату
+        изменения постов."""
+        updated = self.post.updated
+        for i in range(3):
+            self.comment(self.reader_client, f'Комментарий {i}')
+        self.comment(self.author_client, 'Ещё', post=self.other_post)
+        self.assertEqual(comment_buffer.flush(), 4)
+        self.post.refresh_from_db()
+        self.other_post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 3)
+        self.assertEqual(self.other_post.comments_count, 1)
+        self.assertGreater(self.post.updated, updated)
+        self.assertEqual(comment_buffer.flush(), 0)
+
+    def test_page_is_not_stale_for_author(self):
+        """Условный запрос не отдаёт автору 304 без его комментария."""
+        etag = self.reader_client.get(self.url)['ETag']
+        self.comment(self.reader_client, 'Комментарий')
+        response = self.reader_client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertContains(response, 'Комментарий')
+
+    def test_recovered_batch_is_not_written_twice(self):
+        """Пачка, оставшаяся после сбоя, не дублирует уже записанное."""
+        comment_buffer.enqueue(self.post, self.reader, 'Записан')
+        comment_buffer.enqueue(self.post, self.reader, 'Не записан')
+        comment_buffer.rotate()
+        Comment.objects.create(
+            post=self.post, author=self.reader, text='Записан'
+        )
+        self.assertEqual(comment_buffer.flush(), 1)
+        self.assertEqual(
+            sorted(Comment.objects.values_list('text', flat=True)),
+            ['Записан', 'Не записан'],
+        )
+
+    def test_broken_lines_and_deleted_posts_are_skipped(self):
+        comment_buffer.enqueue(self.other_post, self.reader, 'К удалённому')
+        comment_buffer.enqueue(self.post, self.reader, 'Комментарий')
+        with open(comment_buffer.path(comment_buffer.BUFFER_NAME), 'a') as f:
+            f.write('{"post": ')
+        Post.objects.filter(pk=self.other_post.pk).delete()
+        with self.assertLogs('posts.comment_buffer', 'WARNING'):
+            self.assertEqual(comment_buffer.flush(), 1)
+        self.assertEqual(comment_buffer.batches(), [])
+        self.assertFalse(os.path.exists(
+            comment_buffer.path(comment_buffer.BUFFER_NAME)
+        ))
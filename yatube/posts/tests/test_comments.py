@@ -0,0 +1,100 @@
+import gc
+import re
+import tracemalloc
+
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Comment, Post, User
+
+
+class CommentPagesTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='UM')
+        cls.post = Post.objects.create(text='Тестовый пост', author=cls.user)
+
+    def setUp(self):
+        self.client = Client()
+
+    def add_comments(self, total):
+        Comment.objects.bulk_create(
+            Comment(post=self.post, author=self.user, text=f'Комментарий {i}')
+            for i in range(total)
+        )
+
+    def read_stream(self, response):
+        """Прочитать ответ, не накапливая его целиком."""
+        size, first = 0, None
+        for chunk in response.streaming_content:
+            first = first or chunk
+            size += len(chunk)
+        return first, size
+
+    def test_comments_are_paginated(self):
+        """Комментарии на странице поста листаются курсором."""
+        self.add_comments(60)
+        url = reverse('posts:post_detail', args=(self.post.pk,))
+        first = self.client.get(url).context['comments']
+        self.assertEqual(len(first), 50)
+        self.assertTrue(first.has_next())
+        second = self.client.get(
+            url, {'cursor': first.next_cursor}
+        ).context['comments']
+        self.assertEqual(len(second), 10)
+        self.assertFalse(set(first) & set(second))
+
+    def test_stream_contains_post_and_all_comments(self):
+        """Потоковая страница начинается с поста и содержит все
+        комментарии."""
+        self.add_comments(450)
+        response = self.client.get(
+            reverse('posts:post_comments', args=(self.post.pk,))
+        )
+        self.assertTrue(response.streaming)
+        chunks = [chunk.decode() for chunk in response.streaming_content]
+        self.assertIn('Тестовый пост', chunks[0])
+        self.assertNotIn('Комментарий', chunks[0])
+        page = ''.join(chunks)
+        self.assertEqual(page.count('Комментарий '), 450)
+        self.assertTrue(page.rstrip().endswith('</html>'))
+
+    def test_stream_reads_each_chunk_with_own_query(self):
+        """Пачка комментариев — отдельный запрос по ключу, прочитанный
+        целиком до отдачи: курсор не остаётся открытым между пачками."""
+        self.add_comments(450)
+        response = self.client.get(
+            reverse('posts:post_comments', args=(self.post.pk,))
+        )
+        texts = []
+        with CaptureQueriesContext(connection) as queries:
+            for chunk in response.streaming_content:
+                texts += re.findall(r'Комментарий (\d+)', chunk.decode())
+        self.assertEqual(len(queries), 3)
+        self.assertEqual(sorted(map(int, texts)), list(range(450)))
+
+    def peak_memory(self, url):
+        """Наименьший из трёх замеров: сборщик циклических ссылок
+        срабатывает в разные моменты и добавляет шум."""
+        peaks = []
+        for _ in range(3):
+            gc.collect()
+            tracemalloc.start()
+            self.read_stream(self.client.get(url))
+            peaks.append(tracemalloc.get_traced_memory()[1])
+            tracemalloc.stop()
+        return min(peaks)
+
+    def test_stream_memory_does_not_grow(self):
+        """Пиковая память потока не зависит от длины обсуждения."""
+        url = reverse('posts:post_comments', args=(self.post.pk,))
+        self.read_stream(self.client.get(url))
+        peaks = []
+        for total in (500, 5000):
+            self.add_comments(total - self.post.comments.count())
+            peaks.append(self.peak_memory(url))
+        # В десять раз больше комментариев — не в десять раз больше памяти.
+        self.assertLess(peaks[1], peaks[0] * 2)
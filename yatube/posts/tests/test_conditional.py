@@ -0,0 +1,152 @@
+import time
+from http import HTTPStatus
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import Comment, Follow, Group, Post, User
+
+
+class ConditionalGetTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.post = Post.objects.create(
+            text='Тестовый пост', author=cls.author, group=cls.group
+        )
+        cls.urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', args=(cls.group.slug,)),
+            reverse('posts:profile', args=(cls.author.username,)),
+            reverse('posts:post_detail', args=(cls.post.pk,)),
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def revalidate(self, client, url, etag):
+        return client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+    def test_unchanged_pages_answer_304(self):
+        """Повторный запрос с тем же ETag получает 304 без отрисовки."""
+        for client in (self.guest_client, self.reader_client):
+            for url in self.urls:
+                with self.subTest(url=url):
+                    etag = client.get(url)['ETag']
+                    response = self.revalidate(client, url, etag)
+                    self.assertEqual(
+                        response.status_code, HTTPStatus.NOT_MODIFIED
+                    )
+                    self.assertEqual(response.templates, [])
+
+    def test_etag_depends_on_user(self):
+        """Гость и авторизованный пользователь получают разные ETag,
+        чужой ETag не даёт 304."""
+        for url in self.urls:
+            with self.subTest(url=url):
+                guest_etag = self.guest_client.get(url)['ETag']
+                reader_etag = self.reader_client.get(url)['ETag']
+                self.assertNotEqual(guest_etag, reader_etag)
+                response = self.revalidate(
+                    self.reader_client, url, guest_etag
+                )
+                self.assertEqual(response.status_code, HTTPStatus.OK)
+
+    def test_new_post_changes_feeds(self):
+        """Новый пост меняет ETag главной, группы и профиля автора."""
+        etags = {url: self.guest_client.get(url)['ETag'] for url in self.urls}
+        Post.objects.create(
+            text='Новый пост', author=self.author, group=self.group
+        )
+        for url in self.urls:
+            with self.subTest(url=url):
+                response = self.revalidate(
+                    self.guest_client, url, etags[url]
+                )
+                self.assertEqual(response.status_code, HTTPStatus.OK)
+
+    def test_edit_changes_feeds(self):
+        """Правка поста меняет ETag всех страниц, где он виден."""
+        etags = {url: self.guest_client.get(url)['ETag'] for url in self.urls}
+        post = Post.objects.get(pk=self.post.pk)
+        post.text = 'Исправленный пост'
+        post.save()
+        for url in self.urls:
+            with self.subTest(url=url):
+                response = self.revalidate(
+                    self.guest_client, url, etags[url]
+                )
+                self.assertEqual(response.status_code, HTTPStatus.OK)
+
+    def test_comment_changes_post_page(self):
+        """Страница поста отдаёт Last-Modified, новый комментарий
+        меняет её ETag."""
+        url = reverse('posts:post_detail', args=(self.post.pk,))
+        response = self.guest_client.get(url)
+        etag, last_modified = response['ETag'], response['Last-Modified']
+        response = self.guest_client.get(
+            url, HTTP_IF_MODIFIED_SINCE=last_modified
+        )
+        self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
+        Comment.objects.create(
+            text='Комментарий', author=self.reader, post=self.post
+        )
+        response = self.revalidate(self.guest_client, url, etag)
+        self.assertContains(response, 'Комментарий')
+
+    def test_follow_changes_profile(self):
+        """Подписка меняет ETag профиля: на нём кнопка подписки."""
+        url = reverse('posts:profile', args=(self.author.username,))
+        etag = self.reader_client.get(url)['ETag']
+        Follow.objects.create(user=self.reader, author=self.author)
+        response = self.revalidate(self.reader_client, url, etag)
+        self.assertContains(response, 'Отписаться')
+
+    def test_follow_changes_feeds_of_follower(self):
+        """Подписка меняет ETag лент подписчика: на карточках кнопки
+        подписки."""
+        url = reverse('posts:group_list', args=(self.group.slug,))
+        etag = self.reader_client.get(url)['ETag']
+        Follow.objects.create(user=self.reader, author=self.author)
+        response = self.revalidate(self.reader_client, url, etag)
+        self.assertContains(response, 'Отписаться')
+
+    def test_local_cache_validators_expire(self):
+        """С кешем одного процесса инвалидацию из других процессов он не
+        видит, поэтому версии и страницы живут недолго: через
+        LOCAL_CACHE_TIMEOUT ETag меняется и без сигнала."""
+        self.assertFalse(settings.CACHE_IS_SHARED)
+        self.assertEqual(
+            settings.FEED_CACHE_TIMEOUT, settings.LOCAL_CACHE_TIMEOUT
+        )
+        url = reverse('posts:index')
+        etag = self.client.get(url)['ETag']
+        later = time.time() + settings.LOCAL_CACHE_TIMEOUT + 1
+        with mock.patch('time.time', return_value=later):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_missing_objects_are_404(self):
+        """Валидатор не прячет 404 для несуществующих страниц."""
+        for url in (
+            reverse('posts:group_list', args=('missing',)),
+            reverse('posts:profile', args=('missing',)),
+            reverse('posts:post_detail', args=(self.post.pk + 100,)),
+        ):
+            with self.subTest(url=url):
+                response = self.guest_client.get(url)
+                self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
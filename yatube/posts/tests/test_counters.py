@@ -0,0 +1,75 @@
+from io import StringIO
+
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+
+from ..models import Comment, Group, Post, Profile, User
+
+
+class CountersTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='UM')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.group_2 = Group.objects.create(
+            title='Вторая группа',
+            slug='slug_2',
+            description='Вторая группа',
+        )
+
+    def assertCounters(self, user_posts, group_posts, group_2_posts):
+        self.assertEqual(
+            Profile.objects.get(user=self.user).posts_count, user_posts
+        )
+        self.assertEqual(
+            Group.objects.get(pk=self.group.pk).posts_count, group_posts
+        )
+        self.assertEqual(
+            Group.objects.get(pk=self.group_2.pk).posts_count, group_2_posts
+        )
+
+    def test_post_counters_follow_changes(self):
+        """Счётчики постов меняются при создании, переносе и удалении."""
+        post = Post.objects.create(
+            text='Тестовый пост', author=self.user, group=self.group
+        )
+        self.assertCounters(1, 1, 0)
+        post = Post.objects.get(pk=post.pk)
+        post.group = self.group_2
+        post.save()
+        self.assertCounters(1, 0, 1)
+        post.text = 'Изменённый пост'
+        post.save()
+        self.assertCounters(1, 0, 1)
+        post.delete()
+        self.assertCounters(0, 0, 0)
+
+    def test_comment_counter_follows_changes(self):
+        """Счётчик комментариев меняется при создании и удалении."""
+        post = Post.objects.create(text='Тестовый пост', author=self.user)
+        comment = Comment.objects.create(
+            text='Комментарий', author=self.user, post=post
+        )
+        self.assertEqual(Post.objects.get(pk=post.pk).comments_count, 1)
+        post.text = 'Устаревший экземпляр'
+        post.save()
+        self.assertEqual(Post.objects.get(pk=post.pk).comments_count, 1)
+        comment.delete()
+        self.assertEqual(Post.objects.get(pk=post.pk).comments_count, 0)
+
+    def test_recount_command_rebuilds_counters(self):
+        """recount_posts чинит счётчики, а --check находит расхождения."""
+        Post.objects.bulk_create([
+            Post(text='Тестовый пост', author=self.user, group=self.group)
+            for _ in range(3)
+        ])
+        with self.assertRaises(CommandError):
+            call_command('recount_posts', '--check', stdout=StringIO())
+        call_command('recount_posts', stdout=StringIO())
+        self.assertCounters(3, 3, 0)
+        call_command('recount_posts', '--check', stdout=StringIO())
@@ -0,0 +1,154 @@
+from unittest import mock
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.db import connection
+from django.db.models.query import QuerySet
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .. import follow_graph
+from ..models import Follow, Post, Profile, TimelineEntry, User
+
+
+class FollowGraphTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='reader')
+        cls.authors = [
+            User.objects.create_user(username=f'author{i}') for i in range(3)
+        ]
+        for author in cls.authors:
+            Post.objects.create(text='Тестовый пост', author=author)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_sets_are_cached_and_invalidated(self):
+        """Множества подписок читаются из кеша и сбрасываются при
+        подписке и отписке."""
+        author = self.authors[0]
+        self.assertEqual(follow_graph.followee_ids(self.reader.pk), set())
+        with self.assertNumQueries(0):
+            follow_graph.followee_ids(self.reader.pk)
+        follow = Follow.objects.create(user=self.reader, author=author)
+        self.assertEqual(
+            follow_graph.followee_ids(self.reader.pk), {author.pk}
+        )
+        self.assertEqual(
+            follow_graph.follower_ids(author.pk), {self.reader.pk}
+        )
+        follow.delete()
+        self.assertEqual(follow_graph.followee_ids(self.reader.pk), set())
+        self.assertEqual(follow_graph.follower_ids(author.pk), set())
+
+    def test_is_following_many(self):
+        Follow.objects.create(user=self.reader, author=self.authors[1])
+        ids = [author.pk for author in self.authors]
+        self.assertEqual(
+            follow_graph.is_following_many(self.reader, ids),
+            {ids[0]: False, ids[1]: True, ids[2]: False},
+        )
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                follow_graph.is_following_many(AnonymousUser(), ids),
+                dict.fromkeys(ids, False),
+            )
+
+    def test_follow_many(self):
+        """Массовая подписка пропускает себя, повторы и несуществующих
+        авторов, а счётчики и ленты обновляет как обычная."""
+        Follow.objects.create(user=self.reader, author=self.authors[0])
+        ids = [author.pk for author in self.authors]
+        created = follow_graph.follow_many(
+            self.reader, ids + [self.reader.pk, 10 ** 6]
+        )
+        self.assertEqual(created, ids[1:])
+        self.assertEqual(
+            follow_graph.followee_ids(self.reader.pk), set(ids)
+        )
+        self.assertEqual(
+            follow_graph.follower_counts(ids + [10 ** 6]),
+            {ids[0]: 1, ids[1]: 1, ids[2]: 1, 10 ** 6: 0},
+        )
+        self.assertEqual(
+            TimelineEntry.objects.filter(user=self.reader).count(), 3
+        )
+        self.assertEqual(follow_graph.follow_many(self.reader, ids), [])
+        self.assertEqual(
+            Profile.objects.get(user=self.authors[1]).followers_count, 1
+        )
+
+    def test_follow_many_ignores_stale_cache(self):
+        """Устаревшее множество в кеше не даёт подписаться второй раз
+        и задвоить счётчик."""
+        author = self.authors[0]
+        Follow.objects.create(user=self.reader, author=author)
+        cache.set(
+            follow_graph.FOLLOWEES_KEY.format(self.reader.pk),
+            follow_graph.pack(set()),
+        )
+        self.assertEqual(
+            follow_graph.follow_many(self.reader, [author.pk]), []
+        )
+        self.assertEqual(Profile.objects.get(user=author).followers_count, 1)
+
+    def test_follow_many_race(self):
+        """Если параллельный запрос подписал на автора раньше, сигналы
+        получают только созданные здесь подписки."""
+        ids = [author.pk for author in self.authors[:2]]
+        Follow.objects.create(user=self.reader, author=self.authors[0])
+        values_list = QuerySet.values_list
+
+        def stale_read(queryset, *fields, **kwargs):
+            # Проверка прошла до того, как параллельная подписка
+            # зафиксировалась.
+            if queryset.model is Follow:
+                queryset = queryset.none()
+            return values_list(queryset, *fields, **kwargs)
+
+        with mock.patch.object(QuerySet, 'values_list', stale_read):
+            created = follow_graph.follow_many(self.reader, ids)
+        self.assertEqual(created, ids[1:])
+        self.assertEqual(
+            follow_graph.follower_counts(ids), {ids[0]: 1, ids[1]: 1}
+        )
+
+    def test_profile_reads_follow_state_from_cache(self):
+        """Профиль не спрашивает базу о подписке, пока граф в кеше."""
+        client = Client()
+        client.force_login(self.reader)
+        url = reverse('posts:profile', args=(self.authors[0].username,))
+        client.get(url)
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(url)
+        self.assertFalse(response.context['following'])
+        self.assertFalse(any(
+            'posts_follow' in query['sql']
+            for query in queries.captured_queries
+        ))
+
+    def test_feed_buttons_are_per_user(self):
+        """Кнопки подписки на карточках свои у каждого пользователя,
+        хотя сами карточки общие и берутся из кеша."""
+        Follow.objects.create(user=self.reader, author=self.authors[0])
+        url = reverse('posts:search')
+        client = Client()
+        client.force_login(self.reader)
+        response = client.get(url, {'q': 'Тестовый'})
+        self.assertContains(response, 'Отписаться', count=1)
+        self.assertContains(response, 'Подписаться', count=2)
+
+        other = User.objects.create_user(username='other')
+        Follow.objects.create(user=other, author=self.authors[1])
+        Follow.objects.create(user=other, author=self.authors[2])
+        client.force_login(other)
+        response = client.get(url, {'q': 'Тестовый'})
+        self.assertNotIn(
+            'posts/includes/post_list.html',
+            [template.name for template in response.templates],
+        )
+        self.assertContains(response, 'Отписаться', count=2)
+        self.assertContains(response, 'Подписаться', count=1)
@@ -0,0 +1,53 @@
+from django.db import IntegrityError, connection
+from django.test import TestCase, skipUnlessDBFeature
+
+from .. import timeline
+from ..models import Comment, Follow, Group, Post, User
+
+
+@skipUnlessDBFeature('supports_explaining_query_execution')
+class IndexUsageTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='UM')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.post = Post.objects.create(
+            text='Тестовый пост', author=cls.user, group=cls.group
+        )
+
+    def assertUsesIndex(self, queryset, index_name):
+        plan = queryset.explain()
+        if connection.vendor == 'sqlite':
+            self.assertIn(f'INDEX {index_name}', plan)
+            self.assertNotIn('TEMP B-TREE', plan)
+        else:
+            self.assertIn(index_name, plan)
+
+    def test_feed_queries_use_indexes(self):
+        """Запросы лент читают посты по составным индексам."""
+        feeds = {
+            'post_pub_date_idx': Post.objects.all()[:10],
+            'post_author_pub_date_idx': self.user.posts.all()[:10],
+            'post_group_pub_date_idx': self.group.posts.all()[:10],
+            'comment_post_created_idx': Comment.objects.filter(
+                post=self.post
+            ),
+            'timeline_user_pub_date_idx': timeline.followed_posts(
+                self.user
+            )[:10],
+        }
+        for index_name, queryset in feeds.items():
+            with self.subTest(index=index_name):
+                self.assertUsesIndex(queryset, index_name)
+
+    def test_follow_is_unique(self):
+        """Повторная подписка на того же автора запрещена базой."""
+        author = User.objects.create_user(username='author')
+        Follow.objects.create(user=self.user, author=author)
+        with self.assertRaises(IntegrityError):
+            Follow.objects.create(user=self.user, author=author)
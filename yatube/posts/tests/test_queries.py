@@ -0,0 +1,91 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Comment, Follow, Group, Post, User
+from .utils import QueryBudgetMixin
+from yatube.settings import POSTS_NUMBER_PER_PAGE
+
+
+class QueryBudgetTests(QueryBudgetMixin, TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        for i in range(POSTS_NUMBER_PER_PAGE):
+            author = User.objects.create_user(
+                username=f'author{i}', first_name='Имя', last_name=str(i)
+            )
+            group = Group.objects.create(
+                title=f'Группа {i}',
+                slug=f'group-{i}',
+                description='Описание',
+            )
+            Post.objects.create(text=f'Пост {i}', author=author, group=group)
+            Post.objects.create(
+                text=f'Пост в группе {i}', author=author, group=cls.group
+            )
+            Follow.objects.create(user=cls.reader, author=author)
+        cls.post = Post.objects.filter(group=cls.group).first()
+        for author in User.objects.exclude(pk=cls.reader.pk):
+            Comment.objects.create(
+                text='Комментарий', author=author, post=cls.post
+            )
+
+    def setUp(self):
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+        cache.clear()
+
+    def test_views_fit_query_budget(self):
+        """Число запросов не зависит от количества постов на странице."""
+        # Лентам нужен ещё один запрос: подписки читателя для кнопок
+        # «Подписаться» (граф подписок, пока его нет в кеше).
+        budgets = {
+            reverse('posts:index'): 5,
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}): 6,
+            reverse('posts:profile', kwargs={'username': 'author0'}): 6,
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk}): 4,
+            reverse('posts:follow_index'): 6,
+        }
+        for url, budget in budgets.items():
+            with self.subTest(url=url):
+                with self.assertMaxQueries(budget):
+                    response = self.reader_client.get(url)
+                self.assertEqual(response.status_code, 200)
+
+    def test_follow_state_does_not_depend_on_authors(self):
+        """Подписка на авторов страницы проверяется одним запросом,
+        сколько бы разных авторов ни было на странице."""
+        single = Group.objects.create(title='Один автор', slug='single')
+        author = User.objects.get(username='author0')
+        for i in range(POSTS_NUMBER_PER_PAGE):
+            Post.objects.create(text=f'Пост {i}', author=author, group=single)
+        counts = []
+        for slug in (single.slug, self.group.slug):
+            cache.clear()
+            url = reverse('posts:group_list', kwargs={'slug': slug})
+            with CaptureQueriesContext(connection) as queries:
+                response = self.reader_client.get(url)
+            counts.append(len(queries))
+            self.assertEqual(
+                {post.following_author for post in response.context[
+                    'page_obj'
+                ]},
+                {True},
+            )
+        self.assertEqual(counts[0], counts[1])
+
+    def test_budget_reports_overrun(self):
+        """assertMaxQueries падает при превышении бюджета."""
+        with self.assertRaises(AssertionError):
+            with self.assertMaxQueries(1):
+                list(User.objects.all())
+                list(Post.objects.all())
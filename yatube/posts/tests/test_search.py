@@ -0,0 +1,85 @@
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import Post
+from ..search import match_expression, search_posts
+from yatube.settings import POSTS_NUMBER_PER_PAGE
+
+User = get_user_model()
+
+
+class SearchTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='UM')
+        cls.rare = Post.objects.create(
+            text='Котики спят на солнце', author=cls.user
+        )
+        cls.often = Post.objects.create(
+            text='Котики, котики и ещё раз котики', author=cls.user
+        )
+        Post.objects.create(text='Про собак', author=cls.user)
+
+    def setUp(self):
+        self.client = Client()
+
+    def search(self, query):
+        return list(search_posts(query)[0:POSTS_NUMBER_PER_PAGE])
+
+    def test_match_expression_escapes_operators(self):
+        """Операторы FTS5 из запроса не попадают в выражение."""
+        self.assertEqual(
+            match_expression('котики OR "собаки" NEAR(*'),
+            '"котики"* "or"* "собаки"* "near"*',
+        )
+        self.assertEqual(match_expression('  ;-) '), '')
+
+    def test_results_are_ranked(self):
+        """Пост с большим числом совпадений выше в выдаче."""
+        self.assertEqual(self.search('котики'), [self.often, self.rare])
+        self.assertEqual(self.search('кот спят'), [self.rare])
+        self.assertEqual(search_posts('котики').count(), 2)
+
+    def test_index_follows_changes(self):
+        """Индекс обновляется при правке и удалении поста."""
+        post = Post.objects.get(pk=self.rare.pk)
+        post.text = 'Собаки спят на солнце'
+        post.save()
+        self.assertEqual(self.search('котики'), [self.often])
+        self.assertIn(post, self.search('собаки'))
+        Post.objects.get(pk=self.often.pk).delete()
+        self.assertEqual(self.search('котики'), [])
+
+    def test_search_page(self):
+        """Страница поиска показывает найденные посты."""
+        response = self.client.get(reverse('posts:search'), {'q': 'солнце'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(list(response.context['page_obj']), [self.rare])
+        self.assertEqual(response.context['query'], 'солнце')
+        response = self.client.get(reverse('posts:search'), {'q': ''})
+        self.assertEqual(len(response.context['page_obj']), 0)
+
+    def test_search_pages_keep_query(self):
+        """Ссылки пагинатора сохраняют поисковый запрос."""
+        Post.objects.bulk_create(
+            Post(text=f'Котики {i}', author=self.user)
+            for i in range(POSTS_NUMBER_PER_PAGE)
+        )
+        response = self.client.get(reverse('posts:search'), {'q': 'котики'})
+        self.assertContains(response, '?q=%D0%BA')
+        response = self.client.get(
+            reverse('posts:search'), {'q': 'котики', 'page': 2}
+        )
+        self.assertEqual(len(response.context['page_obj']), 2)
+
+    def test_admin_search(self):
+        """Поиск в админке идёт по тому же индексу."""
+        admin = User.objects.create_superuser('admin', 'a@a.ru', 'pass')
+        self.client.force_login(admin)
+        response = self.client.get(
+            reverse('admin:posts_post_changelist'), {'q': 'собак'}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['cl'].result_count, 1)
@@ -0,0 +1,147 @@
+import shutil
+from io import BytesIO
+
+from django.core.exceptions import RequestDataTooBig
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from core.uploadhandlers import UploadLimitHandler
+
+from ..forms import PostForm
+from ..models import Post, User
+from yatube.settings import TEMP_MEDIA_ROOT
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, JOBS_ALWAYS_EAGER=True)
+class ThumbnailTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='UM')
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def tearDown(self):
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def upload(self, name, size=(1200, 800), image_format='PNG', **params):
+        buffer = BytesIO()
+        Image.new('RGB', size, 'red').save(buffer, image_format, **params)
+        return SimpleUploadedFile(
+            name=name, content=buffer.getvalue(), content_type='image/png'
+        )
+
+    def test_thumbnails_are_made_on_save(self):
+        """Превью нарезаются при сохранении поста, а не при показе."""
+        self.authorized_client.post(reverse('posts:post_create'), data={
+            'text': 'Пост с картинкой',
+            'image': self.upload('picture.png'),
+        })
+        post = Post.objects.get()
+        self.assertTrue(post.thumbnails_ready)
+        large = post.image.storage.path(
+            'posts/thumbs/picture_960x539.jpg'
+        )
+        with Image.open(large) as thumbnail:
+            self.assertEqual(thumbnail.size, (960, 539))
+        response = self.authorized_client.get(
+            reverse('posts:post_detail', kwargs={'post_id': post.pk})
+        )
+        self.assertContains(response, post.thumbnails['large'])
+        self.assertContains(response, post.thumbnails['medium'])
+
+    def test_new_image_resets_thumbnails(self):
+        """Новая картинка заменяет превью старой."""
+        post = Post.objects.create(
+            text='Пост', author=self.user, image=self.upload('first.png')
+        )
+        old_large = Post.objects.get().thumbnails['large']
+        post.image = self.upload('second.png')
+        post.save()
+        post = Post.objects.get()
+        self.assertTrue(post.thumbnails_ready)
+        self.assertIn('second_960x539', post.thumbnails['large'])
+        self.assertNotEqual(post.thumbnails['large'], old_large)
+        self.assertFalse(post.image.storage.exists(
+            'posts/thumbs/first_960x539.jpg'
+        ))
+
+    def test_broken_image_falls_back_to_original(self):
+        """Без превью шаблон показывает оригинал."""
+        with self.assertLogs('posts.thumbnails', 'WARNING'):
+            post = Post.objects.create(
+                text='Пост', author=self.user, image='posts/missing.png'
+            )
+        post = Post.objects.get(pk=post.pk)
+        self.assertFalse(post.thumbnails_ready)
+        self.assertEqual(post.thumbnails['large'], post.image.url)
+
+    def test_original_is_replaced_by_master(self):
+        """Оригинал пережимается в JPEG не больше IMAGE_MASTER_SIZE,
+        без EXIF и с поворотом из него; сам оригинал удаляется."""
+        exif = Image.Exif()
+        exif[0x0112] = 6  # Orientation: повернуть на 90° по часовой.
+        exif[0x010f] = 'Камера'
+        post = Post.objects.create(
+            text='Пост', author=self.user, image=self.upload(
+                'photo.png', size=(3000, 2000), exif=exif.tobytes()
+            )
+        )
+        storage = post.image.storage
+        post = Post.objects.get()
+        self.assertTrue(post.thumbnails_ready)
+        self.assertEqual(post.image.name, 'posts/photo.jpg')
+        self.assertFalse(storage.exists('posts/photo.png'))
+        with Image.open(storage.path(post.image.name)) as master:
+            self.assertEqual(master.format, 'JPEG')
+            self.assertEqual(master.size, (1280, 1920))
+            self.assertNotIn('exif', master.info)
+        self.assertTrue(storage.exists('posts/thumbs/photo_960x539.jpg'))
+
+    def test_suitable_original_is_kept(self):
+        """Небольшой JPEG без метаданных не пережимается."""
+        Post.objects.create(text='Пост', author=self.user, image=self.upload(
+            'small.jpg', image_format='JPEG'
+        ))
+        self.assertEqual(Post.objects.get().image.name, 'posts/small.jpg')
+
+    def test_form_rejects_big_images(self):
+        """Форма отклоняет слишком большой файл и слишком много
+        пикселей."""
+        cases = {
+            'file_too_big': ({'IMAGE_UPLOAD_MAX_SIZE': 1024}, self.upload(
+                'big.bmp', size=(100, 100), image_format='BMP'
+            )),
+            'too_many_pixels': ({'IMAGE_MAX_PIXELS': 10 ** 6}, self.upload(
+                'wide.png', size=(2000, 1000)
+            )),
+        }
+        for code, (limits, upload) in cases.items():
+            with self.subTest(code=code), self.settings(**limits):
+                form = PostForm(data={'text': 'Пост'}, files={'image': upload})
+                self.assertFalse(form.is_valid())
+                self.assertEqual(
+                    form.errors.as_data()['image'][0].code, code
+                )
+
+    @override_settings(
+        IMAGE_UPLOAD_MAX_SIZE=1024, DATA_UPLOAD_MAX_MEMORY_SIZE=1024
+    )
+    def test_oversize_upload_is_stopped_early(self):
+        """Загрузка сверх лимита отклоняется по длине запроса, до чтения
+        тела, а без верной длины — на первом фрагменте сверх лимита."""
+        response = self.authorized_client.post(
+            reverse('posts:post_create'), data={
+                'text': 'Пост',
+                'image': self.upload(
+                    'big.bmp', size=(100, 100), image_format='BMP'
+                ),
+            },
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Post.objects.exists())
+        handler = UploadLimitHandler()
+        chunk = b'x' * 1024
+        self.assertEqual(handler.receive_data_chunk(chunk, 0), chunk)
+        with self.assertRaises(RequestDataTooBig):
+            handler.receive_data_chunk(b'x', 1024)
@@ -0,0 +1,89 @@
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from jobs import queue
+from jobs.models import Job
+
+from ..models import Follow, Post, TimelineEntry, User
+
+
+class TimelineTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='reader')
+        cls.author = User.objects.create_user(username='author')
+        cls.old_post = Post.objects.create(
+            text='Пост до подписки', author=cls.author
+        )
+
+    def setUp(self):
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def feed(self):
+        response = self.reader_client.get(reverse('posts:follow_index'))
+        return list(response.context['page_obj'])
+
+    def test_follow_backfills_timeline(self):
+        """Подписка добавляет в ленту уже опубликованные посты."""
+        self.reader_client.get(reverse(
+            'posts:profile_follow', kwargs={'username': self.author}
+        ))
+        self.assertTrue(TimelineEntry.objects.filter(
+            user=self.reader, post=self.old_post
+        ).exists())
+        self.assertEqual(self.feed(), [self.old_post])
+
+    def test_new_post_fans_out_to_followers(self):
+        """Новый пост раскладывается по лентам подписчиков."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        new_post = Post.objects.create(text='Новый пост', author=self.author)
+        self.assertTrue(TimelineEntry.objects.filter(
+            user=self.reader, post=new_post
+        ).exists())
+        self.assertEqual(self.feed(), [new_post, self.old_post])
+
+    def test_unfollow_prunes_timeline(self):
+        """Отписка убирает посты автора из ленты."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.reader_client.get(reverse(
+            'posts:profile_unfollow', kwargs={'username': self.author}
+        ))
+        self.assertFalse(
+            TimelineEntry.objects.filter(user=self.reader).exists()
+        )
+        self.assertEqual(self.feed(), [])
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=0)
+    def test_heavy_author_is_read_on_demand(self):
+        """Посты популярных авторов читаются без раскладки по лентам."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        new_post = Post.objects.create(text='Новый пост', author=self.author)
+        self.assertFalse(
+            TimelineEntry.objects.filter(user=self.reader).exists()
+        )
+        self.assertEqual(self.feed(), [new_post, self.old_post])
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=1)
+    def test_author_below_limit_again_is_fanned_out(self):
+        """Когда автор снова под лимитом, его посты и подписки времён
+        «тяжёлого» режима раскладываются по лентам."""
+        other = User.objects.create_user(username='other')
+        Follow.objects.create(user=other, author=self.author)
+        Follow.objects.create(user=self.reader, author=self.author)
+        new_post = Post.objects.create(text='Новый пост', author=self.author)
+        self.assertEqual(self.feed(), [new_post, self.old_post])
+        Follow.objects.get(user=other).delete()
+        self.assertFalse(
+            TimelineEntry.objects.filter(post=new_post).exists()
+        )
+        self.assertEqual(Job.objects.count(), 1)
+        queue.work(burst=True)
+        self.assertEqual(
+            set(TimelineEntry.objects.filter(
+                user=self.reader
+            ).values_list('post', flat=True)),
+            {new_post.pk, self.old_post.pk},
+        )
+        self.assertEqual(self.feed(), [new_post, self.old_post])
@@ -0,0 +1,156 @@
+import os
+import shutil
+import tempfile
+from datetime import datetime, timezone
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from .. import counters, follow_graph
+from ..models import Comment, Follow, Group, Post, TimelineEntry, User
+
+
+class TransferCommandsTest(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.author = User.objects.create_user(username='author')
+        self.reader = User.objects.create_user(username='reader')
+        self.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        self.post = Post.objects.create(
+            text='Пост, с "кавычками"\nи переводом строки',
+            author=self.author,
+            group=self.group,
+        )
+        self.pub_date = datetime(2020, 1, 2, 3, 4, 5, tzinfo=timezone.utc)
+        Post.objects.filter(pk=self.post.pk).update(pub_date=self.pub_date)
+        Post.objects.create(text='Пост без группы', author=self.reader)
+        Comment.objects.create(
+            text='Комментарий', author=self.reader, post=self.post
+        )
+        Follow.objects.create(user=self.reader, author=self.author)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def round_trip(self, file_format):
+        path = os.path.join(self.directory, f'dump.{file_format}')
+        call_command('export_posts', path, format=file_format)
+        for model in (Follow, Comment, Post, Group):
+            model.objects.all().delete()
+        User.objects.filter(username='reader').delete()
+        call_command(
+            'import_posts', path, format=file_format, batch_size=2,
+            stdout=StringIO(),
+        )
+
+    def test_round_trip(self):
+        """Выгрузка и загрузка сохраняют данные, даты и id постов."""
+        for file_format in ('jsonl', 'csv'):
+            with self.subTest(format=file_format):
+                self.round_trip(file_format)
+                post = Post.objects.get(pk=self.post.pk)
+                self.assertEqual(post.text, self.post.text)
+                self.assertEqual(post.pub_date, self.pub_date)
+                self.assertEqual(post.group.slug, 'test-slug')
+                self.assertEqual(Post.objects.count(), 2)
+                self.assertEqual(post.comments.get().author.username,
+                                 'reader')
+                self.assertTrue(Follow.objects.filter(
+                    user__username='reader', author=self.author
+                ).exists())
+
+    def test_derived_data_rebuilt(self):
+        """После загрузки счётчики сходятся, ленты заполнены."""
+        self.round_trip('jsonl')
+        for name, queryset in counters.mismatches().items():
+            with self.subTest(counter=name):
+                self.assertFalse(queryset.exists())
+        self.assertTrue(TimelineEntry.objects.filter(
+            user__username='reader', post=self.post.pk
+        ).exists())
+
+    def test_bad_record(self):
+        """Запись неизвестного типа останавливает загрузку с ошибкой."""
+        path = os.path.join(self.directory, 'bad.jsonl')
+        with open(path, 'w', encoding='utf-8') as dump:
+            dump.write('{"type": "like"}\n')
+        with self.assertRaises(CommandError):
+            call_command('import_posts', path, stdout=StringIO())
+
+    def test_conflict_is_command_error(self):
+        """Повтор поста с тем же id без --ignore-conflicts — ошибка
+        команды, а не трассировка."""
+        path = os.path.join(self.directory, 'dump.jsonl')
+        call_command('export_posts', path)
+        with self.assertRaisesMessage(CommandError, '--ignore-conflicts'):
+            call_command('import_posts', path, stdout=StringIO())
+        stdout = StringIO()
+        call_command(
+            'import_posts', path, ignore_conflicts=True, stdout=stdout
+        )
+        for kind in ('group', 'post', 'comment', 'follow'):
+            self.assertIn(f'{kind}: 0\n', stdout.getvalue())
+        self.assertEqual(Comment.objects.count(), 1)
+
+    def test_ignore_conflicts_refuses_other_post(self):
+        """Чужой пост с тем же id не пропускается: комментарии из файла
+        не прикрепляются к нему."""
+        path = os.path.join(self.directory, 'dump.jsonl')
+        call_command('export_posts', path)
+        Comment.objects.all().delete()
+        Post.objects.filter(pk=self.post.pk).update(text='Другой пост')
+        with self.assertRaisesMessage(CommandError, 'чужому посту'):
+            call_command(
+                'import_posts', path, ignore_conflicts=True,
+                stdout=StringIO(),
+            )
+        self.assertFalse(Comment.objects.exists())
+
+    def test_import_resets_caches_and_validators(self):
+        """Профиль и граф подписок после загрузки не отдают старое."""
+        cache.clear()
+        client = Client()
+        client.force_login(self.reader)
+        url = reverse('posts:profile', args=(self.author.username,))
+        etag = client.get(url)['ETag']
+        self.assertEqual(
+            follow_graph.followee_ids(self.reader.pk), {self.author.pk}
+        )
+        path = os.path.join(self.directory, 'dump.jsonl')
+        with open(path, 'w', encoding='utf-8') as dump:
+            dump.write(
+                '{"type": "post", "id": 1000, "author": "author", '
+                '"text": "Загруженный пост", '
+                '"pub_date": "2021-01-01T00:00:00+00:00"}\n'
+                '{"type": "follow", "user": "reader", "author": "newcomer"}\n'
+            )
+        call_command('import_posts', path, stdout=StringIO())
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertContains(response, 'Загруженный пост')
+        self.assertEqual(
+            follow_graph.followee_ids(self.reader.pk),
+            {self.author.pk, User.objects.get(username='newcomer').pk},
+        )
+
+    def test_recount_rebuilds_timelines(self):
+        """recount_posts --timelines заполняет ленты после загрузки
+        с --skip-rebuild."""
+        path = os.path.join(self.directory, 'dump.jsonl')
+        call_command('export_posts', path)
+        for model in (Follow, Comment, Post, Group):
+            model.objects.all().delete()
+        call_command(
+            'import_posts', path, skip_rebuild=True, stdout=StringIO()
+        )
+        self.assertFalse(TimelineEntry.objects.exists())
+        call_command('recount_posts', timelines=True, stdout=StringIO())
+        self.assertTrue(TimelineEntry.objects.filter(
+            user=self.reader, post=self.post.pk
+        ).exists())
@@ -1,9 +1,13 @@
+import base64
+import json
 import shutil
 
 from django import forms
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.core.cache import cache
+from django.db import connection
 from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
 from ..models import Follow, Group, Post, User
@@ -224,19 +228,34 @@ class PostURLTests(TestCase):
         self.assertNotIn(test_post, page_with_posts)
 
     def test_cache(self):
-        """"Корректность работы кеша для шаблона index."""
+        """"Кеш главной страницы сбрасывается событиями, а не по таймеру."""
         post = Post.objects.create(
             text='Тестовый текст для кеширования',
             author=self.user,
             group=self.group,
         )
-        response_1 = self.client.get(reverse('posts:index')).content
+        self.client.get(reverse('posts:index'))
+        self.client.get(reverse('posts:index'))
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('posts:index'))
+        self.assertIn(post, response.context['page_obj'])
+        post.text = 'Изменённый текст'
+        post.save()
+        response = self.client.get(reverse('posts:index'))
+        self.assertEqual(response.context['page_obj'][0].text, post.text)
         post.delete()
-        response_2 = self.client.get(reverse('posts:index')).content
-        self.assertEqual(response_1, response_2)
-        cache.clear()
-        response_3 = self.client.get(reverse('posts:index')).content
-        self.assertNotEqual(response_1, response_3)
+        response = self.client.get(reverse('posts:index'))
+        self.assertNotIn(post, response.context['page_obj'])
+
+    def test_cache_follows_group_changes(self):
+        """Изменение группы сразу видно в закешированной ленте."""
+        self.client.get(reverse('posts:index'))
+        self.client.get(reverse('posts:index'))
+        group = Group.objects.get(pk=self.group.pk)
+        group.slug = 'new-slug'
+        group.save()
+        response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, '/group/new-slug/')
 
 
 class FollowTests(TestCase):
@@ -348,3 +367,99 @@ class PaginatorViewsTest(TestCase):
             with self.subTest(reverse_name=reverse_name):
                 response = self.authorized_client.get(reverse_name)
                 self.assertEqual(len(response.context['page_obj']), posts)
+
+
+@override_settings(POSTS_CURSOR_PAGINATION=True)
+class CursorPaginatorViewsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='UM')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        Post.objects.bulk_create([
+            Post(text=f'Тестовый пост {i}', author=cls.user, group=cls.group)
+            for i in range(13)
+        ])
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+        cache.clear()
+
+    def test_cursor_pages_contain_posts(self):
+        """Курсорная пагинация листает ленты вперёд и назад."""
+        feeds = (
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile', kwargs={'username': self.user}),
+            reverse('posts:follow_index'),
+        )
+        Follow.objects.create(user=User.objects.create_user('reader'),
+                              author=self.user)
+        self.authorized_client.force_login(User.objects.get(
+            username='reader'
+        ))
+        expected = list(Post.objects.order_by('-pub_date', '-id'))
+        for url in feeds:
+            with self.subTest(url=url):
+                first = self.authorized_client.get(url).context['page_obj']
+                self.assertEqual(
+                    list(first), expected[:POSTS_NUMBER_PER_PAGE]
+                )
+                self.assertFalse(first.has_previous())
+                second = self.authorized_client.get(
+                    url, {'cursor': first.next_cursor}
+                ).context['page_obj']
+                self.assertEqual(
+                    list(second), expected[POSTS_NUMBER_PER_PAGE:]
+                )
+                self.assertFalse(second.has_next())
+                back = self.authorized_client.get(
+                    url, {'cursor': second.previous_cursor}
+                ).context['page_obj']
+                self.assertEqual(list(back), list(first))
+
+    def test_cursor_page_skips_count_query(self):
+        """Курсорная страница не выполняет COUNT(*)."""
+        first = self.client.get(reverse('posts:index')).context['page_obj']
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(
+                reverse('posts:index'), {'cursor': first.next_cursor}
+            )
+        for query in queries:
+            self.assertNotIn('COUNT(', query['sql'].upper())
+
+    def test_invalid_cursor_returns_first_page(self):
+        """Испорченный курсор открывает первую страницу."""
+        response = self.client.get(
+            reverse('posts:index'), {'cursor': 'broken'}
+        )
+        self.assertEqual(
+            len(response.context['page_obj']), POSTS_NUMBER_PER_PAGE
+        )
+
+    def test_out_of_range_cursor_returns_first_page(self):
+        """Поддельный курсор со значением, которое не примет база,
+        открывает первую страницу, а не падает с 500."""
+        post = Post.objects.first()
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:post_detail', args=(post.pk,)),
+        )
+        forged = (
+            [str(post.pub_date), str(10 ** 30)],
+            ['9999-12-31 23:59:59-05:00', str(post.pk)],
+        )
+        for url in urls:
+            for values in forged:
+                cursor = base64.urlsafe_b64encode(
+                    json.dumps(['n', values]).encode()
+                ).decode()
+                with self.subTest(url=url, values=values):
+                    response = self.client.get(url, {'cursor': cursor})
+                    self.assertEqual(response.status_code, 200)
@@ -0,0 +1,33 @@
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test.utils import CaptureQueriesContext
+
+
+class MaxQueriesContext(CaptureQueriesContext):
+    def __init__(self, test_case, budget, connection):
+        self.test_case = test_case
+        self.budget = budget
+        super().__init__(connection)
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        super().__exit__(exc_type, exc_value, traceback)
+        if exc_type is not None:
+            return
+        executed = len(self)
+        self.test_case.assertLessEqual(
+            executed, self.budget,
+            '%d queries executed, budget is %d\n%s' % (
+                executed, self.budget, '\n'.join(
+                    '%d. %s' % (number, query['sql'])
+                    for number, query in enumerate(self.captured_queries,
+                                                   start=1)
+                )
+            )
+        )
+
+
+class QueryBudgetMixin:
+    """Проверка верхней границы числа SQL-запросов, в отличие от
+    assertNumQueries, которая требует точного совпадения."""
+
+    def assertMaxQueries(self, budget, using=DEFAULT_DB_ALIAS):
+        return MaxQueriesContext(self, budget, connections[using])
@@ -0,0 +1,125 @@
+import logging
+import posixpath
+from io import BytesIO
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files.base import ContentFile
+from django.utils import timezone
+from PIL import Image, ImageOps
+
+from jobs.queue import task
+
+from . import conditional, feed_cache
+from .models import Post, thumbnail_name
+
+logger = logging.getLogger(__name__)
+
+MASTER_EXTENSIONS = {'JPEG': 'jpg', 'WEBP': 'webp'}
+# Метаданные, которые не переносятся в мастер. ICC-профиль остаётся:
+# без него меняются цвета.
+METADATA = {'exif', 'xmp', 'XML:com.adobe.xmp', 'comment', 'photoshop'}
+
+
+def storage():
+    return Post._meta.get_field('image').storage
+
+
+def render(image, size):
+    thumbnail = ImageOps.fit(image, size, Image.LANCZOS)
+    buffer = BytesIO()
+    thumbnail.save(
+        buffer, 'JPEG', quality=settings.THUMBNAIL_QUALITY, optimize=True
+    )
+    return ContentFile(buffer.getvalue())
+
+
+def needs_master(image):
+    width, height = settings.IMAGE_MASTER_SIZE
+    return (
+        image.format != settings.IMAGE_MASTER_FORMAT
+        or image.width > width or image.height > height
+        or bool(METADATA & set(image.info))
+    )
+
+
+def flatten(image):
+    """RGB-копия с поворотом из EXIF; прозрачное — на белом фоне."""
+    image = ImageOps.exif_transpose(image)
+    if image.mode == 'RGB':
+        return image
+    image = image.convert('RGBA')
+    background = Image.new('RGB', image.size, 'white')
+    background.paste(image, mask=image.getchannel('A'))
+    return background
+
+
+def make_master(image_name, image):
+    """Пережать оригинал в мастер: поворот применён, метаданные убраны,
+    размер не больше IMAGE_MASTER_SIZE. Возвращает имя мастера
+    в хранилище и его картинку; подходящий оригинал остаётся как есть.
+    """
+    if not needs_master(image):
+        return image_name, image.convert('RGB')
+    master = flatten(image)
+    master.thumbnail(settings.IMAGE_MASTER_SIZE, Image.LANCZOS)
+    buffer = BytesIO()
+    master.save(
+        buffer, settings.IMAGE_MASTER_FORMAT,
+        quality=settings.IMAGE_MASTER_QUALITY, optimize=True,
+        progressive=True, icc_profile=image.info.get('icc_profile'),
+    )
+    extension = MASTER_EXTENSIONS[settings.IMAGE_MASTER_FORMAT]
+    name = f'{posixpath.splitext(image_name)[0]}.{extension}'
+    return storage().save(name, ContentFile(buffer.getvalue())), master
+
+
+@task
+def generate(post_id, image_name):
+    """Пережать оригинал в мастер, нарезать с него превью и отметить
+    пост готовым. Пост начинает ссылаться на мастер, оригинал
+    удаляется."""
+    try:
+        with storage().open(image_name) as image_file:
+            image = Image.open(image_file)
+            image.load()
+        master_name, master = make_master(image_name, image)
+        for size_name, size in settings.THUMBNAIL_SIZES.items():
+            name = thumbnail_name(master_name, size_name)
+            storage().delete(name)
+            storage().save(name, render(master, size))
+    except (OSError, ValueError, SuspiciousFileOperation):
+        logger.warning('Не удалось сделать превью %s', image_name,
+                       exc_info=True)
+        return
+    updated = Post.objects.filter(pk=post_id, image=image_name).update(
+        image=master_name, thumbnails_ready=True, updated=timezone.now()
+    )
+    if updated:
+        conditional.touch_feeds(*Post.objects.filter(pk=post_id).values_list(
+            'author_id', 'group_id'
+        ).get())
+    if master_name != image_name:
+        # Без обновления поста (картинку заменили или пост удалили)
+        # не нужен сам мастер.
+        storage().delete(image_name if updated else master_name)
+    feed_cache.forget(Post, post_id)
+
+
+@task
+def discard(image_name):
+    try:
+        for size_name in settings.THUMBNAIL_SIZES:
+            storage().delete(thumbnail_name(image_name, size_name))
+    except (OSError, SuspiciousFileOperation):
+        logger.warning('Не удалось удалить превью %s', image_name,
+                       exc_info=True)
+
+
+def schedule(post):
+    """Нарезать превью в фоновой очереди, не задерживая запрос."""
+    generate.delay(post.pk, post.image.name)
+
+
+def schedule_discard(image_name):
+    discard.delay(image_name)
@@ -0,0 +1,147 @@
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Q
+
+from jobs.queue import task
+
+from .models import Follow, Post, Profile, TimelineEntry
+
+
+def is_heavy(author_id):
+    """Посты авторов с большим числом подписчиков не раскладываются
+    по лентам при записи, а подмешиваются при чтении."""
+    return Profile.objects.filter(
+        user_id=author_id,
+        followers_count__gt=settings.TIMELINE_FANOUT_LIMIT,
+    ).exists()
+
+
+def add_entries(user_ids, posts):
+    TimelineEntry.objects.bulk_create(
+        (
+            TimelineEntry(user_id=user_id, post_id=post_id, pub_date=pub_date)
+            for user_id in user_ids
+            for post_id, pub_date in posts
+        ),
+        batch_size=settings.TIMELINE_BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+
+
+def fan_out(post):
+    if is_heavy(post.author_id):
+        return
+    follower_ids = Follow.objects.filter(
+        author_id=post.author_id
+    ).values_list('user_id', flat=True)
+    add_entries(follower_ids, [(post.pk, post.pub_date)])
+
+
+def backfill(follow):
+    if is_heavy(follow.author_id):
+        return
+    posts = Post.objects.filter(
+        author_id=follow.author_id
+    ).values_list('pk', 'pub_date')[:settings.TIMELINE_BACKFILL_SIZE]
+    add_entries([follow.user_id], posts)
+
+
+def prune(follow):
+    TimelineEntry.objects.filter(
+        user_id=follow.user_id,
+        post__author_id=follow.author_id,
+    ).delete()
+
+
+def settle(author_id):
+    """Разложить посты автора по лентам подписчиков, если отписка только
+    что вернула его под TIMELINE_FANOUT_LIMIT. Пока он был «тяжёлым»,
+    его новые посты и подписки на него в ленты не попадали, а читаться
+    напрямую они больше не будут.
+
+    Это до TIMELINE_BACKFILL_SIZE постов на каждого подписчика, поэтому
+    раскладка идёт фоновой задачей, а не в запросе отписки."""
+    crossed = Profile.objects.filter(
+        user_id=author_id,
+        followers_count=settings.TIMELINE_FANOUT_LIMIT,
+    ).exists()
+    if crossed:
+        fan_out_author.delay(author_id)
+
+
+@task
+def fan_out_author(author_id):
+    if is_heavy(author_id):
+        # Автор снова над лимитом, пока задача ждала очереди.
+        return
+    copy_follows(Follow.objects.filter(author_id=author_id))
+
+
+def followed_posts(user):
+    """Лента подписок: материализованные записи плюс посты
+    «тяжёлых» авторов, которые читаются напрямую."""
+    heavy_ids = list(Follow.objects.filter(
+        user=user,
+        author__profile__followers_count__gt=settings.TIMELINE_FANOUT_LIMIT,
+    ).values_list('author_id', flat=True))
+    if not heavy_ids:
+        # Диапазон индекса (user, -pub_date) без сортировки постов.
+        return Post.objects.filter(timeline_entries__user=user).order_by(
+            '-timeline_entries__pub_date'
+        )
+    return Post.objects.filter(
+        Q(pk__in=TimelineEntry.objects.filter(user=user).values('post'))
+        | Q(author_id__in=heavy_ids)
+    )
+
+
+BACKFILL_SQL = """
+    INSERT INTO {entries} (user_id, post_id, pub_date)
+    SELECT %s, id, pub_date FROM {posts}
+    WHERE author_id = %s
+    ORDER BY pub_date DESC, id DESC
+    LIMIT %s
+    ON CONFLICT DO NOTHING
+"""
+
+
+def copy_posts(follows):
+    """Последние посты авторов в ленты подписчиков одним INSERT ... SELECT
+    на пару (подписчик, автор), без объектов в Python."""
+    sql = BACKFILL_SQL.format(
+        entries=TimelineEntry._meta.db_table, posts=Post._meta.db_table
+    )
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.executemany(sql, [
+            (user_id, author_id, settings.TIMELINE_BACKFILL_SIZE)
+            for user_id, author_id in follows
+        ])
+
+
+def copy_follows(follows):
+    """copy_posts для подписок из запроса, пачками по
+    TIMELINE_BATCH_SIZE, каждая в своей транзакции."""
+    follows = follows.order_by('pk').values_list('pk', 'user_id', 'author_id')
+    # Подписки читаются пачками по ключу, а не одним открытым курсором:
+    # пока курсор открыт, SQLite в режиме WAL не может сбросить журнал.
+    last_pk = 0
+    while True:
+        batch = list(
+            follows.filter(pk__gt=last_pk)[:settings.TIMELINE_BATCH_SIZE]
+        )
+        if not batch:
+            return
+        copy_posts(
+            (user_id, author_id) for _, user_id, author_id in batch
+        )
+        last_pk = batch[-1][0]
+
+
+def rebuild():
+    """Разложить посты по лентам заново, например после загрузки
+    данных через bulk_create, которая не вызывает сигналов.
+    Счётчики подписчиков должны быть уже пересчитаны."""
+    TimelineEntry.objects.all().delete()
+    copy_follows(Follow.objects.exclude(
+        author__profile__followers_count__gt=settings.TIMELINE_FANOUT_LIMIT
+    ))
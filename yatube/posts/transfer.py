@@ -0,0 +1,306 @@
+"""Выгрузка и загрузка постов, комментариев, групп и подписок.
+
+Файл — поток записей, у каждой есть поле type. Группы, посты,
+комментарии и подписки выгружаются именно в таком порядке, поэтому
+при загрузке всё, на что ссылается запись, уже загружено. Посты
+сохраняют свои id: на них ссылаются комментарии.
+"""
+import csv
+import json
+from collections import Counter
+from contextlib import contextmanager
+from operator import attrgetter
+
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.utils.dateparse import parse_datetime
+
+from . import conditional, feed_cache, follow_graph
+from .models import Comment, Follow, Group, Post, User
+
+FIELDS = {
+    'group': ('slug', 'title', 'description'),
+    'post': ('id', 'author', 'group', 'text', 'pub_date', 'image'),
+    'comment': ('post', 'author', 'text', 'created'),
+    'follow': ('user', 'author'),
+}
+CSV_FIELDS = ('type', 'id', 'slug', 'title', 'description', 'post', 'user',
+              'author', 'group', 'text', 'pub_date', 'created', 'image')
+MODELS = {
+    'group': Group,
+    'post': Post,
+    'comment': Comment,
+    'follow': Follow,
+}
+
+# Ключи, по которым --ignore-conflicts узнаёт уже загруженные записи.
+KEYS = {
+    'group': attrgetter('slug'),
+    'post': attrgetter('pk'),
+    'comment': attrgetter('post_id', 'author_id', 'text', 'created'),
+    'follow': attrgetter('user_id', 'author_id'),
+}
+POST_IDENTITY_FIELDS = ('author_id', 'pub_date', 'text')
+POST_IDENTITY = attrgetter(*POST_IDENTITY_FIELDS)
+
+
+class ConflictError(Exception):
+    """Пост из файла занимает id другого поста в базе."""
+
+
+def check_same(post, identity):
+    if POST_IDENTITY(post) != identity:
+        raise ConflictError(
+            f'Пост id={post.pk} уже есть в базе или в файле, '
+            'но с другим автором, датой или текстом'
+        )
+
+
+def export_records(chunk_size):
+    groups = Group.objects.values_list(*FIELDS['group'])
+    posts = Post.objects.order_by('pk').values_list(
+        'pk', 'author__username', 'group__slug', 'text', 'pub_date', 'image'
+    )
+    comments = Comment.objects.order_by('pk').values_list(
+        'post_id', 'author__username', 'text', 'created'
+    )
+    follows = Follow.objects.order_by('pk').values_list(
+        'user__username', 'author__username'
+    )
+    for kind, queryset in (
+        ('group', groups),
+        ('post', posts),
+        ('comment', comments),
+        ('follow', follows),
+    ):
+        for row in queryset.iterator(chunk_size=chunk_size):
+            record = {'type': kind}
+            for field, value in zip(FIELDS[kind], row):
+                if hasattr(value, 'isoformat'):
+                    value = value.isoformat()
+                record[field] = value
+            yield record
+
+
+def write_jsonl(records, output):
+    for record in records:
+        output.write(json.dumps(record, ensure_ascii=False))
+        output.write('\n')
+
+
+def write_csv(records, output):
+    writer = csv.DictWriter(output, CSV_FIELDS, restval='')
+    writer.writeheader()
+    for record in records:
+        writer.writerow({
+            field: '' if value is None else value
+            for field, value in record.items()
+        })
+
+
+def read_jsonl(lines):
+    for line in lines:
+        if line.strip():
+            yield json.loads(line)
+
+
+def read_csv(lines):
+    for row in csv.DictReader(lines):
+        yield {
+            field: value for field, value in row.items()
+            if value != '' or field == 'text'
+        }
+
+
+@contextmanager
+def keep_dates():
+    """bulk_create не подменяет даты из файла на текущее время."""
+    fields = [
+        Post._meta.get_field('pub_date'),
+        Comment._meta.get_field('created'),
+    ]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+class Importer:
+    """Загрузка пачками через bulk_create.
+
+    Пользователи и группы ищутся по словарям в памяти, неизвестные
+    пользователи создаются. Каждая пачка пишется в своей транзакции,
+    в памяти держится не больше batch_size записей каждого типа.
+    Сигналы при bulk_create не отправляются, поэтому счётчики и ленты
+    после загрузки нужно пересчитать, а кеши и валидаторы задетых
+    страниц сбросить (forget_cached).
+    """
+
+    def __init__(self, batch_size, ignore_conflicts=False):
+        self.batch_size = batch_size
+        self.ignore_conflicts = ignore_conflicts
+        self.buffers = {kind: [] for kind in MODELS}
+        self.counts = dict.fromkeys(MODELS, 0)
+        self.users = dict(User.objects.values_list('username', 'pk'))
+        self.groups = dict(Group.objects.values_list('slug', 'pk'))
+        self.author_ids = set()
+        self.group_ids = set()
+        self.commented_ids = set()
+        self.follows = set()
+
+    def user_id(self, username):
+        if username not in self.users:
+            self.users[username] = User.objects.create(username=username).pk
+        return self.users[username]
+
+    def build(self, record):
+        kind = record['type']
+        if kind == 'group':
+            return Group(
+                slug=record['slug'],
+                title=record['title'],
+                description=record.get('description', ''),
+            )
+        if kind == 'post':
+            post = Post(
+                pk=int(record['id']),
+                author_id=self.user_id(record['author']),
+                group_id=self.groups.get(record.get('group')),
+                text=record['text'],
+                pub_date=parse_datetime(record['pub_date']),
+                image=record.get('image') or '',
+            )
+            self.author_ids.add(post.author_id)
+            if post.group_id is not None:
+                self.group_ids.add(post.group_id)
+            return post
+        if kind == 'comment':
+            comment = Comment(
+                post_id=int(record['post']),
+                author_id=self.user_id(record['author']),
+                text=record['text'],
+                created=parse_datetime(record['created']),
+            )
+            self.commented_ids.add(comment.post_id)
+            return comment
+        if kind == 'follow':
+            follow = Follow(
+                user_id=self.user_id(record['user']),
+                author_id=self.user_id(record['author']),
+            )
+            self.author_ids.add(follow.author_id)
+            self.follows.add((follow.user_id, follow.author_id))
+            return follow
+        raise ValueError(f'Неизвестный тип записи: {kind}')
+
+    def add(self, record):
+        if record['type'] != 'group' and self.buffers['group']:
+            # Посты ищут группы по slug: сначала записать группы.
+            self.flush()
+        obj = self.build(record)
+        buffer = self.buffers[record['type']]
+        buffer.append(obj)
+        if len(buffer) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        # Пачки пишутся в порядке зависимостей, чтобы комментарии
+        # не ушли в базу раньше своих постов.
+        with keep_dates(), transaction.atomic():
+            for kind, model in MODELS.items():
+                buffer = self.buffers[kind]
+                if not buffer:
+                    continue
+                if self.ignore_conflicts:
+                    buffer = self.fresh(kind, buffer)
+                model.objects.bulk_create(
+                    buffer, ignore_conflicts=self.ignore_conflicts
+                )
+                self.counts[kind] += len(buffer)
+                self.buffers[kind] = []
+                if kind == 'group':
+                    self.groups = dict(
+                        Group.objects.values_list('slug', 'pk')
+                    )
+
+    def fresh(self, kind, objs):
+        """Записи пачки, которых нет ни в базе, ни выше в этой пачке.
+
+        Пост с тем же id, но другим автором, датой или текстом — не
+        повтор, а чужой пост: комментарии из файла попали бы к нему,
+        поэтому загрузка останавливается.
+        """
+        existing = self.existing(kind, objs)
+        result = []
+        for obj in objs:
+            key = KEYS[kind](obj)
+            if existing[key]:
+                # Одинаковые комментарии возможны: каждый из базы
+                # закрывает только один такой же из файла.
+                if kind == 'comment':
+                    existing[key] -= 1
+                continue
+            result.append(obj)
+            if kind != 'comment':
+                existing[key] = 1
+        return result
+
+    def existing(self, kind, objs):
+        if kind == 'group':
+            return Counter(self.groups)
+        if kind == 'post':
+            loaded = {}
+            for obj in objs:
+                check_same(obj, POST_IDENTITY(loaded.setdefault(obj.pk, obj)))
+            rows = list(Post.objects.filter(pk__in=loaded).values_list(
+                'pk', *POST_IDENTITY_FIELDS
+            ))
+            for pk, *values in rows:
+                check_same(loaded[pk], tuple(values))
+            return Counter(pk for pk, *_ in rows)
+        if kind == 'comment':
+            return Counter(Comment.objects.filter(
+                post_id__in={obj.post_id for obj in objs},
+                created__range=(
+                    min(obj.created for obj in objs),
+                    max(obj.created for obj in objs),
+                ),
+            ).values_list('post_id', 'author_id', 'text', 'created'))
+        return Counter(Follow.objects.filter(
+            user_id__in={obj.user_id for obj in objs},
+            author_id__in={obj.author_id for obj in objs},
+        ).values_list('user_id', 'author_id'))
+
+    def load(self, records):
+        for record in records:
+            self.add(record)
+        self.flush()
+        self.reset_sequences()
+        return self.counts
+
+    def forget_cached(self):
+        """Сбросить кеши и валидаторы ETag страниц, которые задела
+        загрузка: ленты, профили и группы с новыми постами, графы
+        подписок и посты с новыми комментариями."""
+        feed_cache.bump_feed_version('index')
+        conditional.touch(
+            'index', 'users', 'groups',
+            *(f'author:{pk}' for pk in self.author_ids),
+            *(f'group:{pk}' for pk in self.group_ids),
+            *(f'follows:{user_id}' for user_id, _ in self.follows),
+        )
+        follow_graph.forget_many(self.follows)
+        feed_cache.forget(Post, *self.commented_ids)
+
+    def reset_sequences(self):
+        """Посты загружены с явными id: сдвинуть автоинкремент
+        (нужно PostgreSQL, для SQLite запросов нет)."""
+        statements = connection.ops.sequence_reset_sql(
+            no_style(), list(MODELS.values())
+        )
+        with connection.cursor() as cursor:
+            for statement in statements:
+                cursor.execute(statement)
@@ -1,12 +1,171 @@
+import base64
+import binascii
+import json
+from collections.abc import Sequence
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
 from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Q
 
+from . import follow_graph
 from yatube.settings import POSTS_NUMBER_PER_PAGE
 
+NEXT = 'n'
+PREVIOUS = 'p'
+# Знаковое 64-битное целое: больше не примет ни одна из баз.
+INTEGER_RANGE = range(-2 ** 63, 2 ** 63)
 
-def pages(queryset, request):
+
+class CursorPage(Sequence):
+    is_cursor = True
+
+    def __init__(self, object_list, paginator, next_cursor, previous_cursor):
+        self.object_list = object_list
+        self.paginator = paginator
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __repr__(self):
+        return '<CursorPage of %s objects>' % len(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_previous() or self.has_next()
+
+
+class CursorPaginator:
+    """Keyset-пагинатор: страница ищется по ключу сортировки,
+    без COUNT(*) и OFFSET, поэтому стоимость не зависит от глубины."""
+
+    def __init__(self, queryset, per_page, ordering=('-pub_date', '-id')):
+        self.queryset = queryset
+        self.per_page = per_page
+        self.ordering = ordering
+
+    def _names(self):
+        return [field.lstrip('-') for field in self.ordering]
+
+    def encode(self, direction, obj):
+        # Строки из values() — словари, а не объекты моделей.
+        if isinstance(obj, dict):
+            values = [str(obj[name]) for name in self._names()]
+        else:
+            values = [str(getattr(obj, name)) for name in self._names()]
+        raw = json.dumps([direction, values]).encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+    def decode(self, cursor):
+        """Вернуть (направление, значения ключа) или (None, None)."""
+        if not cursor:
+            return None, None
+        try:
+            raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+            direction, values = json.loads(raw.decode())
+            fields = [
+                self.queryset.model._meta.get_field(name)
+                for name in self._names()
+            ]
+            values = [
+                field.to_python(value) for field, value in zip(fields, values)
+            ]
+            # Курсор не подписан: значение, которое база не примет
+            # (дата за 9999 годом после перевода в UTC), — это подделка,
+            # а не ошибка сервера.
+            connection = connections[self.queryset.db]
+            for field, value in zip(fields, values):
+                field.get_db_prep_value(value, connection)
+        except (
+            binascii.Error, OverflowError, ValueError, TypeError,
+            ValidationError,
+        ):
+            return None, None
+        if direction not in (NEXT, PREVIOUS) or None in values:
+            return None, None
+        if any(
+            isinstance(value, int) and value not in INTEGER_RANGE
+            for value in values
+        ):
+            return None, None
+        if len(values) != len(self.ordering):
+            return None, None
+        return direction, values
+
+    def _seek(self, values, reverse):
+        condition = Q()
+        for position, field in enumerate(self.ordering):
+            descending = field.startswith('-') != reverse
+            lookup = 'lt' if descending else 'gt'
+            name = field.lstrip('-')
+            step = Q(**{f'{name}__{lookup}': values[position]})
+            for prev_name, prev_value in zip(self._names(), values):
+                if prev_name == name:
+                    break
+                step &= Q(**{prev_name: prev_value})
+            condition |= step
+        return condition
+
+    def _reversed_ordering(self):
+        return [
+            field[1:] if field.startswith('-') else '-' + field
+            for field in self.ordering
+        ]
+
+    def get_page(self, cursor):
+        direction, values = self.decode(cursor)
+        queryset = self.queryset
+        if values is None:
+            direction = NEXT
+            queryset = queryset.order_by(*self.ordering)
+        elif direction == NEXT:
+            queryset = queryset.filter(
+                self._seek(values, reverse=False)
+            ).order_by(*self.ordering)
+        else:
+            queryset = queryset.filter(
+                self._seek(values, reverse=True)
+            ).order_by(*self._reversed_ordering())
+        rows = list(queryset[:self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if direction == PREVIOUS:
+            rows.reverse()
+            has_next, has_previous = True, has_more
+        else:
+            has_next, has_previous = has_more, values is not None
+        next_cursor = previous_cursor = None
+        if rows and has_next:
+            next_cursor = self.encode(NEXT, rows[-1])
+        if rows and has_previous:
+            previous_cursor = self.encode(PREVIOUS, rows[0])
+        return CursorPage(rows, self, next_cursor, previous_cursor)
+
+
+def get_paginator(queryset, request):
+    """Пагинатор ленты и номер (или курсор) запрошенной страницы."""
+    if settings.POSTS_CURSOR_PAGINATION:
+        paginator = CursorPaginator(queryset, POSTS_NUMBER_PER_PAGE)
+        return paginator, request.GET.get('cursor')
     paginator = Paginator(queryset, POSTS_NUMBER_PER_PAGE)
-    page_number = request.GET.get('page')
+    return paginator, request.GET.get('page')
+
+
+def pages(queryset, request):
+    paginator, page_number = get_paginator(queryset, request)
     page_obj = paginator.get_page(page_number)
+    follow_graph.mark_following(request.user, page_obj)
     return {
         'paginator': paginator,
         'page_number': page_number,
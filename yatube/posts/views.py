@@ -1,24 +1,44 @@
+from urllib.parse import urlencode
+
+from django.conf import settings
 from django.contrib.auth.decorators import login_required
+from django.core.paginator import Paginator
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404, redirect, render
-from django.views.decorators.cache import cache_page
+from django.template.loader import get_template, render_to_string
+from django.views.decorators.http import condition
+
+from core.ratelimit import rate_limit
 
+from . import (
+    comment_buffer, conditional, feed_cache, follow_graph, search, timeline,
+)
 from .forms import CommentForm, PostForm
-from .models import Follow, Group, Post, User
-from .utils import pages
+from .models import Follow, Post, User
+from .utils import CursorPaginator, pages
+from yatube.settings import (
+    COMMENTS_PER_PAGE, COMMENTS_STREAM_CHUNK, POSTS_NUMBER_PER_PAGE,
+)
 
+COMMENTS_ORDERING = ('-created', '-id')
+# Пользовательский текст экранируется, поэтому в разметке страницы
+# такой комментарий может появиться только из шаблона.
+STREAM_MARKER = '<!-- comments -->'
 
-@cache_page(20, key_prefix='index_page')
+
+@condition(etag_func=conditional.index_etag)
 def index(request):
     template_name = 'posts/index.html'
-    post_list = Post.objects.all()
-    context = pages(post_list, request)
+    post_list = Post.objects.select_related('author', 'group')
+    context = feed_cache.pages(post_list, request, 'index')
     return render(request, template_name, context)
 
 
+@condition(etag_func=conditional.group_etag)
 def group_posts(request, slug):
     template_name = 'posts/group_list.html'
-    group = get_object_or_404(Group, slug=slug)
-    posts = group.posts.all()
+    group = conditional.get_group(request, slug)
+    posts = group.posts.select_related('author', 'group')
     context = {
         'group': group,
         'posts': posts,
@@ -27,36 +47,103 @@ def group_posts(request, slug):
     return render(request, template_name, context)
 
 
+@condition(etag_func=conditional.profile_etag)
 def profile(request, username):
     template_name = 'posts/profile.html'
-    author = get_object_or_404(User, username=username)
-    posts_number = author.posts.all().count()
-    following = request.user.is_authenticated and Follow.objects.filter(
-        user=request.user, author=author
-    ).exists()
+    author = conditional.get_author(request, username)
+    profile = getattr(author, 'profile', None)
+    posts_number = profile.posts_count if profile else 0
+    following = follow_graph.is_following(request.user, author.pk)
     context = {
         'author': author,
         'posts_number': posts_number,
         'following': following,
     }
-    context.update(pages(author.posts.all(), request))
+    context.update(pages(
+        author.posts.select_related('author', 'group'), request
+    ))
+    return render(request, template_name, context)
+
+
+def search_posts(request):
+    template_name = 'posts/search.html'
+    query = request.GET.get('q', '').strip()
+    results = search.search_posts(query)
+    paginator = Paginator(results, POSTS_NUMBER_PER_PAGE)
+    page_obj = paginator.get_page(request.GET.get('page'))
+    follow_graph.mark_following(request.user, page_obj)
+    context = {
+        'query': query,
+        'page_obj': page_obj,
+        'page_query': urlencode({'q': query}) + '&',
+    }
     return render(request, template_name, context)
 
 
+@condition(etag_func=conditional.post_etag,
+           last_modified_func=conditional.post_last_modified)
 def post_detail(request, post_id):
     template_name = 'posts/post_detail.html'
-    one_post = get_object_or_404(Post, id=post_id)
+    one_post = conditional.get_post(request, post_id)
     form = CommentForm(request.POST or None)
-    comments = one_post.comments.all()
+    comments = CursorPaginator(
+        one_post.comments.select_related('author'),
+        COMMENTS_PER_PAGE,
+        ordering=COMMENTS_ORDERING,
+    ).get_page(request.GET.get('cursor'))
     context = {
         'one_post': one_post,
         'form': form,
         'comments': comments,
+        'pending_comments': conditional.get_pending(request, one_post),
     }
     return render(request, template_name, context)
 
 
+def post_comments(request, post_id):
+    """Пост со всеми комментариями: страница отдаётся потоком, начало
+    с текстом поста уходит сразу, комментарии читаются пачками."""
+    template_name = 'posts/post_detail.html'
+    one_post = get_object_or_404(
+        Post.objects.select_related('author__profile', 'group'), id=post_id
+    )
+    context = {
+        'one_post': one_post,
+        'form': CommentForm(),
+        'stream_marker': STREAM_MARKER,
+    }
+    head, tail = render_to_string(template_name, context, request).split(
+        STREAM_MARKER
+    )
+    comments = CursorPaginator(
+        one_post.comments.select_related('author'),
+        COMMENTS_STREAM_CHUNK,
+        ordering=COMMENTS_ORDERING,
+    )
+    return StreamingHttpResponse(
+        stream_comments(head, comments, tail, request)
+    )
+
+
+def stream_comments(head, comments, tail, request):
+    # Каждая пачка — отдельный запрос по ключу, а не общий открытый
+    # курсор: медленный клиент не держит снимок чтения, и SQLite
+    # в режиме WAL может сбрасывать журнал, пока страница отдаётся.
+    yield head
+    template = get_template('posts/includes/comments.html')
+    cursor = None
+    while True:
+        page = comments.get_page(cursor)
+        if page:
+            yield template.render({'comments': page.object_list}, request)
+        if not page.has_next():
+            break
+        cursor = page.next_cursor
+    yield tail
+
+
 @login_required
+@rate_limit('post_create', methods=('POST',))
 def post_create(request):
     template_name = 'posts/create_post.html'
     form = PostForm(request.POST or None, files=request.FILES or None)
@@ -93,10 +180,17 @@ def post_edit(request, post_id):
 
 
 @login_required
+@rate_limit('add_comment')
 def add_comment(request, post_id):
     post = get_object_or_404(Post, pk=post_id)
     form = CommentForm(request.POST or None)
-    if form.is_valid():
+    if not form.is_valid():
+        return redirect('posts:post_detail', post_id=post_id)
+    if settings.COMMENT_WRITE_BEHIND:
+        comment_buffer.remember(request, comment_buffer.enqueue(
+            post, request.user, form.cleaned_data['text']
+        ))
+    else:
         comment = form.save(commit=False)
         comment.author = request.user
         comment.post = post
@@ -107,12 +201,15 @@ def add_comment(request, post_id):
 @login_required
 def follow_index(request):
     template_name = 'posts/follow.html'
-    posts = Post.objects.filter(author__following__user=request.user)
+    posts = timeline.followed_posts(request.user).select_related(
+        'author', 'group'
+    )
     context = pages(posts, request)
     return render(request, template_name, context)
 
 
 @login_required
+@rate_limit('profile_follow')
 def profile_follow(request, username):
     author = get_object_or_404(User, username=username)
     if author != request.user:
@@ -121,6 +218,7 @@ def profile_follow(request, username):
 
 
 @login_required
+@rate_limit('profile_follow')
 def profile_unfollow(request, username):
     author = get_object_or_404(User, username=username)
     Follow.objects.filter(user=request.user, author=author).delete()
@@ -0,0 +1,46 @@
+from django.contrib.auth import forms, get_user_model
+from django.contrib.auth.tokens import default_token_generator
+from django.core.mail import EmailMultiAlternatives
+from django.utils.encoding import force_bytes
+from django.utils.http import urlsafe_base64_encode
+
+from jobs.queue import task
+
+
+@task
+def send_email(subject, body, from_email, recipient_list, html_body=None):
+    message = EmailMultiAlternatives(
+        subject, body, from_email, recipient_list
+    )
+    if html_body is not None:
+        message.attach_alternative(html_body, 'text/html')
+    message.send()
+
+
+@task
+def send_password_reset(user_id, email, domain, site_name, use_https,
+                        subject_template_name, email_template_name,
+                        from_email=None, html_email_template_name=None,
+                        extra_email_context=None):
+    """Письмо со ссылкой для сброса пароля; токен создаётся здесь."""
+    User = get_user_model()
+    user = User._default_manager.filter(pk=user_id, is_active=True).first()
+    if user is None or not user.has_usable_password():
+        return
+    if getattr(user, User.get_email_field_name()).lower() != email.lower():
+        # Адрес сменился, пока задача ждала очереди.
+        return
+    context = {
+        'email': email,
+        'domain': domain,
+        'site_name': site_name,
+        'uid': urlsafe_base64_encode(force_bytes(user.pk)),
+        'user': user,
+        'token': default_token_generator.make_token(user),
+        'protocol': 'https' if use_https else 'http',
+        **(extra_email_context or {}),
+    }
+    forms.PasswordResetForm().send_mail(
+        subject_template_name, email_template_name, context, from_email,
+        email, html_email_template_name=html_email_template_name,
+    )
@@ -0,0 +1,46 @@
+import re
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.tokens import default_token_generator
+from django.core import mail
+from django.test import TestCase
+from django.urls import reverse
+
+from jobs import queue
+from jobs.models import Job
+
+User = get_user_model()
+
+
+class PasswordResetTests(TestCase):
+    def test_reset_email_is_sent_by_worker(self):
+        """Письмо для сброса пароля отправляет фоновая задача."""
+        User.objects.create_user(
+            username='UM', email='um@example.com', password='password'
+        )
+        self.client.post(
+            reverse('users:password_reset_form'),
+            {'email': 'um@example.com'},
+        )
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(Job.objects.count(), 1)
+        queue.work(burst=True)
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ['um@example.com'])
+
+    def test_reset_link_is_not_stored_in_queue(self):
+        """В задаче нет ссылки с токеном, исполнитель создаёт рабочую."""
+        user = User.objects.create_user(
+            username='UM', email='um@example.com', password='password'
+        )
+        self.client.post(
+            reverse('users:password_reset_form'),
+            {'email': 'um@example.com'},
+        )
+        payload = Job.objects.get().payload
+        self.assertNotIn('/reset/', payload)
+        self.assertNotIn(default_token_generator.make_token(user), payload)
+        queue.work(burst=True)
+        link = re.search(r'https?://\S+/reset/\S+/', mail.outbox[0].body)
+        response = self.client.get(link.group(0), follow=True)
+        self.assertTrue(response.context['validlink'])
@@ -26,6 +26,107 @@ POSTS_NUMBER_PER_PAGE = 10
 
 POSTS_FOR_SECOND_PAGE = 3
 
+POSTS_CURSOR_PAGINATION = False
+
+COMMENTS_PER_PAGE = 50
+
+COMMENTS_STREAM_CHUNK = 200
+
+TIMELINE_FANOUT_LIMIT = 1000
+
+TIMELINE_BACKFILL_SIZE = 1000
+
+TIMELINE_BATCH_SIZE = 500
+
+FEED_CACHE_TIMEOUT = 60 * 60 * 24
+
+POST_CARD_CACHE_TIMEOUT = 60 * 60 * 24
+
+FOLLOW_GRAPH_TIMEOUT = 60 * 60 * 24
+
+# Множества подписок больше этого размера не кладутся в кеш.
+FOLLOW_GRAPH_CACHE_LIMIT = 50000
+
+API_PAGE_SIZE = 20
+
+# Ответы API короче этого размера в байтах не сжимаются.
+API_COMPRESS_MIN_LENGTH = 200
+
+THUMBNAIL_SIZES = {
+    'large': (960, 539),
+    'medium': (480, 270),
+    'wide': (560, 239),
+}
+
+THUMBNAIL_QUALITY = 85
+
+# Загрузки больше этого размера пишутся во временный файл по частям,
+# а не собираются в памяти. Больше IMAGE_UPLOAD_MAX_SIZE — отклоняются
+# UploadLimitHandler, не дочитываясь.
+FILE_UPLOAD_MAX_MEMORY_SIZE = 256 * 1024
+
+FILE_UPLOAD_HANDLERS = [
+    'core.uploadhandlers.UploadLimitHandler',
+    'django.core.files.uploadhandler.MemoryFileUploadHandler',
+    'django.core.files.uploadhandler.TemporaryFileUploadHandler',
+]
+
+IMAGE_UPLOAD_MAX_SIZE = 10 * 1024 * 1024
+
+IMAGE_MAX_PIXELS = 40 * 10 ** 6
+
+# Оригинал картинки пережимается в мастер: без метаданных, не больше
+# IMAGE_MASTER_SIZE. WEBP — если Pillow собран с libwebp.
+IMAGE_MASTER_SIZE = (1920, 1920)
+
+IMAGE_MASTER_FORMAT = 'JPEG'
+
+IMAGE_MASTER_QUALITY = 85
+
+JOBS_ALWAYS_EAGER = False
+
+JOBS_MAX_ATTEMPTS = 5
+
+JOBS_RETRY_DELAY = 10
+
+JOBS_LOCK_TIMEOUT = 60 * 10
+
+JOBS_POLL_INTERVAL = 1
+
+JOBS_CLAIM_BATCH = 10
+
+SLOW_REQUEST_THRESHOLD = None
+
+METRICS_ALLOWED_IPS = ['127.0.0.1', '::1']
+
+# Адреса обратных прокси (например, ['127.0.0.1'] для nginx на той же
+# машине): для запросов с них адрес клиента берётся из X-Forwarded-For.
+TRUSTED_PROXIES = []
+
+RATE_LIMIT_ENABLED = True
+
+# Лимиты записи: (маркеров, период в секундах) на пользователя и на IP.
+# За период корзина пополняется целиком, маркеры — равномерно.
+RATE_LIMITS = {
+    'add_comment': {'user': (20, 60), 'ip': (60, 60)},
+    'post_create': {'user': (10, 60), 'ip': (30, 60)},
+    'profile_follow': {'user': (60, 60), 'ip': (180, 60)},
+}
+
+# Отложенная запись комментариев: форма проверяется сразу, комментарий
+# ложится в локальный буфер, flush_comments пишет его в базу пачками.
+COMMENT_WRITE_BEHIND = False
+
+COMMENT_BUFFER_DIR = os.path.join(BASE_DIR, 'comment_buffer')
+
+COMMENT_BUFFER_FLUSH_INTERVAL = 0.2
+
+COMMENT_BUFFER_BATCH_SIZE = 500
+
+# Сколько секунд автор видит свой комментарий из сессии, если тот
+# так и не появился в базе.
+COMMENT_BUFFER_PENDING_TIMEOUT = 60 * 5
+
 RETURN_SYMBOLS = 15
 
 TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=BASE_DIR)
@@ -37,6 +138,8 @@ INSTALLED_APPS = [
     'users.apps.UsersConfig',
     'core.apps.CoreConfig',
     'about.apps.AboutConfig',
+    'jobs.apps.JobsConfig',
+    'api.apps.ApiConfig',
     'django.contrib.admin',
     'django.contrib.auth',
     'django.contrib.contenttypes',
@@ -47,6 +150,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.MetricsMiddleware',
+    'core.middleware.ReplicaMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -61,7 +166,7 @@ ROOT_URLCONF = 'yatube.urls'
 TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'core.template_backends.DjangoTemplates',
         'DIRS': [TEMPLATES_DIR],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -84,11 +189,72 @@ WSGI_APPLICATION = 'yatube.wsgi.application'
 
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        'ENGINE': os.getenv('DB_ENGINE', 'django.db.backends.sqlite3'),
+        'NAME': os.getenv('DB_NAME', os.path.join(BASE_DIR, 'db.sqlite3')),
+        'USER': os.getenv('DB_USER', ''),
+        'PASSWORD': os.getenv('DB_PASSWORD', ''),
+        'HOST': os.getenv('DB_HOST', ''),
+        'PORT': os.getenv('DB_PORT', ''),
+        'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', 60)),
+        # За PgBouncer в режиме transaction серверные курсоры не работают.
+        'DISABLE_SERVER_SIDE_CURSORS': os.getenv('DB_POOLER') == 'transaction',
     }
 }
 
+# Реплики для чтения: DB_REPLICAS — хосты через запятую
+# (для SQLite — пути к файлам). В тестах реплики смотрят в default.
+DATABASE_REPLICAS = []
+for number, location in enumerate(
+    filter(None, os.getenv('DB_REPLICAS', '').split(',')), 1
+):
+    alias = f'replica{number}'
+    location_key = 'NAME' if 'sqlite' in DATABASES['default']['ENGINE'] else 'HOST'
+    DATABASES[alias] = dict(
+        DATABASES['default'],
+        **{location_key: location.strip()},
+        TEST={'MIRROR': 'default'},
+    )
+    DATABASE_REPLICAS.append(alias)
+
+DATABASE_ROUTERS = ['core.db.ReplicaRouter']
+
+# Выполняются для каждого нового соединения с SQLite.
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'cache_size': -64 * 1024,
+    'mmap_size': 256 * 1024 * 1024,
+    'busy_timeout': 5000,
+    'temp_store': 'MEMORY',
+}
+
+DATABASE_REPLICA_VIEWS = [
+    'posts:index',
+    'posts:group_list',
+    'posts:profile',
+    'posts:post_detail',
+    'posts:post_comments',
+    'posts:follow_index',
+    'api:posts',
+    'api:post',
+    'api:comments',
+    'api:groups',
+    'api:group_posts',
+    'api:author',
+    'api:author_posts',
+    'api:follow_feed',
+]
+
+# GET-представления, которые пишут в базу: после них пользователь,
+# как и после POST, читает с основной базы.
+DATABASE_WRITE_VIEWS = [
+    'posts:profile_follow',
+    'posts:profile_unfollow',
+]
+
+# Сколько секунд после записи пользователь читает с основной базы.
+DATABASE_PRIMARY_STICKINESS = 10
+
 
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
@@ -142,8 +308,56 @@ EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 
 CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 
+# CACHE_BACKEND: locmem (по умолчанию, свой кеш у каждого процесса),
+# file, memcached, pylibmc или путь к классу бэкенда, например
+# django_redis.cache.RedisCache. Общий кеш нужен, чтобы процессы
+# видели инвалидацию друг друга.
+CACHE_BACKENDS = {
+    'locmem': 'core.cache.LocMemCache',
+    'file': 'core.cache.FileBasedCache',
+    'memcached': 'core.cache.MemcachedCache',
+    'pylibmc': 'core.cache.PyLibMCCache',
+}
+CACHE_BACKEND = os.getenv('CACHE_BACKEND', 'locmem')
+CACHE_LOCATIONS = {
+    'file': os.path.join(BASE_DIR, 'cache'),
+    'memcached': '127.0.0.1:11211',
+    'pylibmc': '127.0.0.1:11211',
+}
+
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'BACKEND': CACHE_BACKENDS.get(CACHE_BACKEND, CACHE_BACKEND),
+        'LOCATION': os.getenv(
+            'CACHE_LOCATION', CACHE_LOCATIONS.get(CACHE_BACKEND, '')
+        ),
+        'KEY_PREFIX': os.getenv('CACHE_KEY_PREFIX', 'yatube'),
     }
 }
+
+# Кеш одного процесса не видит инвалидацию из других процессов. С ним
+# ключи, которые сбрасываются сигналами (страницы лент, объекты,
+# множества подписок, версии лент и валидаторов ETag), живут
+# LOCAL_CACHE_TIMEOUT секунд, а не сутки. В общем кеше версии лент
+# бессрочны.
+CACHE_IS_SHARED = not CACHES['default']['BACKEND'].endswith('LocMemCache')
+
+LOCAL_CACHE_TIMEOUT = 20
+
+FEED_VERSION_TIMEOUT = None
+
+if not CACHE_IS_SHARED:
+    FEED_CACHE_TIMEOUT = LOCAL_CACHE_TIMEOUT
+    FOLLOW_GRAPH_TIMEOUT = LOCAL_CACHE_TIMEOUT
+    FEED_VERSION_TIMEOUT = LOCAL_CACHE_TIMEOUT
+
+# Защита от одновременного пересчёта ключа (core.cache.get_or_set):
+# сколько живёт блокировка, сколько ждать чужой пересчёт, сколько
+# хранить значение после логического срока и множитель XFetch.
+CACHE_LOCK_TIMEOUT = 30
+
+CACHE_LOCK_WAIT = 2
+
+CACHE_STALE_TIMEOUT = 60 * 5
+
+CACHE_XFETCH_BETA = 1